@@ -71,6 +71,16 @@ try:
         if 'JAMENDO_AUTH' in conf:
             JAMENDO_AUTH = conf['JAMENDO_AUTH']
             os.environ['JAMENDO_AUTH'] = JAMENDO_AUTH
+        # Optional settings of the crawler (f.e. the number of pages, which are fetched ahead).
+        if 'JAMENDO_CRAWLER' in conf:
+            JAMENDO_CRAWLER = conf['JAMENDO_CRAWLER']
+        # Optional cache settings (f.e. a memcached server, which is shared by the processes of the search).
+        # https://docs.djangoproject.com/en/1.8/topics/cache/
+        if 'CACHES' in conf:
+            CACHES = conf['CACHES']
+        # Optional settings of the search (f.e. the search backend).
+        if 'SHUFFLE_SEARCH' in conf:
+            SHUFFLE_SEARCH = conf['SHUFFLE_SEARCH']
         # Logging settings, which are optional.
         # https://docs.djangoproject.com/en/1.8/topics/logging/
         if 'LOGGING' in conf:
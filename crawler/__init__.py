@@ -11,6 +11,7 @@
 #   GNU General Public License for more details.
 #
 import os
+from django.conf import settings
 
 
 def get_jamendo_api_auth_code():
@@ -24,3 +25,16 @@ def get_jamendo_api_auth_code():
     else:
         raise ValueError(
             'The jamendo authentication code is not set. You can specify it in the CONF_FILE or by setting the environment variable \'JAMENDO_AUTH\'.')
+
+
+def get_crawler_setting(name, default=None):
+    """
+    Returns the value of the crawler setting with the given name. The crawler settings can be specified as dictionary
+    with the key 'JAMENDO_CRAWLER' in the CONF_FILE.
+
+    :param name: the name of the crawler setting (f.e. PREFETCH_PAGES).
+    :param default: the value, which shall be returned, if the setting is not specified.
+    :return: the value of the crawler setting or the given default value, if it is not specified.
+    """
+    crawler_settings = getattr(settings, 'JAMENDO_CRAWLER', None) or {}
+    return crawler_settings[name] if name in crawler_settings else default
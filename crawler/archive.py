@@ -0,0 +1,134 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import os
+import gzip
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseArchive(object):
+    """
+    This class represents an append-only archive of the raw pages received from jamendo. The pages are written as json
+    lines to gzip compressed segment files in the directory of the archive. A segment file is named after the
+    qualifier and the offset of its first page (f.e. tracks-000000000400-0.ndjson.gz) and holds at most the given
+    number of pages. The archived pages can be replayed instead of fetching them from jamendo.
+    """
+
+    SEGMENT_SUFFIX = '.ndjson.gz'
+
+    def __init__(self, directory: str, segment_pages: int=100):
+        """
+        Initializes the archive in the given directory. The directory is created, if a page is appended.
+
+        :param directory: the directory of the segment files.
+        :param segment_pages: the maximal number of pages of a segment file.
+        """
+        assert segment_pages > 0
+        self.directory = directory
+        self.segment_pages = segment_pages
+        self._segments = {}
+
+    def append(self, qualifier: str, offset: int, properties: {str: str}, response: {str: object}) -> None:
+        """
+        Appends the given page to the current segment file of the given qualifier. The page is flushed, so that it can
+        be read even if the segment file is not closed.
+
+        :param qualifier: the qualifier of the page (f.e. tracks).
+        :param offset: the offset of the first entity of the page.
+        :param properties: the properties of the call, which returned the page.
+        :param response: the response of jamendo (headers and results).
+        """
+        segment, pages = self._segments.get(qualifier, (None, 0))
+        if segment is None or pages >= self.segment_pages:
+            if segment is not None:
+                segment.close()
+            segment, pages = gzip.open(self.__new_segment_path(qualifier, offset), 'at', encoding='utf-8'), 0
+        segment.write(json.dumps({'qualifier': qualifier, 'offset': offset, 'properties': properties,
+                                  'response': response}) + '\n')
+        segment.flush()
+        self._segments[qualifier] = (segment, pages + 1)
+
+    def close(self) -> None:
+        """ Closes the current segment files. """
+        for segment, _ in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def segments(self, qualifier: str) -> [str]:
+        """
+        Returns the paths of the segment files of the given qualifier ordered by the offset of their first page.
+
+        :param qualifier: the qualifier of the pages (f.e. tracks).
+        :return: the paths of the segment files of the given qualifier.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        keys = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(self.SEGMENT_SUFFIX):
+                segment_qualifier, offset, sequence = file_name[:-len(self.SEGMENT_SUFFIX)].rsplit('-', 2)
+                if segment_qualifier == qualifier:
+                    keys.append((int(offset), int(sequence), file_name))
+        return [os.path.join(self.directory, file_name) for _, _, file_name in sorted(keys)]
+
+    def pages(self, qualifier: str, offset: int=0):
+        """
+        Returns a generator of the archived pages of the given qualifier from the given offset on, in the order of
+        their offset. If a page has been archived more than once (f.e. by a resumed crawling process), the page is
+        only returned once.
+
+        :param qualifier: the qualifier of the pages (f.e. tracks).
+        :param offset: the offset of the first entity, which shall be returned.
+        :return: a generator of tuples of the offset and the response (headers and results) of the pages.
+        """
+        next_offset = offset
+        for path in self.segments(qualifier):
+            for record in self.__read(path):
+                results = record['response']['results']
+                if record['offset'] >= next_offset and results:
+                    next_offset = record['offset'] + len(results)
+                    yield record['offset'], record['response']
+
+    def __new_segment_path(self, qualifier: str, offset: int) -> str:
+        """
+        Returns the path of a new segment file of the given qualifier, which starts with the page at the given offset.
+
+        :param qualifier: the qualifier of the pages (f.e. tracks).
+        :param offset: the offset of the first page of the segment file.
+        :return: the path of the new segment file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        sequence = 0
+        while True:
+            path = os.path.join(self.directory, '%s-%012d-%d%s' % (qualifier, offset, sequence, self.SEGMENT_SUFFIX))
+            if not os.path.exists(path):
+                return path
+            sequence += 1
+
+    @staticmethod
+    def __read(path: str):
+        """
+        Returns a generator of the records of the given segment file. A truncated segment file (f.e. of an interrupted
+        crawling process) is read up to the last complete record.
+
+        :param path: the path of the segment file.
+        :return: a generator of the records of the segment file.
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as segment:
+            try:
+                for line in segment:
+                    yield json.loads(line)
+            except (EOFError, ValueError) as e:
+                logger.warning('The segment %s is truncated (%s).' % (path, e))
@@ -11,23 +11,112 @@
 #   GNU General Public License for more details.
 #
 
+import os
+import time
 import logging
+import threading
 import urllib.parse
 import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
 from abc import abstractmethod
-from crawler import get_jamendo_api_auth_code
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from django.db import models, transaction
+from crawler import get_jamendo_api_auth_code, get_crawler_setting
 from crawler.models import CrawlingProcess
+from crawler.identitymap import IdentityMap
+from crawler.progress import CrawlingProgress
+from crawler.archive import ResponseArchive
+from shuffle.searchengine import SearchEngine
 from shuffle.models import (Artist, JamendoArtistProfile, Song, JamendoSongProfile, Album, JamendoAlbumProfile, Tag,
-                            Source, License)
+                            Source, License, CatalogVersion, SongSearchDocument)
 
 logger = logging.getLogger(__name__)
 
 
 class Entity(object):
+    # The identity map of the running crawling process, which is consulted before the database. None, if no crawling
+    # process is running.
+    identity_map = None
+    # The progress of the running crawling process. None, if no crawling process is running.
+    progress = None
+    # The kind of the entity (see IdentityMap).
+    kind = None
+
     def __init__(self, entity):
         assert entity is not None
         self.entity = entity
 
+    @classmethod
+    def _cached(cls, kind: str, key):
+        """
+        Returns the entity of the given kind with the given key from the identity map of the running crawling process.
+
+        :param kind: the kind of the entity (see IdentityMap).
+        :param key: the key of the entity (f.e. the jamendo id).
+        :return: the entity or None, if it is not stored in the identity map or no crawling process is running.
+        """
+        return Entity.identity_map.get(kind, key) if Entity.identity_map is not None else None
+
+    @classmethod
+    def _cache(cls, kind: str, key, entity):
+        """
+        Stores the given entity of the given kind with the given key to the identity map of the running crawling
+        process, if one is running.
+
+        :param kind: the kind of the entity (see IdentityMap).
+        :param key: the key of the entity (f.e. the jamendo id).
+        :param entity: the entity, which shall be stored.
+        :return: the given entity.
+        """
+        if Entity.identity_map is not None:
+            Entity.identity_map.put(kind, key, entity)
+        return entity
+
+    @staticmethod
+    @contextmanager
+    def atomic():
+        """
+        Returns a transaction (see transaction.atomic), in which the entities stored to the identity map of the running
+        crawling process are staged. They are only published to the identity map, if the transaction is committed, so
+        that the identity map never refers to rows of a rolled back transaction.
+        """
+        identity_map = Entity.identity_map
+        if identity_map is None:
+            with transaction.atomic():
+                yield
+        else:
+            with identity_map.staged(), transaction.atomic():
+                yield
+
+    @classmethod
+    def _update_or_create_profile(cls, profile_cls, jamendo_id, defaults: {str: str}):
+        """
+        Updates the profile of the given class with the given jamendo id or creates it, if it does not exist. The
+        profile is only written to the database, if it has changed since it has been stored to the identity map.
+
+        :param profile_cls: the class of the profile (f.e. JamendoArtistProfile).
+        :param jamendo_id: the jamendo id of the profile.
+        :param defaults: the fields of the profile, which shall be updated.
+        :return: the updated or newly created profile.
+        """
+        kind = {JamendoArtistProfile: IdentityMap.ARTIST_PROFILE, JamendoAlbumProfile: IdentityMap.ALBUM_PROFILE,
+                JamendoSongProfile: IdentityMap.SONG_PROFILE}[profile_cls]
+        profile = cls._cached(kind, jamendo_id)
+        if profile is not None:
+            if any(getattr(profile, field) != value for field, value in defaults.items()):
+                profile_cls.objects.filter(pk=profile.pk).update(**defaults)
+                for field, value in defaults.items():
+                    setattr(profile, field, value)
+            return profile
+        return cls._cache(kind, jamendo_id,
+                          profile_cls.objects.update_or_create(jamendo_id=jamendo_id, defaults=defaults)[0])
+
     @abstractmethod
     def persist(self):
         """
@@ -44,7 +133,11 @@ class Entity(object):
         :return: the persisted entity.
         """
         self.sync()
-        return self.persist()
+        created = self.entity.pk is None
+        entity = self.persist()
+        if Entity.progress is not None:
+            Entity.progress.entity_persisted(self.kind, created)
+        return entity
 
     @classmethod
     @abstractmethod
@@ -68,9 +161,13 @@ class Entity(object):
 
 
 class ArtistEntity(Entity):
+    kind = IdentityMap.ARTIST
+
     def persist(self) -> Artist:
         assert isinstance(self.entity, Artist)
         self.entity.save()
+        if self.entity.is_on_jamendo:
+            self._cache(IdentityMap.ARTIST, self.entity.jamendo_id, self.entity)
         return self.entity
 
     @classmethod
@@ -80,16 +177,22 @@ class ArtistEntity(Entity):
     def sync(self) -> None:
         assert isinstance(self.entity, Artist)
         if self.entity.is_on_jamendo:
-            artist = Artist.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_id)
-            self.entity = self._merge(self.entity, artist.first()) if artist.exists() else self.entity
+            artist = self._cached(IdentityMap.ARTIST, self.entity.jamendo_id)
+            if artist is None:
+                artist = Artist.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_id).first()
+            self.entity = self._merge(self.entity, artist) if artist is not None else self.entity
         else:
             raise NotImplementedError('Not fully implemented yet for merge of %s' % self.__class__.__name__)
 
 
 class AlbumEntity(Entity):
+    kind = IdentityMap.ALBUM
+
     def persist(self) -> Album:
         assert isinstance(self.entity, Album)
         self.entity.save()
+        if self.entity.is_on_jamendo:
+            self._cache(IdentityMap.ALBUM, self.entity.jamendo_id, self.entity)
         return self.entity
 
     @classmethod
@@ -99,16 +202,22 @@ class AlbumEntity(Entity):
     def sync(self) -> None:
         assert isinstance(self.entity, Album)
         if self.entity.is_on_jamendo:
-            album = Album.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_profile.jamendo_id)
-            self.entity = self._merge(self.entity, album.first()) if album.exists() else self.entity
+            album = self._cached(IdentityMap.ALBUM, self.entity.jamendo_id)
+            if album is None:
+                album = Album.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_id).first()
+            self.entity = self._merge(self.entity, album) if album is not None else self.entity
         else:
             raise NotImplementedError('Not fully implemented yet for merge of %s' % self.__class__.__name__)
 
 
 class SongEntity(Entity):
+    kind = IdentityMap.SONG
+
     def persist(self) -> Song:
         assert isinstance(self.entity, Song)
         self.entity.save()
+        if self.entity.is_on_jamendo:
+            self._cache(IdentityMap.SONG, self.entity.jamendo_id, self.entity)
         return self.entity
 
     @classmethod
@@ -120,8 +229,10 @@ class SongEntity(Entity):
     def sync(self) -> None:
         assert isinstance(self.entity, Song)
         if self.entity.is_on_jamendo:
-            song = Song.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_profile.jamendo_id)
-            self.entity = self._merge(self.entity, song.first()) if song.exists() else self.entity
+            song = self._cached(IdentityMap.SONG, self.entity.jamendo_id)
+            if song is None:
+                song = Song.objects.filter(jamendo_profile__jamendo_id=self.entity.jamendo_id).first()
+            self.entity = self._merge(self.entity, song) if song is not None else self.entity
         else:
             raise NotImplementedError('Not fully implemented yet for merge of %s' % self.__class__.__name__)
 
@@ -131,11 +242,138 @@ class JamendoCallException(Exception):
     pass
 
 
+class JamendoCallStatistics(object):
+    """ This class collects the latency and the number of retries of the calls to the jamendo api. """
+
+    # The upper bounds in seconds of the buckets of the latency histogram. The last bucket counts the slower calls.
+    LATENCY_BUCKETS = CrawlingProcess.LATENCY_BUCKETS
+
+    def __init__(self, recent_calls: int=100):
+        """
+        Initializes the statistics.
+
+        :param recent_calls: the number of the most recent calls, of which the latency and retries are kept.
+        """
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latency_histogram = [0] * (len(self.LATENCY_BUCKETS) + 1)
+        self.recent_calls = deque(maxlen=recent_calls)
+
+    def record(self, qualifier: str, latency: float, retries: int, failed: bool=False) -> None:
+        """
+        Records a call to the jamendo api.
+
+        :param qualifier: the qualifier of the call (f.e. tracks).
+        :param latency: the time in seconds, which the call took including the retries.
+        :param retries: the number of retries of the call.
+        :param failed: True, if the call failed, otherwise False.
+        """
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.failures += 1 if failed else 0
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.latency_histogram[bisect_left(self.LATENCY_BUCKETS, latency)] += 1
+            self.recent_calls.append((qualifier, latency, retries))
+
+    @property
+    def average_latency(self) -> float:
+        """
+        Returns the average latency of the recorded calls.
+
+        :return: the average latency in seconds or 0, if no call has been recorded.
+        """
+        return self.total_latency / self.calls if self.calls else 0.0
+
+    def __repr__(self):
+        return '<%s: %d calls, %d retries, %d failures, avg. latency: %.3fs, max. latency: %.3fs>' % (
+            type(self).__name__, self.calls, self.retries, self.failures, self.average_latency, self.max_latency)
+
+
 class JamendoServiceMixin(object):
     """ The jamendo service mixin provides the utilities to communicate with the jamendo web service (REST Api). """
 
     client_id = get_jamendo_api_auth_code()
-    api_url = 'https://api.jamendo.com/v3.0/'
+    # The url of the jamendo api, which can be replaced by a local fake jamendo server (see crawler.fakejamendo).
+    api_url = get_crawler_setting('API_URL', 'https://api.jamendo.com/v3.0/')
+
+    # The number of pages, which are fetched ahead while the current page is processed. If it is 0, the pages are
+    # fetched one after another.
+    prefetch_pages = get_crawler_setting('PREFETCH_PAGES', 0)
+    # The number of threads, which fetch the pages ahead.
+    fetch_workers = get_crawler_setting('FETCH_WORKERS', 2)
+    # The number of entities requested per page, if the pages are fetched ahead (200 is the maximum of jamendo).
+    page_size = get_crawler_setting('PAGE_SIZE', 200)
+
+    # The number of connections to jamendo, which are kept alive.
+    pool_size = get_crawler_setting('POOL_SIZE', 10)
+    # The timeouts in seconds for connecting to jamendo and for receiving the response.
+    connect_timeout = get_crawler_setting('CONNECT_TIMEOUT', 10)
+    read_timeout = get_crawler_setting('READ_TIMEOUT', 60)
+    # The number of retries of a failed call (server error, rate limit or timeout) and the factor in seconds of the
+    # exponential backoff between the retries. The backoff (and a requested Retry-After) is limited to max_backoff.
+    max_retries = get_crawler_setting('MAX_RETRIES', 5)
+    backoff_factor = get_crawler_setting('BACKOFF_FACTOR', 0.5)
+    max_backoff = get_crawler_setting('MAX_BACKOFF', 300)
+    retry_status_codes = (429, 500, 502, 503, 504)
+
+    # The statistics of all jamendo api calls.
+    call_statistics = JamendoCallStatistics()
+
+    # The archive, to which the pages of all_query are written, and the archive, from which the pages of all_query are
+    # replayed instead of fetching them from jamendo (see ResponseArchive). None, if the pages shall not be archived or
+    # replayed respectively.
+    archive = None
+    replay_archive = None
+
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def session(cls) -> requests.Session:
+        """
+        Returns the http session shared by all jamendo api calls. The session keeps the connections to jamendo alive.
+
+        :return: the http session shared by all jamendo api calls.
+        """
+        with JamendoServiceMixin._session_lock:
+            if JamendoServiceMixin._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=cls.pool_size, pool_maxsize=cls.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                JamendoServiceMixin._session = session
+            return JamendoServiceMixin._session
+
+    @classmethod
+    def __retry_delay(cls, retries: int, http_response: requests.Response=None) -> float:
+        """
+        Returns the time in seconds, which shall be waited before the failed call is retried. The Retry-After header
+        and the rate limit headers of the given response are honored.
+
+        :param retries: the number of retries so far.
+        :param http_response: the response of the failed call or None, if no response has been received.
+        :return: the time in seconds, which shall be waited before the retry.
+        """
+        delay = cls.backoff_factor * (2 ** retries)
+        if http_response is not None:
+            retry_after = http_response.headers.get('Retry-After')
+            if retry_after is None and http_response.headers.get('X-RateLimit-Remaining') == '0':
+                retry_after = http_response.headers.get('X-RateLimit-Reset')
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                    except (TypeError, ValueError):
+                        pass
+        return min(max(delay, 0.0), cls.max_backoff)
 
     @classmethod
     def json_call(cls, qualifier, properties={}, hooks={}):
@@ -148,12 +386,37 @@ class JamendoServiceMixin(object):
         :param hooks: event hooks that shall be used for the request.
         :return: the response of the jamendo api, if the call was successful. Otherwise an exception will be raised.
         """
-        properties['client_id'] = cls.client_id
-        properties['format'] = 'json'
+        properties = dict(properties, client_id=cls.client_id, format='json')
         request_url = cls.api_url + '%s/?%s' % (qualifier, urllib.parse.urlencode(properties))
-        print('Request[%s]: %s' % (qualifier, request_url))
         logger.debug('Request[%s]: %s' % (qualifier, request_url))
-        response = requests.get(request_url, hooks=hooks).json()
+        retries = 0
+        start = time.time()
+        while True:
+            try:
+                http_response = cls.session().get(request_url, hooks=hooks,
+                                                  timeout=(cls.connect_timeout, cls.read_timeout))
+                if http_response.status_code not in cls.retry_status_codes:
+                    break
+                elif retries >= cls.max_retries:
+                    cls.call_statistics.record(qualifier, time.time() - start, retries, failed=True)
+                    raise JamendoCallException('The jamendo api call failed (HTTP status %d)!' % (
+                        http_response.status_code))
+                delay = cls.__retry_delay(retries, http_response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if retries >= cls.max_retries:
+                    cls.call_statistics.record(qualifier, time.time() - start, retries, failed=True)
+                    raise JamendoCallException('The jamendo api call failed (%s)!' % e) from e
+                delay = cls.__retry_delay(retries)
+            retries += 1
+            logger.warning('Request[%s]: Retry %d of %d in %.1f seconds.' % (qualifier, retries, cls.max_retries,
+                                                                             delay))
+            time.sleep(delay)
+        cls.call_statistics.record(qualifier, time.time() - start, retries)
+        logger.debug('Request[%s]: %.3f seconds, %d retries' % (qualifier, time.time() - start, retries))
+        try:
+            response = http_response.json()
+        except ValueError as e:
+            raise JamendoCallException('The response of the jamendo api call is corrupted !') from e
         if response is None or not ('headers' in response and 'results' in response):
             raise JamendoCallException('The response of the jamendo api call is corrupted !')
         elif response['headers']['status'] != 'success':
@@ -161,7 +424,32 @@ class JamendoServiceMixin(object):
         return response
 
     @classmethod
-    def all_query(cls, qualifier, properties={}, offset=0, process=None):
+    def date_range(cls, since: datetime, until: datetime=None) -> {str: str}:
+        """
+        Returns the properties, which restrict a query to the entities released (or joined in the case of artists)
+        between the given dates. Jamendo compares the dates by day, both days are included.
+
+        :param since: the lower bound of the date range.
+        :param until: the upper bound of the date range. If it is not given, the current date is used.
+        :return: the properties restricting a query to the given date range.
+        """
+        until = until if until is not None else datetime.now(timezone.utc)
+        return {'datebetween': '%s_%s' % (since.strftime('%Y-%m-%d'), until.strftime('%Y-%m-%d'))}
+
+    @classmethod
+    def count(cls, qualifier, properties={}) -> int:
+        """
+        Returns the number of entities, which are reported by jamendo for the given qualifier and properties.
+
+        :param qualifier: the qualifier of the entities (f.e. tracks).
+        :param properties: optional properties, which restrict the entities (f.e. a date range).
+        :return: the number of entities reported by jamendo.
+        """
+        response = cls.json_call(qualifier, properties=dict(properties, limit=1, fullcount='true'))
+        return int(response['headers'].get('results_fullcount', 0))
+
+    @classmethod
+    def all_query(cls, qualifier, properties={}, offset=0, process=None, prefetch=None, checkpoint=None):
         """
         This method is a template for getting all data sets for a special entity. The function 'call' must be given.
         This function is called unless the response of the function is empty.
@@ -169,22 +457,128 @@ class JamendoServiceMixin(object):
         :param qualifier: the required qualifier, which shall be used for the json call (f.e. songs, tracks, albums).
         :param properties: optional properties, which shall be used for the json call. The properties 'limit' as well as
                            offset will be overwritten.
+        :param offset: the offset of the first entity, which shall be fetched.
         :param process: an optional function that takes a list of json dictionaries (jamendo entities) as argument
                         and returns a list. This list will be used for the further processing.
+        :param prefetch: the number of pages, which shall be fetched ahead while the current page is processed. If it
+                         is not given, the class attribute prefetch_pages is used.
+        :param checkpoint: an optional function that takes the offset of the next entity as argument. It is called
+                           after each page in the same transaction as the process function.
         """
+        if cls.replay_archive is not None:
+            return cls.__replayed_all_query(qualifier, offset, process, checkpoint)
+        prefetch = cls.prefetch_pages if prefetch is None else prefetch
+        if prefetch > 0:
+            return cls.__pipelined_all_query(qualifier, properties, offset, process, prefetch, checkpoint)
         result_list = []
-        properties['limit'] = 'all'
+        properties = dict(properties, limit='all')
         while True:
             properties['offset'] = offset
             response = cls.json_call(qualifier, properties=properties)
             if response['headers']['results_count'] == 0 or not response['results']:
                 break
             else:
+                cls.__archive_page(qualifier, offset, properties, response)
                 offset += int(response['headers']['results_count'])
-                new_entities_list = response['results']
-                if process is not None:
-                    new_entities_list = process(new_entities_list)
-                result_list.extend(new_entities_list)
+                result_list.extend(cls.__process_page(response['results'], process, checkpoint, offset))
+        return result_list
+
+    @classmethod
+    def __replayed_all_query(cls, qualifier, offset, process, checkpoint):
+        """
+        Works like all_query, but the pages are read from the replay archive instead of fetching them from jamendo.
+
+        :param qualifier: the required qualifier of the archived pages (f.e. songs, tracks, albums).
+        :param offset: the offset of the first entity, which shall be replayed.
+        :param process: an optional function that takes a list of json dictionaries (jamendo entities) as argument
+                        and returns a list.
+        :param checkpoint: an optional function that takes the offset of the next entity as argument.
+        """
+        result_list = []
+        for page_offset, response in cls.replay_archive.pages(qualifier, offset):
+            result_list.extend(cls.__process_page(response['results'], process, checkpoint,
+                                                  page_offset + len(response['results'])))
+        return result_list
+
+    @classmethod
+    def __archive_page(cls, qualifier, offset, properties, response):
+        """
+        Writes the given page to the archive, if an archive is set.
+
+        :param qualifier: the qualifier of the page (f.e. tracks).
+        :param offset: the offset of the first entity of the page.
+        :param properties: the properties of the call, which returned the page.
+        :param response: the response of jamendo (headers and results).
+        """
+        if cls.archive is not None:
+            cls.archive.append(qualifier, offset, properties, response)
+
+    @classmethod
+    def __process_page(cls, entities_list, process, checkpoint, next_offset):
+        """
+        Processes the given page of entities and records the given offset of the next entity as checkpoint in one
+        transaction. The version of the catalog is increased in the same transaction, if the page is not empty, so the
+        search never serves results of a catalog, which has been changed since (the processes query the version at most
+        once in the search setting VERSION_TTL, so the bumps of a running crawl do not cause a stampede).
+
+        :param entities_list: the page of json dictionaries (jamendo entities).
+        :param process: an optional function that takes a list of json dictionaries as argument and returns a list.
+        :param checkpoint: an optional function that takes the offset of the next entity as argument.
+        :param next_offset: the offset of the entity after the given page.
+        :return: the processed list of entities.
+        """
+        start = time.time()
+        with Entity.atomic():
+            if process is not None:
+                entities_list = process(entities_list)
+            if checkpoint is not None:
+                checkpoint(next_offset)
+            if entities_list:
+                CatalogVersion.bump()
+        if Entity.progress is not None:
+            Entity.progress.page_processed(time.time() - start)
+        return entities_list
+
+    @classmethod
+    def __pipelined_all_query(cls, qualifier, properties, offset, process, prefetch, checkpoint):
+        """
+        Works like all_query, but the next pages are fetched by a pool of threads while the current page is processed.
+        At most the given number of pages are fetched ahead, the pages are processed in the order of their offset.
+
+        :param qualifier: the required qualifier, which shall be used for the json call (f.e. songs, tracks, albums).
+        :param properties: optional properties, which shall be used for the json call.
+        :param offset: the offset of the first entity, which shall be fetched.
+        :param process: an optional function that takes a list of json dictionaries (jamendo entities) as argument
+                        and returns a list.
+        :param prefetch: the number of pages, which shall be fetched ahead.
+        :param checkpoint: an optional function that takes the offset of the next entity as argument.
+        """
+        result_list = []
+        properties = dict(properties, limit=cls.page_size)
+        pending_pages = deque()
+        with ThreadPoolExecutor(max_workers=max(1, cls.fetch_workers)) as executor:
+
+            def fetch_page(page_offset):
+                pending_pages.append((page_offset, executor.submit(cls.json_call, qualifier,
+                                                                   properties=dict(properties, offset=page_offset))))
+                return page_offset + cls.page_size
+
+            next_offset = offset
+            for _ in range(prefetch + 1):
+                next_offset = fetch_page(next_offset)
+            try:
+                while pending_pages:
+                    page_offset, page = pending_pages.popleft()
+                    response = page.result()
+                    if response['headers']['results_count'] == 0 or not response['results']:
+                        break
+                    next_offset = fetch_page(next_offset)
+                    cls.__archive_page(qualifier, page_offset, dict(properties, offset=page_offset), response)
+                    result_list.extend(cls.__process_page(response['results'], process, checkpoint,
+                                                          page_offset + len(response['results'])))
+            finally:
+                for _, page in pending_pages:
+                    page.cancel()
         return result_list
 
 
@@ -203,12 +597,11 @@ class JamendoArtistEntity(ArtistEntity, JamendoServiceMixin):
         """
         artist = Artist()
         artist.name = json['name']
-        artist.jamendo_profile = JamendoArtistProfile.objects.update_or_create(jamendo_id=json['id'],
-                                                                               defaults={'name': json['name'],
-                                                                                         'image': json['image'],
-                                                                                         'external_link': json[
-                                                                                             'shareurl'],
-                                                                                         })[0]
+        artist.jamendo_profile = cls._update_or_create_profile(JamendoArtistProfile, json['id'],
+                                                               defaults={'name': json['name'],
+                                                                         'image': json['image'],
+                                                                         'external_link': json['shareurl'],
+                                                                         })
         artist.website = json['website']
         return cls(artist)
 
@@ -222,9 +615,11 @@ class JamendoArtistEntity(ArtistEntity, JamendoServiceMixin):
         :return: one artist or None.
         """
         if jamendo_id is not None:
-            response_set = Artist.objects.filter(jamendo_profile__jamendo_id=jamendo_id)
-            if response_set.exists():
-                return response_set.first()
+            artist = cls._cached(IdentityMap.ARTIST, jamendo_id)
+            if artist is None:
+                artist = Artist.objects.filter(jamendo_profile__jamendo_id=jamendo_id).first()
+            if artist is not None:
+                return cls._cache(IdentityMap.ARTIST, jamendo_id, artist)
             else:
                 response = cls.json_call('artists', {'id': jamendo_id})
                 if response['headers']['results_count'] == 1:
@@ -239,12 +634,15 @@ class JamendoArtistEntity(ArtistEntity, JamendoServiceMixin):
         raise ValueError('The artist (Jamendo Id: %s, Name: %s) can\'t be created.' % (jamendo_id, name))
 
     @classmethod
-    def all_artists(cls) -> [Artist]:
+    def all_artists(cls, offset=0, checkpoint=None, since=None, until=None) -> [Artist]:
         """
         This method scans for all artists available on the jamendo service and persists them if the artist has not
         been already persisted.
 
-        :param artists_list: the list of already loaded or known artists.
+        :param offset: the offset of the first artist, which shall be fetched.
+        :param checkpoint: an optional function that is called with the offset of the next artist after each page.
+        :param since: if it is given, only the artists since this date are fetched (delta crawl).
+        :param until: the upper bound of the dates of the fetched artists, if since is given.
         :return: the loaded artists with no duplicates regarding the jamendo_id.
         """
 
@@ -252,7 +650,8 @@ class JamendoArtistEntity(ArtistEntity, JamendoServiceMixin):
             return [JamendoArtistEntity.new_by_json(artist_json).sync_and_persist() for artist_json in artists_json]
 
         logger.info('SE (Jamendo): Crawling for all artists !')
-        return cls.all_query('artists', process=process_result)
+        properties = cls.date_range(since, until) if since is not None else {}
+        return cls.all_query('artists', properties, offset=offset, process=process_result, checkpoint=checkpoint)
 
 
 class JamendoAlbumEntity(AlbumEntity, JamendoServiceMixin):
@@ -274,12 +673,11 @@ class JamendoAlbumEntity(AlbumEntity, JamendoServiceMixin):
         album.name = json['name']
 
         # Create a jamendo profile for this album.
-        album.jamendo_profile = JamendoAlbumProfile.objects.update_or_create(jamendo_id=json['id'],
-                                                                             defaults={'name': json['name'],
-                                                                                       'cover': json['image'],
-                                                                                       'external_link': json[
-                                                                                           'shareurl'],
-                                                                                       })[0]
+        album.jamendo_profile = cls._update_or_create_profile(JamendoAlbumProfile, json['id'],
+                                                              defaults={'name': json['name'],
+                                                                        'cover': json['image'],
+                                                                        'external_link': json['shareurl'],
+                                                                        })
         # Link to an artist.
         try:
             album.artist = JamendoArtistEntity.get_or_create(jamendo_id=json['artist_id'], name=json['artist_name'])
@@ -300,9 +698,11 @@ class JamendoAlbumEntity(AlbumEntity, JamendoServiceMixin):
         :return: one album or None.
         """
         if jamendo_id is not None:
-            response_set = Album.objects.filter(jamendo_profile__jamendo_id=jamendo_id)
-            if response_set.exists():
-                return response_set.first()
+            album = cls._cached(IdentityMap.ALBUM, jamendo_id)
+            if album is None:
+                album = Album.objects.filter(jamendo_profile__jamendo_id=jamendo_id).first()
+            if album is not None:
+                return cls._cache(IdentityMap.ALBUM, jamendo_id, album)
             else:
                 response = cls.json_call('albums', {'id': jamendo_id})
                 if response['headers']['results_count'] == 1:
@@ -334,11 +734,15 @@ class JamendoAlbumEntity(AlbumEntity, JamendoServiceMixin):
             return JamendoAlbumProfile.objects.create(jamendo_id=jamendo_id, **kwargs)
 
     @classmethod
-    def all_albums(cls) -> [Album]:
+    def all_albums(cls, offset=0, checkpoint=None, since=None, until=None) -> [Album]:
         """
         This method scans for all albums available on the jamendo service and persists them if the album has not
         been already persisted.
 
+        :param offset: the offset of the first album, which shall be fetched.
+        :param checkpoint: an optional function that is called with the offset of the next album after each page.
+        :param since: if it is given, only the albums since this date are fetched (delta crawl).
+        :param until: the upper bound of the dates of the fetched albums, if since is given.
         :return: the loaded albums with no duplicates regarding the jamendo_id.
         """
 
@@ -346,7 +750,8 @@ class JamendoAlbumEntity(AlbumEntity, JamendoServiceMixin):
             return [JamendoAlbumEntity.new_by_json(album_json).sync_and_persist() for album_json in albums_json]
 
         logger.info('SE (Jamendo): Crawling for all albums !')
-        return cls.all_query('albums', process=process_result)
+        properties = cls.date_range(since, until) if since is not None else {}
+        return cls.all_query('albums', properties, offset=offset, process=process_result, checkpoint=checkpoint)
 
 
 class JamendoSongEntity(SongEntity, JamendoServiceMixin):
@@ -377,11 +782,11 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
         song = Song()
         song.name = json['name']
         # Creates a jamendo profile for this song.
-        song.jamendo_profile = JamendoSongProfile.objects.update_or_create(jamendo_id=json['id'],
-                                                                           defaults={'name': json['name'],
-                                                                                     'cover': json['image'],
-                                                                                     'external_link': json['shareurl'],
-                                                                                     })[0]
+        song.jamendo_profile = cls._update_or_create_profile(JamendoSongProfile, json['id'],
+                                                             defaults={'name': json['name'],
+                                                                       'cover': json['image'],
+                                                                       'external_link': json['shareurl'],
+                                                                       })
         # Link to an album.
         try:
             song.album = JamendoAlbumEntity.get_or_create(name=json['album_name'], jamendo_id=json['album_id'])
@@ -416,6 +821,8 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
             for source in self.sources:
                 source.song = song
             self.sources = self.__persist_sources(self.sources)
+        # Updates the search document of the song.
+        SongSearchDocument.update([song.id])
         return song
 
     @classmethod
@@ -428,9 +835,11 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
         :return: one song or None.
         """
         if jamendo_id is not None:
-            response_set = Song.objects.filter(jamendo_profile__id=jamendo_id)
-            if response_set.exists():
-                return response_set.first()
+            song = cls._cached(IdentityMap.SONG, jamendo_id)
+            if song is None:
+                song = Song.objects.filter(jamendo_profile__jamendo_id=jamendo_id).first()
+            if song is not None:
+                return cls._cache(IdentityMap.SONG, jamendo_id, song)
             else:
                 response = cls.json_call('tracks', {'id': jamendo_id, 'include': 'musicinfo stats licenses'})
                 if response['headers']['results_count'] == 1:
@@ -462,11 +871,17 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
             return JamendoSongProfile.objects.create(jamendo_id=jamendo_id, **kwargs)
 
     @classmethod
-    def all_songs(cls, offset=0) -> [Song]:
+    def all_songs(cls, offset=0, bulk=False, checkpoint=None, since=None, until=None) -> [Song]:
         """
         This method scans for all songs available on the jamendo service and persists them if the song has not
         been already persisted.
 
+        :param offset: the offset of the first song, which shall be fetched.
+        :param bulk: True, if each received page shall be persisted at once (see persist_bulk), otherwise every song
+                     is synchronised and persisted on its own.
+        :param checkpoint: an optional function that is called with the offset of the next song after each page.
+        :param since: if it is given, only the songs released since this date are fetched (delta crawl).
+        :param until: the upper bound of the release dates of the fetched songs, if since is given.
         :return: the loaded songs with no duplicates regarding the jamendo_id.
         """
 
@@ -474,7 +889,192 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
             return [JamendoSongEntity.new_by_json(song_json).sync_and_persist() for song_json in songs_json]
 
         logger.info('SE (Jamendo): Crawling for all songs !')
-        return cls.all_query('tracks', {'include': 'musicinfo stats licenses'}, offset, process=process_result)
+        properties = {'include': 'musicinfo stats licenses'}
+        if since is not None:
+            properties.update(cls.date_range(since, until))
+        return cls.all_query('tracks', properties, offset,
+                             process=cls.persist_bulk if bulk else process_result, checkpoint=checkpoint)
+
+    @classmethod
+    def persist_bulk(cls, songs_json: [{str: str}]) -> [Song]:
+        """
+        Persists the given page of songs received from jamendo as json dictionaries at once. The result is the same as
+        calling new_by_json(..).sync_and_persist() for each song, but the existing profiles, songs, tags and sources
+        are looked up with a few queries for the whole page and the new rows are inserted in bulk. The page is
+        persisted in one transaction.
+
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :return: the persisted songs in the order of the given json dictionaries.
+        """
+        if not songs_json:
+            return []
+        with Entity.atomic():
+            profiles = cls.__bulk_persist_profiles(songs_json)
+            albums = cls.__bulk_get_or_create_related(JamendoAlbumEntity, Album, IdentityMap.ALBUM, songs_json,
+                                                      'album_id', 'album_name')
+            artists = cls.__bulk_get_or_create_related(JamendoArtistEntity, Artist, IdentityMap.ARTIST, songs_json,
+                                                       'artist_id', 'artist_name')
+            licenses = cls.__bulk_get_or_create_licenses(songs_json)
+            # Looks up the songs, which are already persisted. The new songs are created in bulk.
+            songs = dict()
+            for song in Song.objects.filter(jamendo_profile__in=profiles.values()).select_related(
+                    'jamendo_profile').order_by('pk'):
+                songs.setdefault(song.jamendo_profile.jamendo_id, song)
+            new_songs = dict()
+            for song_json in songs_json:
+                jamendo_id = int(song_json['id'])
+                if jamendo_id not in songs and jamendo_id not in new_songs:
+                    new_songs[jamendo_id] = Song(name=song_json['name'], album=albums.get(song_json['album_id']),
+                                                 artist=artists.get(song_json['artist_id']),
+                                                 duration=int(song_json['duration']),
+                                                 release_date=song_json['releasedate'], cover=song_json['image'],
+                                                 license=licenses[song_json['id']],
+                                                 jamendo_profile=profiles[jamendo_id])
+            if Entity.progress is not None:
+                Entity.progress.entity_persisted(IdentityMap.SONG, True, len(new_songs))
+                Entity.progress.entity_persisted(IdentityMap.SONG, False, len(songs))
+            if new_songs:
+                Song.objects.bulk_create(new_songs.values())
+                for song in Song.objects.filter(jamendo_profile__in=[profiles[jamendo_id] for jamendo_id in
+                                                                     new_songs]).select_related('jamendo_profile'):
+                    songs[song.jamendo_profile.jamendo_id] = song
+            cls.__bulk_persist_tags(songs_json, songs)
+            cls.__bulk_persist_sources(songs_json, songs)
+            SongSearchDocument.update(song.id for song in songs.values())
+        return [songs[int(song_json['id'])] for song_json in songs_json]
+
+    @classmethod
+    def __bulk_persist_profiles(cls, songs_json: [{str: str}]) -> {int: JamendoSongProfile}:
+        """
+        Updates the jamendo profiles of the given songs or creates them, if they do not already exist.
+
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :return: the jamendo profiles of the given songs with the jamendo id as key.
+        """
+        profiles_fields = {int(song_json['id']): {'name': song_json['name'], 'cover': song_json['image'],
+                                                  'external_link': song_json['shareurl']} for song_json in songs_json}
+        profiles = {profile.jamendo_id: profile for profile in
+                    JamendoSongProfile.objects.filter(jamendo_id__in=profiles_fields.keys())}
+        for jamendo_id, profile in profiles.items():
+            fields = profiles_fields[jamendo_id]
+            if any(getattr(profile, field) != value for field, value in fields.items()):
+                JamendoSongProfile.objects.filter(pk=profile.pk).update(**fields)
+                for field, value in fields.items():
+                    setattr(profile, field, value)
+        new_profiles = [JamendoSongProfile(jamendo_id=jamendo_id, **fields) for jamendo_id, fields in
+                        profiles_fields.items() if jamendo_id not in profiles]
+        if new_profiles:
+            JamendoSongProfile.objects.bulk_create(new_profiles)
+            profiles.update({profile.jamendo_id: profile for profile in JamendoSongProfile.objects.filter(
+                jamendo_id__in=[profile.jamendo_id for profile in new_profiles])})
+        return profiles
+
+    @classmethod
+    def __bulk_get_or_create_related(cls, entity_cls, model_cls, kind: str, songs_json: [{str: str}], id_key: str,
+                                     name_key: str) -> {str: models.Model}:
+        """
+        Returns the albums or artists (depending on the given entity and model class) of the given songs. The ones,
+        which are not stored in the identity map, are looked up with one query, the remaining ones are fetched from
+        jamendo by calling the get_or_create method of the given entity class.
+
+        :param entity_cls: the jamendo entity class (JamendoAlbumEntity or JamendoArtistEntity).
+        :param model_cls: the model class (Album or Artist).
+        :param kind: the kind of the entities in the identity map.
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :param id_key: the key of the jamendo id of the album/artist in the json dictionary of the song.
+        :param name_key: the key of the name of the album/artist in the json dictionary of the song.
+        :return: the albums or artists with the jamendo id given in the json dictionary as key. None, if the album or
+                 artist can't be created.
+        """
+        jamendo_ids = {song_json[id_key]: cls._cached(kind, song_json[id_key]) for song_json in songs_json}
+        persisted = dict()
+        lookup_ids = [jid for jid, entity in jamendo_ids.items() if entity is None and str(jid).isdigit()]
+        if lookup_ids:
+            for entity in model_cls.objects.filter(jamendo_profile__jamendo_id__in=lookup_ids).select_related(
+                    'jamendo_profile').order_by('pk'):
+                persisted.setdefault(entity.jamendo_profile.jamendo_id, entity)
+        for song_json in songs_json:
+            jamendo_id = song_json[id_key]
+            if jamendo_ids[jamendo_id] is not None:
+                continue
+            elif str(jamendo_id).isdigit() and int(jamendo_id) in persisted:
+                jamendo_ids[jamendo_id] = cls._cache(kind, jamendo_id, persisted[int(jamendo_id)])
+            else:
+                try:
+                    jamendo_ids[jamendo_id] = entity_cls.get_or_create(name=song_json[name_key], jamendo_id=jamendo_id)
+                except ValueError as e:
+                    logging.exception(e)
+        return jamendo_ids
+
+    @classmethod
+    def __bulk_get_or_create_licenses(cls, songs_json: [{str: str}]) -> {str: License}:
+        """
+        Returns the licenses of the given songs. The licenses, which are not already persisted, will be created.
+
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :return: the licenses of the songs with the jamendo id of the song as key.
+        """
+        licenses_str = {song_json['id']: cls.__get_license_type(song_json) for song_json in songs_json}
+        licenses = {license_str: cls._cached(IdentityMap.LICENSE, license_str) for license_str in
+                    set(licenses_str.values())}
+        lookup_types = [license_str for license_str, license in licenses.items() if license is None]
+        if lookup_types:
+            for license in License.objects.filter(type__in=lookup_types).order_by('-pk'):
+                licenses[license.type] = cls._cache(IdentityMap.LICENSE, license.type, license)
+        for license_str in [license_str for license_str, license in licenses.items() if license is None]:
+            licenses[license_str] = cls._cache(IdentityMap.LICENSE, license_str,
+                                               License.objects.get_or_create(type=license_str)[0])
+        return {jamendo_id: licenses[license_str] for jamendo_id, license_str in licenses_str.items()}
+
+    @classmethod
+    def __bulk_persist_tags(cls, songs_json: [{str: str}], songs: {int: Song}) -> None:
+        """
+        Persists the tags of the given songs, that are not already persisted, and links them to the songs.
+
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :param songs: the persisted songs with the jamendo id as key.
+        """
+        songs_tags = dict()
+        for song_json in songs_json:
+            tags = cls.__get_tags(song_json)
+            if tags is not None:
+                songs_tags.setdefault(songs[int(song_json['id'])].id, set()).update(tag.name for tag in tags)
+        tags_names = set().union(*songs_tags.values())
+        if not tags_names:
+            return
+        tags = {name: cls._cached(IdentityMap.TAG, name) for name in tags_names}
+        lookup_names = [name for name, tag in tags.items() if tag is None]
+        if lookup_names:
+            tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=lookup_names)})
+            new_names = [name for name in lookup_names if tags[name] is None]
+            if new_names:
+                Tag.objects.bulk_create([Tag(name=name) for name in new_names])
+                tags.update({tag.name: tag for tag in Tag.objects.filter(name__in=new_names)})
+            for name in lookup_names:
+                cls._cache(IdentityMap.TAG, name, tags[name])
+        song_tag_model = Song.tags.through
+        song_tags_links = set(
+            song_tag_model.objects.filter(song_id__in=songs_tags.keys()).values_list('song_id', 'tag_id'))
+        song_tag_model.objects.bulk_create(
+            [song_tag_model(song_id=song_id, tag_id=tags[name].id) for song_id, names in songs_tags.items() for name in
+             names if (song_id, tags[name].id) not in song_tags_links])
+
+    @classmethod
+    def __bulk_persist_sources(cls, songs_json: [{str: str}], songs: {int: Song}) -> None:
+        """
+        Persists the sources of the given songs, that are not already persisted.
+
+        :param songs_json: the songs received from jamendo as json dictionaries.
+        :param songs: the persisted songs with the jamendo id as key.
+        """
+        new_sources = dict()
+        for song_json in songs_json:
+            for source in cls.__get_sources(song_json):
+                source.song = songs[int(song_json['id'])]
+                new_sources.setdefault((source.type, source.codec, source.link), source)
+        persisted_sources = set(Source.objects.filter(link__in=[link for _, _, link in new_sources]).values_list(
+            'type', 'codec', 'link'))
+        Source.objects.bulk_create([source for key, source in new_sources.items() if key not in persisted_sources])
 
     @classmethod
     def __persist_tags(cls, tags: [Tag]) -> [Tag]:
@@ -486,12 +1086,14 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
         """
         tags_cache_list = list()
         for tag in tags:
-            tag_queryset = Tag.objects.filter(name=tag.name)
-            if tag_queryset.exists():
-                tag = tag_queryset.first()
-            else:
-                tag.save()
-            tags_cache_list.append(tag)
+            persisted_tag = cls._cached(IdentityMap.TAG, tag.name)
+            if persisted_tag is None:
+                persisted_tag = Tag.objects.filter(name=tag.name).first()
+                if persisted_tag is None:
+                    tag.save()
+                    persisted_tag = tag
+                cls._cache(IdentityMap.TAG, tag.name, persisted_tag)
+            tags_cache_list.append(persisted_tag)
         return tags_cache_list
 
     @classmethod
@@ -539,6 +1141,23 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
         :param song_json: the json dictionary of the jamendo song.
         :return: license from the given json dictionary of this song.
         """
+        license_str = cls.__get_license_type(song_json)
+        license = cls._cached(IdentityMap.LICENSE, license_str)
+        if license is None:
+            license_tuple = License.objects.get_or_create(type=license_str)
+            if license_tuple[1]:
+                license_tuple[0].save()
+            license = cls._cache(IdentityMap.LICENSE, license_str, license_tuple[0])
+        return license
+
+    @classmethod
+    def __get_license_type(cls, song_json: {str: str}) -> str:
+        """
+        Gets the type of the license from the received json formatted song.
+
+        :param song_json: the json dictionary of the jamendo song.
+        :return: the type of the license from the given json dictionary of this song.
+        """
         license_str = License.CC_UNKNOWN
         if 'licenses' in song_json:
             license_str = 'CC-BY'
@@ -548,10 +1167,7 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
                 license_str += '-ND'
             if song_json['licenses']['ccsa'] == 'true':
                 license_str += '-SA'
-        license_tuple = License.objects.get_or_create(type=license_str)
-        if license_tuple[1]:
-            license_tuple[0].save()
-        return license_tuple[0]
+        return license_str
 
     @classmethod
     def __get_sources(cls, song_json: {str: str}) -> [Source]:
@@ -588,26 +1204,191 @@ class JamendoSongEntity(SongEntity, JamendoServiceMixin):
 class JamendoCrawler(object):
     """ This class scans for creative commons music from the Jamendo webservice <https://www.jamendo.com>. """
 
+    # The maximal number of entities, which are stored in the identity map of a crawling process.
+    identity_map_size = 100000
+    # The minimal number of seconds between two writes of the progress of a crawling process.
+    progress_flush_interval = get_crawler_setting('PROGRESS_FLUSH_INTERVAL', 5)
+    # The directory, in which the pages received by a crawling process are archived (in a subdirectory per process).
+    # None, if the pages shall not be archived.
+    archive_dir = get_crawler_setting('ARCHIVE_DIR')
+    # The number of seconds without a checkpoint, after which a running crawling process is considered as interrupted.
+    stale_timeout = get_crawler_setting('STALE_TIMEOUT', 3600)
+
     @classmethod
-    def crawl(cls) -> None:
-        """ Starts a new crawling process """
+    def enqueue(cls, delta: bool=False) -> CrawlingProcess:
+        """
+        Plans a new crawling process, which is executed by a crawling worker (see crawler.worker).
+
+        :param delta: True, if only the entities since the last finished crawling process shall be fetched.
+        :return: the planned crawling process.
+        """
         crawling_process = CrawlingProcess(service=CrawlingProcess.Service_Jamendo,
-                                           status=CrawlingProcess.Status_Running)
+                                           status=CrawlingProcess.Status_Planned,
+                                           kind=CrawlingProcess.Kind_Delta if delta else CrawlingProcess.Kind_Full)
         crawling_process.save()
+        return crawling_process
+
+    @classmethod
+    def crawl(cls, delta: bool=False) -> CrawlingProcess:
+        """
+        Starts a new crawling process. A full crawling process fetches the entire catalog. A delta crawling process
+        only fetches the entities since the execution date of the last finished crawling process.
+
+        :param delta: True, if only the entities since the last finished crawling process shall be fetched.
+        :return: the executed crawling process.
+        """
+        crawling_process = CrawlingProcess(service=CrawlingProcess.Service_Jamendo,
+                                           status=CrawlingProcess.Status_Running,
+                                           kind=CrawlingProcess.Kind_Delta if delta else CrawlingProcess.Kind_Full)
+        crawling_process.save()
+        return cls.execute(crawling_process)
+
+    @classmethod
+    def execute(cls, crawling_process: CrawlingProcess) -> CrawlingProcess:
+        """
+        Executes the given crawling process, which must be marked as running. The lower bound of a delta crawling
+        process is the execution date of the last finished crawling process. If there is no finished crawling
+        process, a full crawling process is executed instead.
+
+        :param crawling_process: the crawling process, which shall be executed.
+        :return: the executed crawling process.
+        """
+        if crawling_process.kind == CrawlingProcess.Kind_Delta and crawling_process.delta_since is None:
+            last_process = CrawlingProcess.objects.filter(service=CrawlingProcess.Service_Jamendo,
+                                                          status=CrawlingProcess.Status_Finished).order_by(
+                '-execution_date').first()
+            if last_process is not None:
+                crawling_process.delta_since = last_process.execution_date
+            else:
+                logger.info('SE (Jamendo): No finished crawling process, falling back to a full crawl.')
+                crawling_process.kind = CrawlingProcess.Kind_Full
+            crawling_process.save()
+        return cls.__execute(crawling_process)
+
+    @classmethod
+    def __claim_resumable(cls) -> CrawlingProcess:
+        """
+        Claims the latest crawling process, which has failed or is stale (it is still marked as running, but has not
+        recorded a checkpoint within the stale timeout), and marks it as running. The process is claimed with a locked
+        row and a conditional update like in CrawlingWorker.claim, so that a process is never resumed twice.
+
+        :return: the claimed crawling process or None, if there is no crawling process, which can be resumed.
+        """
+        stale_date = datetime.now(timezone.utc) - timedelta(seconds=cls.stale_timeout)
+        stale = (models.Q(status=CrawlingProcess.Status_Running) &
+                 (models.Q(checkpoint_date__lt=stale_date) |
+                  models.Q(checkpoint_date__isnull=True, execution_date__lt=stale_date)))
+        with transaction.atomic():
+            candidates = CrawlingProcess.objects.select_for_update().filter(
+                models.Q(status=CrawlingProcess.Status_Failed) | stale,
+                service=CrawlingProcess.Service_Jamendo).order_by('-execution_date', '-pk')
+            for crawling_process in candidates:
+                # The update is conditional, because not all databases (f.e. SQLite) support the locking of rows.
+                checkpoint_date = datetime.now(timezone.utc)
+                if CrawlingProcess.objects.filter(
+                        pk=crawling_process.pk, status=crawling_process.status,
+                        checkpoint_date=crawling_process.checkpoint_date).update(
+                        status=CrawlingProcess.Status_Running, exception=None, checkpoint_date=checkpoint_date) > 0:
+                    crawling_process.status = CrawlingProcess.Status_Running
+                    crawling_process.exception = None
+                    crawling_process.checkpoint_date = checkpoint_date
+                    return crawling_process
+        return None
+
+    @classmethod
+    def resume(cls) -> CrawlingProcess:
+        """
+        Resumes the latest crawling process, which has failed or has been interrupted (it is still marked as running,
+        but has not recorded a checkpoint within the stale timeout). The crawling process continues at its checkpoint.
+        If there is no such crawling process, a new crawling process is started.
+
+        :return: the resumed crawling process.
+        """
+        crawling_process = cls.__claim_resumable()
+        if crawling_process is None:
+            return cls.crawl()
+        logger.info('SE (Jamendo): Resuming the crawling process %s at %s (offset: %d)' % (
+            crawling_process, crawling_process.phase, crawling_process.offset))
+        return cls.__execute(crawling_process)
+
+    @classmethod
+    def __execute(cls, crawling_process: CrawlingProcess) -> CrawlingProcess:
+        """
+        Executes the given crawling process and records its outcome.
+
+        :param crawling_process: the crawling process, which shall be executed.
+        :return: the executed crawling process.
+        """
+        identity_map = Entity.identity_map = IdentityMap(max_size=cls.identity_map_size)
+        JamendoServiceMixin.call_statistics = JamendoCallStatistics()
+        progress = Entity.progress = CrawlingProgress(crawling_process, JamendoServiceMixin.call_statistics,
+                                                      flush_interval=cls.progress_flush_interval)
+        if cls.archive_dir is not None and JamendoServiceMixin.replay_archive is None:
+            JamendoServiceMixin.archive = ResponseArchive(os.path.join(cls.archive_dir,
+                                                                       'process-%d' % crawling_process.pk))
         try:
-            cls.__crawl()
+            cls.__crawl(crawling_process)
             crawling_process.status = CrawlingProcess.Status_Finished
+            SearchEngine.refresh()
+            SearchEngine.store_snapshot()
         except Exception as e:
             logger.exception(e)
             crawling_process.status = CrawlingProcess.Status_Failed
             crawling_process.exception = e.__str__()
         finally:
+            Entity.identity_map = None
+            Entity.progress = None
+            progress.flush()
+            if JamendoServiceMixin.archive is not None:
+                JamendoServiceMixin.archive.close()
+                JamendoServiceMixin.archive = None
+            logger.info('SE (Jamendo): Identity map of the crawling process %s' % repr(identity_map))
+            crawling_process.cache_hits += identity_map.hits
+            crawling_process.cache_misses += identity_map.misses
+            logger.info('SE (Jamendo): Calls of the crawling process %s' % repr(JamendoServiceMixin.call_statistics))
             crawling_process.save()
             return crawling_process
 
     @classmethod
-    def __crawl(cls) -> None:
-        """ Performs the crawling process. """
-        JamendoArtistEntity.all_artists()
-        JamendoAlbumEntity.all_albums()
-        JamendoSongEntity.all_songs()
+    def __crawl(cls, crawling_process: CrawlingProcess) -> None:
+        """
+        Performs the crawling process. The phases, which have been completed before the checkpoint of the given
+        crawling process, are skipped. The phase of the checkpoint is continued at the offset of the checkpoint.
+
+        :param crawling_process: the crawling process, which records the checkpoints.
+        """
+        phases = (
+            (CrawlingProcess.Phase_Artists, JamendoArtistEntity.all_artists),
+            (CrawlingProcess.Phase_Albums, JamendoAlbumEntity.all_albums),
+            (CrawlingProcess.Phase_Songs, partial(JamendoSongEntity.all_songs, bulk=True)),
+        )
+        # A delta crawling process is bounded by its execution date, so that a resumed process fetches the same pages.
+        date_range = {}
+        if crawling_process.kind == CrawlingProcess.Kind_Delta and crawling_process.delta_since is not None:
+            date_range = {'since': crawling_process.delta_since, 'until': crawling_process.execution_date}
+        if crawling_process.items_expected is None:
+            crawling_process.items_expected = cls.__count(date_range)
+        start = CrawlingProcess.PHASES.index(crawling_process.phase) if crawling_process.phase else 0
+        for phase, crawl_phase in phases[start:]:
+            offset = crawling_process.offset if phase == crawling_process.phase else 0
+            crawling_process.checkpoint(phase, offset)
+            crawl_phase(offset=offset, checkpoint=partial(crawling_process.checkpoint, phase), **date_range)
+
+    @classmethod
+    def __count(cls, date_range: {str: datetime}) -> int:
+        """
+        Returns the number of artists, albums and songs reported by jamendo, which are going to be crawled.
+
+        :param date_range: the lower bound (since) and upper bound (until) of a delta crawling process or an empty
+                           dictionary for a full crawling process.
+        :return: the number of entities or None, if the number can't be determined (f.e. the pages are replayed).
+        """
+        if JamendoServiceMixin.replay_archive is not None:
+            return None
+        properties = JamendoServiceMixin.date_range(**date_range) if date_range else {}
+        try:
+            return sum(JamendoServiceMixin.count(qualifier, properties) for qualifier in
+                       ('artists', 'albums', 'tracks'))
+        except JamendoCallException as e:
+            logger.warning('SE (Jamendo): The number of entities can\'t be determined (%s).' % e)
+            return None
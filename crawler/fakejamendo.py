@@ -0,0 +1,320 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import json
+import time
+import random
+import threading
+import urllib.parse
+from datetime import date, datetime, timedelta
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+
+class FakeJamendoServer(ThreadingMixIn, HTTPServer):
+    """
+    This class represents a local stand-in for the jamendo web service. It answers the requests for the given entities
+    with the same envelope (headers and results) as jamendo and supports the paging with offset and limit.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, entities: {str: [{str: str}]}, address: (str, int)=('127.0.0.1', 0), latency: float=0.0,
+                 error_rate: float=0.0, seed: int=None):
+        """
+        Initializes the fake jamendo server. The server is not started.
+
+        :param entities: the entities (json dictionaries) served for the qualifiers (f.e. tracks). Instead of a list
+                         of json dictionaries, lazily generated entities (see SyntheticCatalog) can be given.
+        :param address: the address (host, port) of the server. If the port is 0, a free port is chosen.
+        :param latency: the number of seconds, which each request is delayed.
+        :param error_rate: the probability of a request to be answered with the http status 503.
+        :param seed: the seed of the random failures.
+        """
+        super(FakeJamendoServer, self).__init__(address, FakeJamendoRequestHandler)
+        self.entities = entities
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = []
+        self.failures = []
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    def fail_next(self, count: int=1, status: int=503, headers: {str: str}=None) -> None:
+        """
+        The next given number of requests will be answered with the given http status and headers.
+
+        :param count: the number of requests, which shall fail.
+        :param status: the http status of the failed requests.
+        :param headers: the http headers of the failed requests (f.e. Retry-After).
+        """
+        self.failures.extend([(status, headers or {})] * count)
+
+    def next_failure(self) -> (int, {str: str}):
+        """
+        Returns the http status and headers of the failure, with which the next request shall be answered.
+
+        :return: the http status and headers of the failure or None, if the request shall be answered normally.
+        """
+        if self.failures:
+            return self.failures.pop(0)
+        if self.error_rate > 0:
+            with self._random_lock:
+                if self._random.random() < self.error_rate:
+                    return 503, {}
+        return None
+
+    @property
+    def api_url(self) -> str:
+        """
+        Returns the url of the api served by this server, which can be used as api url of the JamendoServiceMixin.
+
+        :return: the url of the api served by this server.
+        """
+        return 'http://%s:%d/v3.0/' % self.server_address[:2]
+
+    def start(self) -> None:
+        """ Starts the server in a background thread. """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stops the server and closes the socket. """
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def response(self, qualifier: str, properties: {str: str}) -> {str: object}:
+        """
+        Returns the response of the jamendo api for the given qualifier and properties.
+
+        :param qualifier: the qualifier of the request (f.e. tracks).
+        :param properties: the properties of the request (f.e. offset).
+        :return: the response as json dictionary with the headers and results.
+        """
+        if qualifier not in self.entities:
+            return {'headers': {'status': 'failed', 'code': 5, 'error_message': 'Unknown method %s' % qualifier,
+                                'results_count': 0}, 'results': []}
+        entities = self.entities[qualifier]
+        if isinstance(entities, SyntheticEntities):
+            entities = entities.select(properties)
+        else:
+            if 'id' in properties:
+                entities = [entity for entity in entities if str(entity['id']) == properties['id']]
+            if 'datebetween' in properties:
+                start, end = properties['datebetween'].split('_')
+                entities = [entity for entity in entities if
+                            start <= (entity.get('releasedate') or entity.get('joindate') or '') <= end]
+        offset = int(properties.get('offset', 0))
+        limit = properties.get('limit', '10')
+        limit = 200 if limit == 'all' else min(int(limit), 200)
+        results = entities[offset:offset + limit]
+        headers = {'status': 'success', 'code': 0, 'error_message': '', 'warnings': '', 'results_count': len(results)}
+        if properties.get('fullcount') == 'true':
+            headers['results_fullcount'] = len(entities)
+        return {'headers': headers, 'results': results}
+
+
+class FakeJamendoRequestHandler(BaseHTTPRequestHandler):
+    """ This class handles the requests to the fake jamendo server. """
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        qualifier = url.path.strip('/').split('/')[-1]
+        properties = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        self.server.requests.append((qualifier, properties))
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        failure = self.server.next_failure()
+        if failure is not None:
+            status, headers = failure
+            self.send_response(status)
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(self.server.response(qualifier, properties)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyntheticEntities(object):
+    """
+    This class represents a sequence of entities of a synthetic catalog, which are generated when they are accessed.
+    The entity at an index is always the same, its jamendo id is the index plus one.
+    """
+
+    def __init__(self, catalog, factory, indices: range, include: [str]=()):
+        """
+        Initializes the sequence of entities.
+
+        :param catalog: the synthetic catalog of the entities.
+        :param factory: the function, which generates the json dictionary of the entity at the given index.
+        :param indices: the indices of the entities in this sequence.
+        :param include: the additional information (f.e. musicinfo), which shall be included in the entities.
+        """
+        self.catalog = catalog
+        self.factory = factory
+        self.indices = indices
+        self.include = include
+
+    def select(self, properties: {str: str}):
+        """
+        Returns the entities of this sequence, which match the id and date range (datebetween) of the given properties
+        and include the requested additional information.
+
+        :param properties: the properties of the request.
+        :return: the selected entities.
+        """
+        indices = self.indices
+        if 'id' in properties:
+            index = int(properties['id']) - 1
+            indices = indices[index:index + 1] if 0 <= index < len(indices) else range(0)
+        if 'datebetween' in properties:
+            start, end = [datetime.strptime(day, '%Y-%m-%d').date() for day in properties['datebetween'].split('_')]
+            count = len(self.indices)
+            indices = range(max(indices.start, self.catalog.first_index(start, count)),
+                            min(indices.stop, self.catalog.first_index(end + timedelta(days=1), count)))
+        return SyntheticEntities(self.catalog, self.factory, indices, properties.get('include', '').split())
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.factory(index, self.include) for index in self.indices[item]]
+        return self.factory(self.indices[item], self.include)
+
+    def __iter__(self):
+        return (self.factory(index, self.include) for index in self.indices)
+
+
+class SyntheticCatalog(object):
+    """
+    This class represents a synthetic jamendo catalog of the given number of tracks. The artists, albums and tracks are
+    generated when they are requested, so that even a catalog of millions of tracks needs no memory. The tracks are
+    grouped into albums and the albums into artists. The release dates are spread over the given number of days in
+    the order of the jamendo ids.
+    """
+
+    GENRES = ('rock', 'pop', 'jazz', 'electronic', 'classical', 'hiphop', 'folk', 'metal', 'ambient', 'blues')
+    INSTRUMENTS = ('guitar', 'piano', 'drums', 'violin', 'synthesizer', 'bass', 'saxophone')
+    VARTAGS = ('happy', 'sad', 'energetic', 'relaxing', 'dark', 'summer', 'love')
+
+    def __init__(self, tracks: int=1000, tracks_per_album: int=10, albums_per_artist: int=3, days: int=3650,
+                 start_date: date=date(2005, 1, 1)):
+        """
+        Initializes the synthetic catalog.
+
+        :param tracks: the number of tracks of the catalog.
+        :param tracks_per_album: the number of tracks of an album.
+        :param albums_per_artist: the number of albums of an artist.
+        :param days: the number of days, over which the release dates are spread.
+        :param start_date: the release date of the first entities.
+        """
+        assert tracks >= 0 and tracks_per_album > 0 and albums_per_artist > 0 and days > 0
+        self.tracks_count = tracks
+        self.tracks_per_album = tracks_per_album
+        self.albums_per_artist = albums_per_artist
+        self.albums_count = -(-tracks // tracks_per_album)
+        self.artists_count = -(-self.albums_count // albums_per_artist)
+        self.days = days
+        self.start_date = start_date
+
+    def entities(self) -> {str: SyntheticEntities}:
+        """
+        Returns the artists, albums and tracks of this catalog, which can be served by the fake jamendo server.
+
+        :return: the artists, albums and tracks of this catalog with the qualifier as key.
+        """
+        return {
+            'artists': SyntheticEntities(self, self.artist, range(self.artists_count)),
+            'albums': SyntheticEntities(self, self.album, range(self.albums_count)),
+            'tracks': SyntheticEntities(self, self.track, range(self.tracks_count)),
+        }
+
+    def date(self, index: int, count: int) -> str:
+        """
+        Returns the (release) date of the entity at the given index of the given number of entities.
+
+        :param index: the index of the entity.
+        :param count: the number of entities of the same kind.
+        :return: the date formatted like jamendo (YYYY-MM-DD).
+        """
+        return (self.start_date + timedelta(days=index * self.days // count)).strftime('%Y-%m-%d')
+
+    def first_index(self, day: date, count: int) -> int:
+        """
+        Returns the index of the first entity of the given number of entities, which has been released on or after the
+        given day.
+
+        :param day: the day of the release.
+        :param count: the number of entities of the same kind.
+        :return: the index of the first entity released on or after the given day.
+        """
+        days = (day - self.start_date).days
+        return 0 if days <= 0 else min(count, -(-days * count // self.days))
+
+    def artist(self, index: int, include: [str]=()) -> {str: object}:
+        """ Returns the json dictionary of the artist at the given index. """
+        jamendo_id = index + 1
+        return {'id': str(jamendo_id), 'name': 'Artist %d' % jamendo_id, 'website': 'http://artist%d.org' % jamendo_id,
+                'joindate': self.date(index, self.artists_count), 'image': '',
+                'shareurl': 'https://www.jamendo.com/artist/%d' % jamendo_id}
+
+    def album(self, index: int, include: [str]=()) -> {str: object}:
+        """ Returns the json dictionary of the album at the given index. """
+        jamendo_id, artist_id = index + 1, index // self.albums_per_artist + 1
+        return {'id': str(jamendo_id), 'name': 'Album %d' % jamendo_id, 'artist_id': str(artist_id),
+                'artist_name': 'Artist %d' % artist_id, 'releasedate': self.date(index, self.albums_count),
+                'image': '', 'shareurl': 'https://www.jamendo.com/album/%d' % jamendo_id}
+
+    def track(self, index: int, include: [str]=()) -> {str: object}:
+        """ Returns the json dictionary of the track at the given index with the given additional information. """
+        jamendo_id, album_id = index + 1, index // self.tracks_per_album + 1
+        artist_id = (album_id - 1) // self.albums_per_artist + 1
+        track = {'id': str(jamendo_id), 'name': 'Track %d' % jamendo_id, 'duration': str(60 + index * 7 % 300),
+                 'artist_id': str(artist_id), 'artist_name': 'Artist %d' % artist_id, 'album_id': str(album_id),
+                 'album_name': 'Album %d' % album_id, 'releasedate': self.date(index, self.tracks_count),
+                 'image': '', 'shareurl': 'https://www.jamendo.com/track/%d' % jamendo_id,
+                 'audio': 'https://storage.jamendo.com/?trackid=%d&format=mp31' % jamendo_id,
+                 'audiodownload': 'https://storage.jamendo.com/download/track/%d/mp32/' % jamendo_id,
+                 'license_ccurl': 'http://creativecommons.org/licenses/by/3.0/'}
+        if 'licenses' in include:
+            track['licenses'] = {'ccnc': str(index % 2 == 1).lower(), 'ccnd': str(index % 4 == 2).lower(),
+                                 'ccsa': str(index % 4 == 0).lower()}
+        if 'musicinfo' in include:
+            track['musicinfo'] = {'vocalinstrumental': 'vocal' if index % 3 else 'instrumental', 'lang': 'en',
+                                  'speed': ('low', 'medium', 'high')[index % 3],
+                                  'tags': {'genres': [self.GENRES[index % len(self.GENRES)]],
+                                           'instruments': [self.INSTRUMENTS[index % len(self.INSTRUMENTS)]],
+                                           'vartags': [self.VARTAGS[index * 3 % len(self.VARTAGS)]]}}
+        if 'stats' in include:
+            track['stats'] = {'rate_downloads_total': index * 13 % 10000, 'rate_listened_total': index * 31 % 100000,
+                              'playlisted': index % 50, 'favorited': index % 100, 'likes': index % 70,
+                              'dislikes': index % 5, 'avgnote': 1 + index % 5, 'notes': index % 20}
+        return track
@@ -0,0 +1,118 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class IdentityMap(object):
+    """
+    This class represents a bounded map of the entities, which have already been resolved during a crawling process. The
+    entities are stored by their kind (f.e. artist) and key (f.e. the jamendo id). If the map is full, the least
+    recently used entity is evicted. The entities, which are stored within a staged block (f.e. a transaction), are
+    only published to the map, if the block succeeds, so that the map never contains entities of a rolled back
+    transaction.
+    """
+
+    ARTIST = 'artist'
+    ALBUM = 'album'
+    SONG = 'song'
+    ARTIST_PROFILE = 'artist-profile'
+    ALBUM_PROFILE = 'album-profile'
+    SONG_PROFILE = 'song-profile'
+    TAG = 'tag'
+    LICENSE = 'license'
+
+    def __init__(self, max_size: int=100000):
+        """
+        Initializes the identity map.
+
+        :param max_size: the maximal number of entities, which are stored in the map.
+        """
+        assert max_size > 0
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entities = OrderedDict()
+        # The entities of the staged blocks, which have not been left yet (the innermost block is the last one).
+        self._staged = []
+
+    def get(self, kind: str, key):
+        """
+        Returns the entity of the given kind with the given key, if it is stored in the map. Otherwise None will be
+        returned.
+
+        :param kind: the kind of the entity (f.e. artist).
+        :param key: the key of the entity (f.e. the jamendo id).
+        :return: the stored entity or None, if it is not stored in the map.
+        """
+        for staged in reversed(self._staged):
+            if (kind, str(key)) in staged:
+                self.hits += 1
+                return staged[(kind, str(key))]
+        try:
+            entity = self._entities[(kind, str(key))]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entities.move_to_end((kind, str(key)))
+        self.hits += 1
+        return entity
+
+    def put(self, kind: str, key, entity) -> None:
+        """
+        Stores the given entity of the given kind with the given key. The least recently used entity will be evicted,
+        if the map is full.
+
+        :param kind: the kind of the entity (f.e. artist).
+        :param key: the key of the entity (f.e. the jamendo id).
+        :param entity: the entity, which shall be stored.
+        """
+        if entity is None or key is None:
+            return
+        if self._staged:
+            self._staged[-1][(kind, str(key))] = entity
+            return
+        self._entities[(kind, str(key))] = entity
+        self._entities.move_to_end((kind, str(key)))
+        while len(self._entities) > self.max_size:
+            self._entities.popitem(last=False)
+            self.evictions += 1
+
+    @contextmanager
+    def staged(self):
+        """
+        Returns a context, in which the stored entities are staged. They are published to the map, if the context is
+        left without an exception, and discarded otherwise. The entities of a nested context are passed to the outer
+        one.
+        """
+        self._staged.append(OrderedDict())
+        try:
+            yield self
+        except BaseException:
+            self._staged.pop()
+            raise
+        entities = self._staged.pop()
+        for (kind, key), entity in entities.items():
+            self.put(kind, key, entity)
+
+    def clear(self) -> None:
+        """ Removes all stored entities. The counters are not reset. """
+        self._entities.clear()
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __repr__(self):
+        return '<%s: %d/%d entities, hits: %d, misses: %d, evictions: %d>' % (
+            type(self).__name__, len(self), self.max_size, self.hits, self.misses, self.evictions)
@@ -0,0 +1,31 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+from django.core.management.base import BaseCommand
+from crawler.worker import CrawlingWorker
+
+
+class Command(BaseCommand):
+    help = 'Executes the planned crawling processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=10,
+                            help='The number of seconds between two polls for planned crawling processes.')
+        parser.add_argument('--exit-when-empty', action='store_true', default=False,
+                            help='Stops the worker as soon as there are no planned crawling processes.')
+
+    def handle(self, *args, **options):
+        worker = CrawlingWorker(poll_interval=options['poll_interval'])
+        try:
+            worker.run(exit_when_empty=options['exit_when_empty'])
+        except KeyboardInterrupt:
+            self.stdout.write('The crawling worker has been stopped.')
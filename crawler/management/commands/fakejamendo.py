@@ -0,0 +1,45 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+from django.core.management.base import BaseCommand
+from crawler.fakejamendo import FakeJamendoServer, SyntheticCatalog
+
+
+class Command(BaseCommand):
+    help = ('Serves a synthetic catalog like the jamendo api. The crawler uses the server, if its url is set as '
+            'API_URL of the JAMENDO_CRAWLER settings.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='The host of the server.')
+        parser.add_argument('--port', type=int, default=8090, help='The port of the server.')
+        parser.add_argument('--tracks', type=int, default=1000000, help='The number of tracks of the catalog.')
+        parser.add_argument('--tracks-per-album', type=int, default=10, help='The number of tracks of an album.')
+        parser.add_argument('--albums-per-artist', type=int, default=3, help='The number of albums of an artist.')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='The number of seconds, which each request is delayed.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='The probability of a request to be answered with the http status 503.')
+        parser.add_argument('--seed', type=int, default=None, help='The seed of the random failures.')
+
+    def handle(self, *args, **options):
+        catalog = SyntheticCatalog(tracks=options['tracks'], tracks_per_album=options['tracks_per_album'],
+                                   albums_per_artist=options['albums_per_artist'])
+        server = FakeJamendoServer(catalog.entities(), address=(options['host'], options['port']),
+                                   latency=options['latency'], error_rate=options['error_rate'], seed=options['seed'])
+        self.stdout.write('Serving %d artists, %d albums and %d tracks at %s' % (
+            catalog.artists_count, catalog.albums_count, catalog.tracks_count, server.api_url))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('The fake jamendo server has been stopped.')
+        finally:
+            server.server_close()
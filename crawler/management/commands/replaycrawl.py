@@ -0,0 +1,37 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+from django.core.management.base import BaseCommand, CommandError
+from crawler.archive import ResponseArchive
+from crawler.crawler import JamendoCrawler, JamendoServiceMixin
+
+
+class Command(BaseCommand):
+    help = 'Executes a crawling process, which replays the archived pages of jamendo instead of fetching them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='The directory of the archive (f.e. ARCHIVE_DIR/process-1).')
+
+    def handle(self, *args, **options):
+        archive = ResponseArchive(options['directory'])
+        if not any(archive.segments(qualifier) for qualifier in ('artists', 'albums', 'tracks')):
+            raise CommandError('There are no archived pages in %s.' % options['directory'])
+        JamendoServiceMixin.replay_archive = archive
+        start = time.time()
+        try:
+            crawling_process = JamendoCrawler.crawl()
+        finally:
+            JamendoServiceMixin.replay_archive = None
+        self.stdout.write('%s: %d entities in %.1f seconds (%s).' % (
+            crawling_process, crawling_process.items_processed, time.time() - start, crawling_process.exception or
+            'no exception'))
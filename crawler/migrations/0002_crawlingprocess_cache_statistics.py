@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='cache_hits',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='cache_misses',
+            field=models.IntegerField(default=0),
+        ),
+    ]
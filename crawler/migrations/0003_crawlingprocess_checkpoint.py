@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0002_crawlingprocess_cache_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='offset',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='phase',
+            field=models.CharField(max_length=20, blank=True, null=True, default=None),
+        ),
+    ]
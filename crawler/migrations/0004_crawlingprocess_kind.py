@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0003_crawlingprocess_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='delta_since',
+            field=models.DateTimeField(blank=True, null=True, default=None),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='kind',
+            field=models.CharField(max_length=20, default='Full'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0004_crawlingprocess_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='albums_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='albums_merged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='artists_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='artists_merged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='db_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='http_calls',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='http_latency_histogram',
+            field=models.CharField(max_length=200, blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='http_time',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='items_expected',
+            field=models.IntegerField(blank=True, null=True, default=None),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='items_per_second',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='pages_fetched',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='songs_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='songs_merged',
+            field=models.IntegerField(default=0),
+        ),
+    ]
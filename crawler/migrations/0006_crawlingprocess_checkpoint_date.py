@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0005_crawlingprocess_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crawlingprocess',
+            name='checkpoint_date',
+            field=models.DateTimeField(blank=True, null=True, default=None),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crawler', '0006_crawlingprocess_checkpoint_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='crawlingprocess',
+            name='execution_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -11,6 +11,7 @@
 #   GNU General Public License for more details.
 #
 from django.db import models
+from django.utils import timezone
 from ccshuffle.serialize import SerializableModel, DeserializableException
 
 from datetime import datetime
@@ -27,17 +28,146 @@ class CrawlingProcess(models.Model, SerializableModel):
     Status_Finished = 'Finished'
     Status_Failed = 'Failed'
 
+    Kind_Full = 'Full'
+    Kind_Delta = 'Delta'
+
+    Phase_Artists = 'artists'
+    Phase_Albums = 'albums'
+    Phase_Songs = 'songs'
+
+    PHASES = (Phase_Artists, Phase_Albums, Phase_Songs)
+
+    # The upper bounds in seconds of the buckets of the latency histogram. The last bucket counts the slower calls.
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    PROGRESS_FIELDS = ('pages_fetched', 'artists_created', 'artists_merged', 'albums_created', 'albums_merged',
+                       'songs_created', 'songs_merged', 'http_calls', 'http_time', 'http_latency_histogram', 'db_time',
+                       'items_expected', 'items_per_second')
+
     service = models.CharField(max_length=100, blank=False)
-    execution_date = models.DateTimeField(blank=False, default=datetime.now)
+    execution_date = models.DateTimeField(blank=False, default=timezone.now)
     status = models.CharField(max_length=100, blank=False)
     exception = models.CharField(max_length=500, blank=True, null=True)
+    # A full crawling process fetches the entire catalog, a delta crawling process only the entities since the given
+    # date (the execution date of the last finished crawling process).
+    kind = models.CharField(max_length=20, blank=False, default=Kind_Full)
+    delta_since = models.DateTimeField(blank=True, null=True, default=None)
+    # Statistics of the identity map used for resolving the crawled entities.
+    cache_hits = models.IntegerField(default=0)
+    cache_misses = models.IntegerField(default=0)
+    # Checkpoint of the crawling process: the current phase and the offset of the next entity, which shall be crawled.
+    phase = models.CharField(max_length=20, blank=True, null=True, default=None)
+    offset = models.IntegerField(default=0)
+    # The date of the last checkpoint, from which on a running crawling process can be considered as stale.
+    checkpoint_date = models.DateTimeField(blank=True, null=True, default=None)
+    # Progress of the crawling process, which is written periodically (see crawler.progress).
+    pages_fetched = models.IntegerField(default=0)
+    artists_created = models.IntegerField(default=0)
+    artists_merged = models.IntegerField(default=0)
+    albums_created = models.IntegerField(default=0)
+    albums_merged = models.IntegerField(default=0)
+    songs_created = models.IntegerField(default=0)
+    songs_merged = models.IntegerField(default=0)
+    http_calls = models.IntegerField(default=0)
+    # The total time in seconds of the calls to jamendo and the number of calls per bucket of LATENCY_BUCKETS (comma
+    # separated).
+    http_time = models.FloatField(default=0)
+    http_latency_histogram = models.CharField(max_length=200, blank=True, default='')
+    # The total time in seconds spent for persisting the fetched pages.
+    db_time = models.FloatField(default=0)
+    # The number of entities reported by jamendo and the number of persisted entities per second.
+    items_expected = models.IntegerField(blank=True, null=True, default=None)
+    items_per_second = models.FloatField(default=0)
+
+    def checkpoint(self, phase: str, offset: int) -> None:
+        """
+        Records the given phase and offset as checkpoint of this crawling process. The checkpoint is written
+        immediately, so it is part of the transaction, in which the page up to the offset has been persisted.
+
+        :param phase: the current phase of the crawling process (see PHASES).
+        :param offset: the offset of the next entity, which shall be crawled in the given phase.
+        """
+        assert phase in self.PHASES
+        self.phase = phase
+        self.offset = offset
+        self.checkpoint_date = timezone.now()
+        self.save(update_fields=['phase', 'offset', 'checkpoint_date'])
+
+    @property
+    def items_processed(self) -> int:
+        """
+        Returns the number of entities, which have been created or merged by this crawling process.
+
+        :return: the number of entities, which have been created or merged by this crawling process.
+        """
+        return (self.artists_created + self.artists_merged + self.albums_created + self.albums_merged +
+                self.songs_created + self.songs_merged)
+
+    @property
+    def latency_histogram(self) -> [int]:
+        """
+        Returns the number of calls to jamendo per bucket of LATENCY_BUCKETS. The last bucket counts the slower calls.
+
+        :return: the number of calls to jamendo per bucket.
+        """
+        if not self.http_latency_histogram:
+            return [0] * (len(self.LATENCY_BUCKETS) + 1)
+        return [int(count) for count in self.http_latency_histogram.split(',')]
+
+    @latency_histogram.setter
+    def latency_histogram(self, histogram: [int]):
+        self.http_latency_histogram = ','.join(str(count) for count in histogram)
+
+    @property
+    def eta(self) -> float:
+        """
+        Returns the estimated number of seconds until this crawling process is finished. The estimation is based on
+        the number of entities reported by jamendo and the current number of persisted entities per second.
+
+        :return: the estimated number of seconds or None, if no estimation is possible.
+        """
+        if self.status != self.Status_Running or self.items_expected is None or self.items_per_second <= 0:
+            return None
+        return max(self.items_expected - self.items_processed, 0) / self.items_per_second
+
+    def progress(self) -> {str: object}:
+        """
+        Returns the progress of this crawling process as json serializable dictionary.
+
+        :return: the progress of this crawling process.
+        """
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'phase': self.phase,
+            'offset': self.offset,
+            'pages_fetched': self.pages_fetched,
+            'created': {'artists': self.artists_created, 'albums': self.albums_created, 'songs': self.songs_created},
+            'merged': {'artists': self.artists_merged, 'albums': self.albums_merged, 'songs': self.songs_merged},
+            'http_calls': self.http_calls,
+            'http_time': self.http_time,
+            'http_latency_histogram': [{'le': bound, 'count': count} for bound, count in
+                                       zip(self.LATENCY_BUCKETS + (None,), self.latency_histogram)],
+            'db_time': self.db_time,
+            'items_processed': self.items_processed,
+            'items_expected': self.items_expected,
+            'items_per_second': self.items_per_second,
+            'eta': self.eta,
+        }
 
     def serialize(self):
         return {
+            'id': self.pk,
             'service': self.service,
             'execution_date': self.execution_date,
             'status': self.status,
             'exception': self.exception,
+            'kind': self.kind,
+            'delta_since': self.delta_since,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'phase': self.phase,
+            'offset': self.offset,
         }
 
     @classmethod
@@ -51,8 +181,16 @@ class CrawlingProcess(models.Model, SerializableModel):
                     execution_date = datetime.strptime(obj['execution_date'], '%Y-%m-%dT%H:%M:%S')
                 elif not isinstance(execution_date, datetime):
                     raise DeserializableException('The given release date can\'t be parsed.')
+                delta_since = obj.get('delta_since')
+                if isinstance(delta_since, str):
+                    delta_since = datetime.strptime(delta_since, '%Y-%m-%dT%H:%M:%S')
+                elif delta_since is not None and not isinstance(delta_since, datetime):
+                    raise DeserializableException('The given date of the delta can\'t be parsed.')
                 return cls(service=obj['service'], execution_date=execution_date, status=obj['status'],
-                           exception=obj['exception'])
+                           exception=obj['exception'], kind=obj.get('kind', cls.Kind_Full), delta_since=delta_since,
+                           cache_hits=int(obj.get('cache_hits', 0)),
+                           cache_misses=int(obj.get('cache_misses', 0)), phase=obj.get('phase'),
+                           offset=int(obj.get('offset', 0)))
             except KeyError as e:
                 raise DeserializableException('The given serialized representation is corrupted.') from e
         else:
@@ -60,4 +198,4 @@ class CrawlingProcess(models.Model, SerializableModel):
                 'The given object %s can\'t be parsed. It is no dictionary or set (%s).' % (repr(obj), type(obj)))
 
     def __str__(self):
-        return '%s (%s - %s)' % (self.execution_date, self.service, self.status)
+        return '%s (%s %s - %s)' % (self.execution_date, self.service, self.kind, self.status)
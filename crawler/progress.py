@@ -0,0 +1,80 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+import threading
+from .models import CrawlingProcess
+
+
+class CrawlingProgress(object):
+    """
+    This class collects the progress of a crawling process: the processed pages, the created and merged entities, the
+    time spent for persisting the pages and the calls to jamendo. The progress is written to the crawling process
+    periodically and not for each entity.
+    """
+
+    def __init__(self, crawling_process: CrawlingProcess, call_statistics, flush_interval: float=5.0):
+        """
+        Initializes the progress of the given crawling process. The progress of a resumed crawling process is
+        continued.
+
+        :param crawling_process: the crawling process, of which the progress is collected.
+        :param call_statistics: the statistics of the calls to jamendo (see JamendoCallStatistics).
+        :param flush_interval: the minimal number of seconds between two writes of the progress.
+        """
+        self.crawling_process = crawling_process
+        self.call_statistics = call_statistics
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._started = self._last_flush = time.time()
+        self._items_processed = crawling_process.items_processed
+        self._http_calls = crawling_process.http_calls
+        self._http_time = crawling_process.http_time
+        self._latency_histogram = crawling_process.latency_histogram
+
+    def entity_persisted(self, kind: str, created: bool, count: int=1) -> None:
+        """
+        Counts the given number of persisted entities of the given kind.
+
+        :param kind: the kind of the entities (artist, album or song, see IdentityMap).
+        :param created: True, if the entities have been created, False if they have been merged with existing ones.
+        :param count: the number of persisted entities.
+        """
+        field = '%ss_%s' % (kind, 'created' if created else 'merged')
+        with self._lock:
+            setattr(self.crawling_process, field, getattr(self.crawling_process, field) + count)
+
+    def page_processed(self, db_time: float) -> None:
+        """
+        Counts a processed page. The progress is written, if the flush interval has elapsed.
+
+        :param db_time: the time in seconds spent for persisting the page.
+        """
+        with self._lock:
+            self.crawling_process.pages_fetched += 1
+            self.crawling_process.db_time += db_time
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Writes the collected progress to the crawling process. """
+        with self._lock:
+            crawling_process = self.crawling_process
+            elapsed = time.time() - self._started
+            if elapsed > 0:
+                crawling_process.items_per_second = (crawling_process.items_processed - self._items_processed) / elapsed
+            crawling_process.http_calls = self._http_calls + self.call_statistics.calls
+            crawling_process.http_time = self._http_time + self.call_statistics.total_latency
+            crawling_process.latency_histogram = [count + new_count for count, new_count in
+                                                  zip(self._latency_histogram, self.call_statistics.latency_histogram)]
+            crawling_process.save(update_fields=CrawlingProcess.PROGRESS_FIELDS)
+            self._last_flush = time.time()
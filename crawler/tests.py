@@ -10,18 +10,29 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #   GNU General Public License for more details.
 #
+import os
+import gzip
 import json
 import sys
+import shutil
+import tempfile
+import time
 import urllib
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils.unittest import skip
 from ccshuffle.serialize import JSONModelEncoder
-from shuffle.models import Song, Artist, Album, Source, License
-from .crawler import (JamendoCrawler, JamendoCallException, JamendoServiceMixin, JamendoArtistEntity, JamendoSongEntity,
-                      JamendoAlbumEntity)
+from shuffle.models import (Song, Artist, Album, Source, License, Tag, JamendoArtistProfile, JamendoAlbumProfile,
+                            JamendoSongProfile, CatalogVersion, SongSearchDocument)
+from .crawler import (Entity, JamendoCrawler, JamendoCallException, JamendoCallStatistics, JamendoServiceMixin,
+                      JamendoArtistEntity, JamendoSongEntity, JamendoAlbumEntity)
+from .identitymap import IdentityMap
+from .archive import ResponseArchive
+from .fakejamendo import FakeJamendoServer, SyntheticCatalog
 from .models import CrawlingProcess
+from .worker import CrawlingWorker
 
 
 class ModelTest(TestCase):
@@ -232,3 +243,554 @@ class JamendoCrawlerTest(TestCase):
         self.assertEqual('Failed', p.status, 'The last crawling must have been failed.')
         self.assertIn('Your credential is not authorized.', p.exception,
                       'The exception message must contain \' Your credential is not authorized. \'')
+
+
+class JamendoSongBulkTest(TestCase):
+    """ Tests the bulk persistence of a page of songs received from jamendo (no connection to jamendo needed). """
+
+    def setUp(self):
+        self.artist = Artist.objects.create(name='Jasmine Jordan', jamendo_profile=JamendoArtistProfile.objects.create(
+            jamendo_id=371179, name='Jasmine Jordan'))
+        self.album = Album.objects.create(name='Time Travel EP', artist=self.artist,
+                                          jamendo_profile=JamendoAlbumProfile.objects.create(jamendo_id=145279,
+                                                                                             name='Time Travel EP'))
+        self.songs_json = [self.__song_json(1230403, 'Possibilities', ['pop', 'rnb'], ['happy', 'dream'], ccsa='true'),
+                           self.__song_json(1230404, 'Time Travel', ['pop'], ['peaceful'], ccnd='true'),
+                           self.__song_json(1230405, 'Grooving', [], [], ccnc='false')]
+
+    @staticmethod
+    def __song_json(jamendo_id, name, genres, vartags, ccnc='true', ccnd='false', ccsa='false'):
+        """ Returns a song as it is received from jamendo as json dictionary. """
+        return {
+            'id': str(jamendo_id),
+            'name': name,
+            'duration': '214',
+            'artist_id': '371179',
+            'artist_name': 'Jasmine Jordan',
+            'album_id': '145279',
+            'album_name': 'Time Travel EP',
+            'releasedate': '2015-07-03',
+            'image': 'https://imgjam.com/albums/s145/145279/covers/1.200.jpg',
+            'shareurl': 'https://www.jamendo.com/track/%s' % jamendo_id,
+            'audio': 'https://storage.jamendo.com/?trackid=%s&format=mp31' % jamendo_id,
+            'audiodownload': 'https://storage.jamendo.com/download/track/%s/mp32/' % jamendo_id,
+            'licenses': {'ccnc': ccnc, 'ccnd': ccnd, 'ccsa': ccsa},
+            'musicinfo': {'tags': {'genres': genres, 'instruments': [], 'vartags': vartags}},
+        }
+
+    @staticmethod
+    def __snapshot():
+        """ Returns the persisted songs with their profile, relations, tags and sources in a comparable form. """
+        return sorted((song.jamendo_id, song.name, song.artist_id, song.album_id, song.license.type, song.duration,
+                       str(song.release_date), song.cover, song.jamendo_profile.cover,
+                       song.jamendo_profile.external_link, tuple(sorted(song.tags_names)),
+                       tuple(sorted((s.type, s.codec, s.link) for s in song.sources()))) for song in Song.objects.all())
+
+    @staticmethod
+    def __clear():
+        """ Removes all songs including their profiles, tags and sources. """
+        Source.objects.all().delete()
+        Song.objects.all().delete()
+        Tag.objects.all().delete()
+        JamendoSongProfile.objects.all().delete()
+
+    def test_persist_bulk_equals_per_entity(self):
+        """ Tests if the bulk persistence of a page results in the same state as the per entity persistence. """
+        for song_json in self.songs_json:
+            JamendoSongEntity.new_by_json(song_json).sync_and_persist()
+        per_entity_snapshot = self.__snapshot()
+        self.__clear()
+        songs = JamendoSongEntity.persist_bulk(self.songs_json)
+        self.assertListEqual([song.name for song in songs], ['Possibilities', 'Time Travel', 'Grooving'],
+                             'The persisted songs must be returned in the order of the page.')
+        self.assertListEqual(self.__snapshot(), per_entity_snapshot,
+                             'The bulk persistence must result in the same state as the per entity persistence.')
+
+    def test_persist_bulk_merge(self):
+        """ Tests if the bulk persistence merges a page with the already persisted songs. """
+        songs = JamendoSongEntity.persist_bulk(self.songs_json)
+        self.songs_json[0]['musicinfo']['tags']['vartags'].append('groove')
+        self.songs_json[1]['shareurl'] = 'https://www.jamendo.com/track/1230404/time-travel'
+        merged_songs = JamendoSongEntity.persist_bulk(self.songs_json)
+        self.assertListEqual([song.id for song in merged_songs], [song.id for song in songs],
+                             'The ids of the already persisted songs must stay the same.')
+        self.assertEqual(Song.objects.count(), 3, 'No song must be persisted twice.')
+        self.assertEqual(Source.objects.count(), 6, 'No source must be persisted twice.')
+        self.assertIn('groove', merged_songs[0].tags_names, 'The new tag must be linked to the song.')
+        self.assertEqual(JamendoSongProfile.objects.get(jamendo_id=1230404).external_link,
+                         'https://www.jamendo.com/track/1230404/time-travel', 'The profile must be updated.')
+
+    def test_persist_with_identity_map(self):
+        """ Tests if the entities are resolved with the identity map of the crawling process, if one is given. """
+        Entity.identity_map = IdentityMap(max_size=100)
+        try:
+            JamendoSongEntity.persist_bulk(self.songs_json)
+            with self.assertNumQueries(0):
+                self.assertEqual(JamendoArtistEntity.get_or_create(jamendo_id='371179').id, self.artist.id,
+                                 'The artist must be resolved with the identity map.')
+                self.assertEqual(JamendoAlbumEntity.get_or_create(jamendo_id='145279').id, self.album.id,
+                                 'The album must be resolved with the identity map.')
+            JamendoSongEntity.new_by_json(self.__song_json(1230406, 'After', ['pop'], ['happy'])).sync_and_persist()
+            self.assertGreater(Entity.identity_map.hits, 0, 'The identity map must have been hit.')
+        finally:
+            Entity.identity_map = None
+        self.assertListEqual(sorted(Song.objects.get(jamendo_profile__jamendo_id=1230406).tags_names),
+                             ['happy', 'pop'], 'The tags resolved with the identity map must be linked to the song.')
+
+    def test_get_or_create_song_by_jamendo_id(self):
+        """ Tests if a persisted song is looked up by its jamendo id and stored in the identity map. """
+        JamendoSongEntity.persist_bulk(self.songs_json)
+        Entity.identity_map = IdentityMap(max_size=100)
+        try:
+            song = JamendoSongEntity.get_or_create(jamendo_id='1230404')
+            self.assertEqual(song.name, 'Time Travel', 'The song must be looked up by the jamendo id of its profile.')
+            with self.assertNumQueries(0):
+                self.assertEqual(JamendoSongEntity.get_or_create(jamendo_id='1230404').id, song.id,
+                                 'The song must be stored in the identity map.')
+        finally:
+            Entity.identity_map = None
+
+
+class IdentityMapTest(TestCase):
+    """ Tests the identity map, which is used for resolving the crawled entities. """
+
+    def test_hits_and_misses(self):
+        """ Tests if the hits and misses of the identity map are counted. """
+        identity_map = IdentityMap(max_size=10)
+        self.assertIsNone(identity_map.get(IdentityMap.ARTIST, 1), 'The artist has not been stored.')
+        identity_map.put(IdentityMap.ARTIST, 1, 'Jasmine Jordan')
+        self.assertEqual(identity_map.get(IdentityMap.ARTIST, '1'), 'Jasmine Jordan',
+                         'The artist must be returned for the jamendo id as string or integer.')
+        self.assertIsNone(identity_map.get(IdentityMap.ALBUM, 1), 'The kind of the entity must be distinguished.')
+        self.assertEqual(identity_map.hits, 1, 'The identity map must have been hit once.')
+        self.assertEqual(identity_map.misses, 2, 'The identity map must have been missed twice.')
+
+    def test_lru_eviction(self):
+        """ Tests if the least recently used entity is evicted, if the identity map is full. """
+        identity_map = IdentityMap(max_size=2)
+        identity_map.put(IdentityMap.TAG, 'rock', 1)
+        identity_map.put(IdentityMap.TAG, 'pop', 2)
+        identity_map.get(IdentityMap.TAG, 'rock')
+        identity_map.put(IdentityMap.TAG, 'jazz', 3)
+        self.assertEqual(len(identity_map), 2, 'The identity map must not exceed its maximal size.')
+        self.assertIsNone(identity_map.get(IdentityMap.TAG, 'pop'), 'The least recently used tag must be evicted.')
+        self.assertEqual(identity_map.get(IdentityMap.TAG, 'rock'), 1, 'The recently used tag must not be evicted.')
+        self.assertEqual(identity_map.evictions, 1, 'One eviction must have been counted.')
+
+    def test_staged(self):
+        """ Tests if the staged entities are only published, if the staged block succeeds. """
+        identity_map = IdentityMap(max_size=10)
+        with identity_map.staged():
+            identity_map.put(IdentityMap.TAG, 'rock', 1)
+            self.assertEqual(identity_map.get(IdentityMap.TAG, 'rock'), 1, 'The staged tag must be visible.')
+        self.assertEqual(identity_map.get(IdentityMap.TAG, 'rock'), 1, 'The tag must be published after the block.')
+        with self.assertRaises(ValueError):
+            with identity_map.staged():
+                identity_map.put(IdentityMap.TAG, 'pop', 2)
+                with identity_map.staged():
+                    identity_map.put(IdentityMap.TAG, 'jazz', 3)
+                raise ValueError('rollback')
+        self.assertIsNone(identity_map.get(IdentityMap.TAG, 'pop'), 'The tag of the failed block must be discarded.')
+        self.assertIsNone(identity_map.get(IdentityMap.TAG, 'jazz'), 'The tag of the nested block must be discarded.')
+        self.assertEqual(len(identity_map), 1, 'Only the tag of the succeeded block must be stored.')
+
+
+class JamendoServiceMixinTest(TestCase):
+    """ Tests the communication with the jamendo service using a local fake jamendo server. """
+
+    def setUp(self):
+        self.tracks = [{'id': str(jamendo_id), 'name': 'Track %d' % jamendo_id} for jamendo_id in range(1, 451)]
+        self.server = FakeJamendoServer({'tracks': self.tracks, 'albums': []})
+        self.server.start()
+        self.api_url = JamendoServiceMixin.api_url
+        self.backoff_factor = JamendoServiceMixin.backoff_factor
+        JamendoServiceMixin.api_url = self.server.api_url
+        JamendoServiceMixin.backoff_factor = 0.01
+        JamendoServiceMixin.call_statistics = JamendoCallStatistics()
+
+    def tearDown(self):
+        JamendoServiceMixin.api_url = self.api_url
+        JamendoServiceMixin.backoff_factor = self.backoff_factor
+        self.server.stop()
+
+    def test_all_query(self):
+        """ Tests if all pages are fetched one after another, if no pages shall be fetched ahead. """
+        tracks = JamendoServiceMixin.all_query('tracks', prefetch=0)
+        self.assertListEqual(tracks, self.tracks, 'All tracks must be fetched in the order of jamendo.')
+
+    def test_all_query_prefetch(self):
+        """ Tests if all pages are fetched and processed in order, if the pages are fetched ahead. """
+        processed_pages = []
+
+        def process(tracks):
+            processed_pages.append([track['id'] for track in tracks])
+            return [track['name'] for track in tracks]
+
+        track_names = JamendoServiceMixin.all_query('tracks', offset=50, process=process, prefetch=3)
+        self.assertListEqual(track_names, [track['name'] for track in self.tracks[50:]],
+                             'All tracks from the given offset must be processed in the order of jamendo.')
+        self.assertListEqual([len(page) for page in processed_pages], [200, 200],
+                             'The pages must be processed in the order of their offset.')
+        self.assertLessEqual(len(self.server.requests), 2 + 1 + 3,
+                             'At most the given number of pages must be fetched after the empty page.')
+
+    def test_all_query_prefetch_empty(self):
+        """ Tests if the pipelined query stops at the first empty page. """
+        self.assertListEqual(JamendoServiceMixin.all_query('albums', prefetch=2), [],
+                             'No album must be returned for an empty result.')
+
+    def test_all_query_prefetch_fails(self):
+        """ Tests if a failed call of a fetched page is raised while processing the pages. """
+        self.assertRaises(JamendoCallException, JamendoServiceMixin.all_query, 'artists', prefetch=2)
+
+    def test_json_call_retry(self):
+        """ Tests if a call, which failed because of a server error, is retried. """
+        self.server.fail_next(2, status=503)
+        response = JamendoServiceMixin.json_call('tracks', {'id': '7'})
+        self.assertEqual(response['results'][0]['name'], 'Track 7', 'The call must succeed after the retries.')
+        self.assertEqual(JamendoServiceMixin.call_statistics.calls, 1, 'One call must be recorded.')
+        self.assertEqual(JamendoServiceMixin.call_statistics.retries, 2, 'Two retries must be recorded.')
+
+    def test_json_call_retry_after(self):
+        """ Tests if the Retry-After header of a rate limited call is honored. """
+        self.server.fail_next(1, status=429, headers={'Retry-After': '1'})
+        start = time.time()
+        JamendoServiceMixin.json_call('tracks', {'id': '7'})
+        self.assertGreaterEqual(time.time() - start, 1.0, 'The call must be retried after the requested time.')
+
+    def test_json_call_retries_exceeded(self):
+        """ Tests if a JamendoCallException is raised, if the call fails more often than it may be retried. """
+        self.server.fail_next(JamendoServiceMixin.max_retries + 1, status=500)
+        self.assertRaises(JamendoCallException, JamendoServiceMixin.json_call, 'tracks', {'id': '7'})
+        self.assertEqual(JamendoServiceMixin.call_statistics.failures, 1, 'The failed call must be recorded.')
+
+
+class FakeJamendoTestCase(TestCase):
+    """ Base class of the tests, which crawl a small catalog from a local fake jamendo server. """
+
+    server_class = FakeJamendoServer
+
+    def setUp(self):
+        artists = [{'id': str(aid), 'name': 'Artist %d' % aid, 'website': 'http://artist%d.org' % aid,
+                    'image': '', 'joindate': '2015-07-03', 'shareurl': 'https://www.jamendo.com/artist/%d' % aid}
+                   for aid in (1, 2)]
+        albums = [{'id': str(aid), 'name': 'Album %d' % aid, 'artist_id': str(aid), 'artist_name': 'Artist %d' % aid,
+                   'releasedate': '2015-07-03', 'image': '', 'shareurl': 'https://www.jamendo.com/album/%d' % aid}
+                  for aid in (1, 2)]
+        tracks = [{'id': str(tid), 'name': 'Track %d' % tid, 'duration': '180', 'artist_id': str(tid % 2 + 1),
+                   'artist_name': 'Artist %d' % (tid % 2 + 1), 'album_id': str(tid % 2 + 1),
+                   'album_name': 'Album %d' % (tid % 2 + 1), 'releasedate': '2015-07-03', 'image': '',
+                   'shareurl': 'https://www.jamendo.com/track/%d' % tid,
+                   'audio': 'https://storage.jamendo.com/?trackid=%d&format=mp31' % tid,
+                   'audiodownload': 'https://storage.jamendo.com/download/track/%d/mp32/' % tid,
+                   'licenses': {'ccnc': 'false', 'ccnd': 'false', 'ccsa': 'true'},
+                   'musicinfo': {'tags': {'genres': ['rock'], 'instruments': [], 'vartags': []}}}
+                  for tid in range(1, 8)]
+        self.server = self.server_class({'artists': artists, 'albums': albums, 'tracks': tracks})
+        self.server.start()
+        self.settings = (JamendoServiceMixin.api_url, JamendoServiceMixin.prefetch_pages, JamendoServiceMixin.page_size)
+        JamendoServiceMixin.api_url = self.server.api_url
+        JamendoServiceMixin.prefetch_pages = 1
+        JamendoServiceMixin.page_size = 3
+
+    def tearDown(self):
+        JamendoServiceMixin.api_url, JamendoServiceMixin.prefetch_pages, JamendoServiceMixin.page_size = self.settings
+        self.server.stop()
+
+
+class InterruptedJamendoServer(FakeJamendoServer):
+    """ Fake jamendo server, which fails for tracks behind the given offset as long as it is interrupted. """
+
+    interrupted_offset = None
+
+    def response(self, qualifier, properties):
+        if qualifier == 'tracks' and self.interrupted_offset is not None and int(
+                properties.get('offset', 0)) >= self.interrupted_offset:
+            return {'headers': {'status': 'failed', 'code': 1, 'error_message': 'Interrupted',
+                                'results_count': 0}, 'results': []}
+        return super(InterruptedJamendoServer, self).response(qualifier, properties)
+
+
+class JamendoCrawlerResumeTest(FakeJamendoTestCase):
+    """ Tests the checkpoints and the resumption of crawling processes using a local fake jamendo server. """
+
+    server_class = InterruptedJamendoServer
+
+    def test_crawl_checkpoint(self):
+        """ Tests if the checkpoint of a crawling process is recorded after each page. """
+        self.server.interrupted_offset = 6
+        crawling_process = JamendoCrawler.crawl()
+        self.assertEqual(crawling_process.status, CrawlingProcess.Status_Failed, 'The crawling process must fail.')
+        self.assertEqual(crawling_process.phase, CrawlingProcess.Phase_Songs, 'The songs must have been crawled.')
+        self.assertEqual(crawling_process.offset, 6, 'The two pages of songs before the failure must be recorded.')
+        self.assertEqual(Song.objects.count(), 6, 'The songs of the two pages must be persisted.')
+
+    def test_crawl_catalog_version(self):
+        """ Tests if the version of the catalog is increased with each persisted page. """
+        self.server.interrupted_offset = 6
+        version = CatalogVersion.current()
+        JamendoCrawler.crawl()
+        song_pages_version = CatalogVersion.current()
+        self.assertGreaterEqual(song_pages_version - version, 2,
+                                'The version must be increased for each page (also before the interruption).')
+        self.server.interrupted_offset = None
+        JamendoCrawler.resume()
+        self.assertGreater(CatalogVersion.current(), song_pages_version)
+        self.assertEqual(SongSearchDocument.objects.count(), Song.objects.count(),
+                         'The search documents of the crawled songs must be persisted.')
+        for document in SongSearchDocument.objects.select_related('song__artist'):
+            self.assertEqual(document.name, document.song.name.lower())
+            self.assertEqual(document.artist_name, document.song.artist.name.lower())
+            self.assertListEqual(document.tag_names, sorted(name.lower() for name in document.song.tags_names))
+
+    def test_resume(self):
+        """ Tests if a failed crawling process is resumed at its checkpoint. """
+        self.server.interrupted_offset = 3
+        failed_process = JamendoCrawler.crawl()
+        self.server.interrupted_offset = None
+        self.server.requests.clear()
+        resumed_process = JamendoCrawler.resume()
+        self.assertEqual(resumed_process.pk, failed_process.pk, 'The failed crawling process must be resumed.')
+        self.assertEqual(resumed_process.status, CrawlingProcess.Status_Finished, 'The crawling process must finish.')
+        self.assertEqual(Song.objects.count(), 7, 'All songs must be persisted.')
+        self.assertListEqual(sorted(set(qualifier for qualifier, _ in self.server.requests)), ['tracks'],
+                             'The completed phases (artists, albums) must not be crawled again.')
+        self.assertEqual(min(int(properties['offset']) for _, properties in self.server.requests), 3,
+                         'The songs must be crawled from the checkpoint on.')
+
+    def test_resume_running(self):
+        """ Tests if a running crawling process is only resumed, if it has not recorded a checkpoint for a while. """
+        self.server.interrupted_offset = 3
+        interrupted_process = JamendoCrawler.crawl()
+        CrawlingProcess.objects.filter(pk=interrupted_process.pk).update(
+            status=CrawlingProcess.Status_Running, checkpoint_date=datetime.now(timezone.utc))
+        CrawlingProcess.objects.create(service=CrawlingProcess.Service_Jamendo, status=CrawlingProcess.Status_Planned)
+        self.server.interrupted_offset = None
+        new_process = JamendoCrawler.resume()
+        self.assertNotEqual(new_process.pk, interrupted_process.pk,
+                            'A running crawling process with a recent checkpoint must not be resumed.')
+        self.assertEqual(CrawlingProcess.objects.get(pk=interrupted_process.pk).status,
+                         CrawlingProcess.Status_Running)
+        CrawlingProcess.objects.filter(pk=interrupted_process.pk).update(
+            checkpoint_date=datetime.now(timezone.utc) - timedelta(seconds=JamendoCrawler.stale_timeout + 1))
+        resumed_process = JamendoCrawler.resume()
+        self.assertEqual(resumed_process.pk, interrupted_process.pk, 'A stale crawling process must be resumed.')
+        self.assertEqual(resumed_process.status, CrawlingProcess.Status_Finished)
+
+    def test_resume_finished(self):
+        """ Tests if a new crawling process is started, if the last crawling process has been finished. """
+        finished_process = JamendoCrawler.crawl()
+        self.assertEqual(finished_process.status, CrawlingProcess.Status_Finished, 'The crawling process must finish.')
+        self.assertNotEqual(JamendoCrawler.resume().pk, finished_process.pk, 'A new crawling process must be started.')
+
+    def test_delta_crawl(self):
+        """ Tests if a delta crawling process only fetches the entities since the last finished crawling process. """
+        last_execution_date = datetime(2015, 7, 1, 12, 0, tzinfo=timezone.utc)
+        CrawlingProcess.objects.create(service=CrawlingProcess.Service_Jamendo, status=CrawlingProcess.Status_Finished,
+                                       execution_date=last_execution_date)
+        self.server.entities['tracks'][0]['releasedate'] = '2014-01-01'
+        delta_process = JamendoCrawler.crawl(delta=True)
+        self.assertEqual(delta_process.status, CrawlingProcess.Status_Finished, 'The crawling process must finish.')
+        self.assertEqual(delta_process.kind, CrawlingProcess.Kind_Delta, 'The crawling process must be a delta.')
+        self.assertEqual(delta_process.delta_since, last_execution_date,
+                         'The delta must start at the execution date of the last finished crawling process.')
+        self.assertEqual(Song.objects.count(), 6, 'Only the songs released since the last crawl must be persisted.')
+        for qualifier, properties in self.server.requests:
+            if 'id' not in properties:
+                self.assertTrue(properties.get('datebetween', '').startswith('2015-07-01_'),
+                                'The %s must be restricted to the date range of the delta.' % qualifier)
+
+    def test_delta_crawl_fallback(self):
+        """ Tests if a full crawling process is started, if a delta is requested without a finished process. """
+        crawling_process = JamendoCrawler.crawl(delta=True)
+        self.assertEqual(crawling_process.kind, CrawlingProcess.Kind_Full, 'The crawling process must be full.')
+        self.assertIsNone(crawling_process.delta_since)
+        self.assertEqual(Song.objects.count(), 7, 'All songs must be persisted.')
+        self.assertFalse(any('datebetween' in properties for _, properties in self.server.requests),
+                         'A full crawling process must not be restricted to a date range.')
+
+
+class CrawlingWorkerTest(FakeJamendoTestCase):
+    """ Tests the planning of crawling processes and their execution by the crawling worker. """
+
+    def test_enqueue(self):
+        """ Tests if the dashboard only plans the crawling process instead of executing it. """
+        User.objects.create_superuser('crawler-admin', 'admin@ccshuffle.org', 'secret')
+        self.client.login(username='crawler-admin', password='secret')
+        response = self.client.get('/crawler/', {'command': 'start-jamendo-delta-crawl'},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest', follow=True)
+        self.assertEqual(response.status_code, 200)
+        crawling_process = CrawlingProcess.objects.get()
+        self.assertEqual(crawling_process.status, CrawlingProcess.Status_Planned, 'The process must be planned.')
+        self.assertEqual(crawling_process.kind, CrawlingProcess.Kind_Delta, 'The process must be a delta.')
+        self.assertListEqual(self.server.requests, [], 'The dashboard must not crawl the jamendo service.')
+        response = self.client.get('/crawler/', {'command': 'crawling-process-status', 'ids': str(crawling_process.pk)},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest', follow=True)
+        self.assertListEqual(json.loads(response.content.decode('utf-8'))['result'],
+                             [{'id': crawling_process.pk, 'status': CrawlingProcess.Status_Planned,
+                               'exception': None}])
+
+    def test_claim(self):
+        """ Tests if the planned crawling processes are claimed once in the order of their planning. """
+        first_process = JamendoCrawler.enqueue()
+        second_process = JamendoCrawler.enqueue()
+        self.assertEqual(CrawlingWorker.claim().pk, first_process.pk, 'The oldest process must be claimed first.')
+        self.assertEqual(CrawlingWorker.claim().pk, second_process.pk, 'The next process must be claimed.')
+        self.assertIsNone(CrawlingWorker.claim(), 'There must be no planned crawling process left.')
+        self.assertEqual(CrawlingProcess.objects.filter(status=CrawlingProcess.Status_Running).count(), 2,
+                         'The claimed crawling processes must be marked as running.')
+
+    def test_run(self):
+        """ Tests if the worker executes the planned crawling processes and records their status. """
+        JamendoCrawler.enqueue()
+        CrawlingProcess.objects.create(service=CrawlingProcess.Service_CCMixter, status=CrawlingProcess.Status_Planned)
+        CrawlingWorker(poll_interval=0).run(exit_when_empty=True)
+        self.assertEqual(CrawlingProcess.objects.get(service=CrawlingProcess.Service_Jamendo).status,
+                         CrawlingProcess.Status_Finished, 'The jamendo crawling process must be finished.')
+        self.assertEqual(Song.objects.count(), 7, 'All songs must be persisted.')
+        self.assertEqual(CrawlingProcess.objects.get(service=CrawlingProcess.Service_CCMixter).status,
+                         CrawlingProcess.Status_Failed, 'A process of a service without crawler must fail.')
+
+
+class CrawlingProgressTest(FakeJamendoTestCase):
+    """ Tests the progress, which is recorded for a crawling process. """
+
+    def test_progress(self):
+        """ Tests if the pages, the created and merged entities and the calls are counted. """
+        crawling_process = CrawlingProcess.objects.get(pk=JamendoCrawler.crawl().pk)
+        self.assertEqual(crawling_process.pages_fetched, 5, 'One page of artists and albums, three pages of songs.')
+        self.assertEqual((crawling_process.artists_created, crawling_process.albums_created,
+                          crawling_process.songs_created), (2, 2, 7), 'All entities must be counted as created.')
+        self.assertEqual(crawling_process.items_processed, 11)
+        self.assertEqual(crawling_process.items_expected, 11, 'The expected entities must be reported by jamendo.')
+        self.assertEqual(crawling_process.http_calls, len(self.server.requests), 'All calls must be counted.')
+        self.assertEqual(sum(crawling_process.latency_histogram), crawling_process.http_calls,
+                         'All calls must be counted in the latency histogram.')
+        self.assertGreater(crawling_process.db_time, 0)
+        self.assertIsNone(crawling_process.eta, 'A finished crawling process has no estimated time left.')
+        crawling_process = CrawlingProcess.objects.get(pk=JamendoCrawler.crawl().pk)
+        self.assertEqual((crawling_process.artists_merged, crawling_process.albums_merged,
+                          crawling_process.songs_merged), (2, 2, 7), 'All entities must be counted as merged.')
+
+    def test_progress_endpoint(self):
+        """ Tests if the progress of a crawling process is returned by the json endpoint. """
+        crawling_process = JamendoCrawler.crawl()
+        User.objects.create_superuser('crawler-admin', 'admin@ccshuffle.org', 'secret')
+        self.client.login(username='crawler-admin', password='secret')
+        response = self.client.get('/crawler/progress/%d/' % crawling_process.pk, follow=True)
+        self.assertEqual(response.status_code, 200)
+        progress = json.loads(response.content.decode('utf-8'))['result']
+        self.assertEqual(progress['id'], crawling_process.pk)
+        self.assertEqual(progress['status'], CrawlingProcess.Status_Finished)
+        self.assertDictEqual(progress['created'], {'artists': 2, 'albums': 2, 'songs': 7})
+        self.assertEqual(len(progress['http_latency_histogram']), len(CrawlingProcess.LATENCY_BUCKETS) + 1)
+
+
+class ResponseArchiveTest(FakeJamendoTestCase):
+    """ Tests the archive of the pages received from jamendo and the replay of the archived pages. """
+
+    def setUp(self):
+        super(ResponseArchiveTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.archive_dir = JamendoCrawler.archive_dir
+
+    def tearDown(self):
+        JamendoCrawler.archive_dir = self.archive_dir
+        shutil.rmtree(self.directory)
+        super(ResponseArchiveTest, self).tearDown()
+
+    @staticmethod
+    def page(offset, count):
+        return {'headers': {'status': 'success', 'results_count': count},
+                'results': [{'id': str(offset + i)} for i in range(count)]}
+
+    def test_pages(self):
+        """ Tests if the archived pages are returned in the order of their offset and only once. """
+        archive = ResponseArchive(self.directory, segment_pages=2)
+        for offset in (0, 3, 6, 3, 6, 9):
+            archive.append('tracks', offset, {'limit': 3}, self.page(offset, 3))
+        archive.append('albums', 0, {'limit': 3}, self.page(0, 1))
+        archive.close()
+        self.assertEqual(len(archive.segments('tracks')), 3, 'The segments must hold at most two pages.')
+        self.assertListEqual([offset for offset, _ in archive.pages('tracks')], [0, 3, 6, 9])
+        self.assertListEqual([offset for offset, _ in archive.pages('tracks', offset=5)], [6, 9])
+        self.assertListEqual([response['results'] for _, response in archive.pages('albums')], [[{'id': '0'}]])
+
+    def test_truncated_segment(self):
+        """ Tests if a truncated segment (f.e. of an interrupted crawling process) is read up to the last page. """
+        archive = ResponseArchive(self.directory)
+        archive.append('tracks', 0, {'limit': 3}, self.page(0, 3))
+        archive.close()
+        with gzip.open(archive.segments('tracks')[0], 'at', encoding='utf-8') as segment:
+            segment.write('{"qualifier": "tracks", "offset": 3, "prop')
+        self.assertListEqual([offset for offset, _ in archive.pages('tracks')], [0])
+
+    def test_replay(self):
+        """ Tests if a crawling process replays the archived pages without calling jamendo. """
+        JamendoCrawler.archive_dir = self.directory
+        crawling_process = JamendoCrawler.crawl()
+        self.assertEqual(crawling_process.status, CrawlingProcess.Status_Finished, 'The crawling process must finish.')
+        Song.objects.all().delete()
+        Album.objects.all().delete()
+        Artist.objects.all().delete()
+        self.server.requests.clear()
+        JamendoServiceMixin.replay_archive = ResponseArchive(os.path.join(self.directory,
+                                                                          'process-%d' % crawling_process.pk))
+        try:
+            replayed_process = JamendoCrawler.crawl()
+        finally:
+            JamendoServiceMixin.replay_archive = None
+        self.assertEqual(replayed_process.status, CrawlingProcess.Status_Finished, 'The replay must finish.')
+        self.assertEqual((Artist.objects.count(), Album.objects.count(), Song.objects.count()), (2, 2, 7),
+                         'All entities must be replayed.')
+        self.assertListEqual(self.server.requests, [], 'The replay must not call jamendo.')
+
+
+class SyntheticCatalogTest(TestCase):
+    """ Tests the synthetic catalog and the latency and error injection of the fake jamendo server. """
+
+    def setUp(self):
+        self.settings = (JamendoServiceMixin.api_url, JamendoServiceMixin.max_retries,
+                         JamendoServiceMixin.backoff_factor)
+        JamendoServiceMixin.max_retries = 1
+        JamendoServiceMixin.backoff_factor = 0.01
+
+    def tearDown(self):
+        JamendoServiceMixin.api_url, JamendoServiceMixin.max_retries, JamendoServiceMixin.backoff_factor = self.settings
+
+    def test_catalog(self):
+        """ Tests if the entities of a large catalog are generated on demand and can be selected. """
+        catalog = SyntheticCatalog(tracks=1000000, tracks_per_album=10, albums_per_artist=4)
+        entities = catalog.entities()
+        self.assertEqual((len(entities['artists']), len(entities['albums']), len(entities['tracks'])),
+                         (25000, 100000, 1000000))
+        track = entities['tracks'].select({'id': '123457', 'include': 'musicinfo licenses'})[0]
+        self.assertEqual((track['id'], track['album_id'], track['artist_id']), ('123457', '12346', '3087'))
+        self.assertIn('musicinfo', track)
+        self.assertIn('licenses', track)
+        self.assertNotIn('stats', track)
+        selected = entities['tracks'].select({'datebetween': '2010-01-01_2010-01-31'})
+        self.assertGreater(len(selected), 0)
+        self.assertTrue(all('2010-01-01' <= track['releasedate'] <= '2010-01-31' for track in
+                            (selected[0], selected[len(selected) - 1])))
+        self.assertLess(entities['tracks'][selected.indices.start - 1]['releasedate'], '2010-01-01')
+        self.assertGreater(entities['tracks'][selected.indices.stop]['releasedate'], '2010-01-31')
+
+    def test_crawl_catalog(self):
+        """ Tests if a synthetic catalog can be crawled from the fake jamendo server. """
+        catalog = SyntheticCatalog(tracks=25, tracks_per_album=5, albums_per_artist=2)
+        with FakeJamendoServer(catalog.entities()) as server:
+            JamendoServiceMixin.api_url = server.api_url
+            crawling_process = JamendoCrawler.crawl()
+        self.assertEqual(crawling_process.status, CrawlingProcess.Status_Finished, 'The crawling process must finish.')
+        self.assertEqual(crawling_process.items_expected, 3 + 5 + 25)
+        self.assertEqual((Artist.objects.count(), Album.objects.count(), Song.objects.count()), (3, 5, 25))
+        self.assertEqual(Song.objects.filter(album__jamendo_profile__jamendo_id=5).count(), 5)
+        self.assertGreater(License.objects.filter(song__isnull=False).distinct().count(), 1)
+
+    def test_error_injection(self):
+        """ Tests if the requests fail with the given error rate. """
+        with FakeJamendoServer(SyntheticCatalog(tracks=10).entities(), error_rate=1.0, latency=0.01) as server:
+            JamendoServiceMixin.api_url = server.api_url
+            self.assertRaises(JamendoCallException, JamendoServiceMixin.json_call, 'tracks')
+            self.assertEqual(len(server.requests), 2, 'The failed request must be retried once.')
@@ -12,8 +12,9 @@
 #
 
 from django.conf.urls import url
-from .views import CrawlerPageView
+from .views import CrawlerPageView, CrawlingProgressView
 
 urlpatterns = [
+    url(r'^progress/(?P<pk>\d+)/$', CrawlingProgressView.as_view(), name="crawler-progress"),
     url(r'$', CrawlerPageView.as_view(), name="crawler"),
 ]
@@ -15,7 +15,7 @@ from django.views import generic
 from django.core.urlresolvers import reverse_lazy
 from django.http import HttpResponse
 from django.template import RequestContext
-from django.shortcuts import redirect, render_to_response
+from django.shortcuts import redirect, render_to_response, get_object_or_404
 from ccshuffle.serialize import ResponseObject, JSONModelEncoder
 from .models import CrawlingProcess
 from .crawler import JamendoCrawler
@@ -58,16 +58,38 @@ class CrawlerPageView(generic.TemplateView):
         logger.debug('%s' % request.GET)
         ajax_data = request.GET
         if 'command' in ajax_data:
-            if ajax_data['command'] == 'start-jamendo-crawl':
+            if ajax_data['command'] in ('start-jamendo-crawl', 'start-jamendo-delta-crawl'):
+                # The crawling process is only planned, it is executed by a crawling worker (see crawler.worker).
                 try:
-                    response_object = ResponseObject(result_obj=JamendoCrawler.crawl())
+                    crawling_process = JamendoCrawler.enqueue(delta=ajax_data['command'] == 'start-jamendo-delta-crawl')
+                    response_object = ResponseObject(result_obj=crawling_process)
                     return HttpResponse(response_object.json(cls=JSONModelEncoder))
                 except BaseException as e:
                     response_object = ResponseObject(status='fail', error_msg=str(e))
                     return HttpResponse(response_object.json(), status=500)
+            elif ajax_data['command'] == 'crawling-process-status':
+                try:
+                    ids = [int(cp_id) for cp_id in ajax_data.get('ids', '').split(',') if cp_id]
+                except ValueError:
+                    response_object = ResponseObject(status='fail', error_msg='The given ids are no integers !')
+                    return HttpResponse(response_object.json(), status=400)
+                status_list = list(CrawlingProcess.objects.filter(pk__in=ids).values('id', 'status', 'exception'))
+                return HttpResponse(ResponseObject(result_obj=status_list).json())
             else:
                 response_object = ResponseObject(status='fail', error_msg='The given command is unknown !')
                 return HttpResponse(response_object.json(), status=400)
         else:
             response_object = ResponseObject(status='fail', error_msg='No command is given !')
             return HttpResponse(response_object.json(), status=400)
+
+
+class CrawlingProgressView(generic.View):
+    """ This class represents the json endpoint, which returns the progress of a crawling process. """
+
+    def get(self, request, *args, **kwargs):
+        if request.user is None or not request.user.is_authenticated() or not request.user.is_superuser:
+            response_object = ResponseObject(status='fail', error_msg='The access is denied !')
+            return HttpResponse(response_object.json(), status=403)
+        crawling_process = get_object_or_404(CrawlingProcess, pk=kwargs['pk'])
+        response_object = ResponseObject(result_obj=crawling_process.progress())
+        return HttpResponse(response_object.json(), content_type='application/json')
@@ -0,0 +1,93 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+import logging
+from django.utils import timezone
+from django.db import transaction
+from .models import CrawlingProcess
+from .crawler import JamendoCrawler
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlingWorker(object):
+    """
+    This class represents a worker, which executes the planned crawling processes. The crawling processes are queued in
+    the database. A planned crawling process is claimed with a locked row, so that several workers can be run at once
+    without executing a crawling process twice.
+    """
+
+    # The crawlers of the services, which can be executed by the worker.
+    crawlers = {
+        CrawlingProcess.Service_Jamendo: JamendoCrawler,
+    }
+
+    def __init__(self, poll_interval: float=10):
+        """
+        Initializes the crawling worker.
+
+        :param poll_interval: the number of seconds between two polls for a planned crawling process.
+        """
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def claim(cls) -> CrawlingProcess:
+        """
+        Claims the oldest planned crawling process and marks it as running. None will be returned, if there is no
+        planned crawling process.
+
+        :return: the claimed crawling process or None, if there is no planned crawling process.
+        """
+        with transaction.atomic():
+            crawling_process = CrawlingProcess.objects.select_for_update().filter(
+                status=CrawlingProcess.Status_Planned).order_by('execution_date', 'pk').first()
+            if crawling_process is None:
+                return None
+            # The update is conditional, because not all databases (f.e. SQLite) support the locking of rows.
+            execution_date = timezone.now()
+            if CrawlingProcess.objects.filter(pk=crawling_process.pk, status=CrawlingProcess.Status_Planned).update(
+                    status=CrawlingProcess.Status_Running, execution_date=execution_date) == 0:
+                return None
+            crawling_process.status = CrawlingProcess.Status_Running
+            crawling_process.execution_date = execution_date
+            return crawling_process
+
+    def run_once(self) -> CrawlingProcess:
+        """
+        Claims and executes the oldest planned crawling process.
+
+        :return: the executed crawling process or None, if there is no planned crawling process.
+        """
+        crawling_process = self.claim()
+        if crawling_process is None:
+            return None
+        logger.info('%s: Executing the crawling process %s' % (self.__class__.__name__, crawling_process))
+        crawler = self.crawlers.get(crawling_process.service)
+        if crawler is None:
+            crawling_process.status = CrawlingProcess.Status_Failed
+            crawling_process.exception = 'There is no crawler for the service %s.' % crawling_process.service
+            crawling_process.save()
+            return crawling_process
+        return crawler.execute(crawling_process)
+
+    def run(self, exit_when_empty: bool=False) -> None:
+        """
+        Executes the planned crawling processes one after another and polls for new ones.
+
+        :param exit_when_empty: True, if the worker shall stop as soon as there is no planned crawling process.
+        """
+        while True:
+            if self.run_once() is None:
+                if exit_when_empty:
+                    return
+                time.sleep(self.poll_interval)
@@ -10,3 +10,17 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #   GNU General Public License for more details.
 #
+from django.conf import settings
+
+
+def get_search_setting(name, default=None):
+    """
+    Returns the value of the search setting with the given name. The search settings can be specified as dictionary
+    with the key 'SHUFFLE_SEARCH' in the CONF_FILE.
+
+    :param name: the name of the search setting (f.e. BACKEND).
+    :param default: the value, which shall be returned, if the setting is not specified.
+    :return: the value of the search setting or the given default value, if it is not specified.
+    """
+    search_settings = getattr(settings, 'SHUFFLE_SEARCH', None) or {}
+    return search_settings[name] if name in search_settings else default
@@ -0,0 +1,267 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import re
+import time
+import numpy
+from collections import Counter, defaultdict
+from .models import Song, Album, Artist, SongSearchDocument
+
+# The fields of the songs, which are indexed. The tokens of the names are indexed for the first three fields and the
+# names of the tags for the last one.
+FIELDS = ('name', 'artist', 'album', 'tags')
+TOKEN_FIELDS = FIELDS[:3]
+# The fields of the albums and artists, which are indexed. Their tags are aggregated from their songs or albums.
+ALBUM_TOKEN_FIELDS = ('name', 'artist')
+ARTIST_TOKEN_FIELDS = ('name',)
+
+
+def tokenize(text: str) -> [str]:
+    """
+    Splits the given text into lowercase tokens. The text is split at every non-word character like the search phrase
+    in the search engine.
+
+    :param text: the text, which shall be split.
+    :return: the lowercase tokens of the given text.
+    """
+    return [token for token in re.split(r'\W+', text.lower()) if token] if text else []
+
+
+def intersect(postings: [numpy.ndarray]) -> numpy.ndarray:
+    """
+    Returns the positions, which are contained in all the given posting lists. The shortest lists are intersected
+    first, so the intermediate results stay small.
+
+    :param postings: the sorted posting lists.
+    :return: the sorted positions, which are contained in all the given posting lists.
+    """
+    if not postings:
+        return numpy.empty(0, dtype=numpy.int32)
+    postings = sorted(postings, key=len)
+    result = numpy.asarray(postings[0], dtype=numpy.int32)
+    for posting in postings[1:]:
+        if not len(result):
+            break
+        result = numpy.intersect1d(result, posting, assume_unique=True)
+    return result
+
+
+def union(postings: [numpy.ndarray]) -> numpy.ndarray:
+    """
+    Returns the positions, which are contained in at least one of the given posting lists.
+
+    :param postings: the sorted posting lists.
+    :return: the sorted positions, which are contained in at least one of the given posting lists.
+    """
+    postings = [posting for posting in postings if len(posting)]
+    if not postings:
+        return numpy.empty(0, dtype=numpy.int32)
+    return numpy.unique(numpy.concatenate(postings)).astype(numpy.int32)
+
+
+class InvertedIndex(object):
+    """
+    This class represents an inverted index of the songs, albums or artists (documents). The documents are numbered by
+    their position in the sorted array of their ids. The tokens of their names (f.e. the names of the song, its artist
+    and album) as well as their tags are mapped to sorted arrays of these positions (posting lists) and to the
+    frequencies of the term in the field of the documents. The tags of albums and artists are aggregated from their
+    songs and albums, so the frequency of a tag is the number of songs or albums having it. The document frequencies
+    of the terms and the lengths of the fields are precomputed for the ranking.
+    """
+
+    # The number of documents, from which on the frequencies of a term are looked up in a dense array instead of binary
+    # searching the posting list.
+    DENSE_LOOKUP_THRESHOLD = 4096
+
+    def __init__(self, doc_ids: numpy.ndarray, field_postings: {str: {str: (numpy.ndarray, numpy.ndarray)}},
+                 field_lengths: {str: numpy.ndarray}, token_postings: {str: numpy.ndarray}=None,
+                 tag_postings: {str: numpy.ndarray}=None):
+        """
+        Initializes the inverted index with the given posting lists.
+
+        :param doc_ids: the sorted ids of the indexed documents.
+        :param field_postings: the posting lists and term frequencies of the terms for each field. The field 'tags'
+                               contains the tags, the other fields the tokens of names.
+        :param field_lengths: the number of terms in the field of each document for each field.
+        :param token_postings: the posting lists of the tokens over all token fields. They are derived from the field
+                               postings, if they are not given.
+        :param tag_postings: the posting lists of the tags. They are derived from the field postings, if they are not
+                             given.
+        """
+        self.doc_ids = doc_ids
+        self.field_postings = field_postings
+        self.field_lengths = field_lengths
+        self.token_fields = tuple(field for field in field_postings if field != 'tags')
+        self.average_lengths = {field: float(lengths.mean()) if len(lengths) else 0.0 for field, lengths in
+                                field_lengths.items()}
+        if token_postings is None:
+            token_postings = {}
+            for field in self.token_fields:
+                for token, (positions, _) in field_postings[field].items():
+                    token_postings.setdefault(token, []).append(positions)
+            token_postings = {token: union(postings) for token, postings in token_postings.items()}
+        self.token_postings = token_postings
+        if tag_postings is None:
+            tag_postings = {tag: positions for tag, (positions, _) in field_postings['tags'].items()}
+        self.tag_postings = tag_postings
+        self.built_at = time.time()
+
+    @property
+    def size(self) -> int:
+        """ The number of indexed documents. """
+        return len(self.doc_ids)
+
+    def document_frequency(self, term: str, tag: bool=False) -> int:
+        """
+        Returns the number of documents, which contain the given token in one of their names or have the given tag.
+
+        :param term: the token or name of the tag.
+        :param tag: True, if the term is the name of a tag, otherwise False.
+        :return: the number of documents, which contain the given term.
+        """
+        postings = self.tag_postings if tag else self.token_postings
+        return len(postings[term]) if term in postings else 0
+
+    def term_frequencies(self, field: str, term: str, positions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Returns the frequencies of the given term in the given field of the documents at the given positions.
+
+        :param field: the field of the documents.
+        :param term: the term, which shall be looked up.
+        :param positions: the sorted positions of the documents.
+        :return: the frequencies of the term in the field of the documents (0, if the term is not contained).
+        """
+        if term not in self.field_postings[field] or not len(positions):
+            return numpy.zeros(len(positions), dtype=numpy.float32)
+        term_positions, term_frequencies = self.field_postings[field][term]
+        if len(positions) > self.DENSE_LOOKUP_THRESHOLD:
+            # Large sets of documents are looked up in a dense array of the frequencies of the term.
+            frequencies = numpy.zeros(self.size, dtype=numpy.float32)
+            frequencies[term_positions] = term_frequencies
+            return frequencies[positions]
+        frequencies = numpy.zeros(len(positions), dtype=numpy.float32)
+        found = numpy.searchsorted(term_positions, positions)
+        found[found == len(term_positions)] = 0
+        mask = term_positions[found] == positions
+        frequencies[mask] = term_frequencies[found[mask]]
+        return frequencies
+
+    @classmethod
+    def from_documents(cls, token_fields: (str,), documents):
+        """
+        Builds the inverted index of the given documents.
+
+        :param token_fields: the fields of the documents, of which the tokens are indexed.
+        :param documents: the documents as tuples of their id, the texts of their token fields and a dictionary of
+                          their tags mapped to the frequency of the tag. The documents must be ordered by their id.
+        :return: the inverted index of the given documents.
+        """
+        fields = tuple(token_fields) + ('tags',)
+        doc_ids = []
+        postings = {field: defaultdict(lambda: ([], [])) for field in fields}
+        lengths = {field: [] for field in fields}
+        for doc_id, names, tags in documents:
+            for field, name in zip(token_fields, names):
+                tokens = tokenize(name)
+                for token, frequency in Counter(tokens).items():
+                    postings[field][token][0].append(len(doc_ids))
+                    postings[field][token][1].append(frequency)
+                lengths[field].append(len(tokens))
+            for tag_name, frequency in tags.items():
+                postings['tags'][tag_name][0].append(len(doc_ids))
+                postings['tags'][tag_name][1].append(frequency)
+            lengths['tags'].append(sum(tags.values()))
+            doc_ids.append(doc_id)
+        field_postings = {field: {term: (numpy.array(term_positions, dtype=numpy.int32),
+                                         numpy.array(frequencies, dtype=numpy.float32))
+                                  for term, (term_positions, frequencies) in postings[field].items()}
+                          for field in fields}
+        field_lengths = {field: numpy.array(lengths[field], dtype=numpy.float32) for field in fields}
+        return cls(numpy.array(doc_ids, dtype=numpy.int64), field_postings, field_lengths)
+
+    @staticmethod
+    def __tags_of(tags: str) -> {str}:
+        """ Returns the names of the tags of a search document. """
+        return set(tag_name for tag_name in tags.split('\n') if tag_name)
+
+    @classmethod
+    def build(cls, model=Song):
+        """
+        Builds the inverted index of the given model (Song, Album or Artist) from the search documents of the songs in
+        the database. The tags of an album are aggregated from its songs and the tags of an artist from its albums.
+
+        :param model: the model, of which the index shall be built.
+        :return: the inverted index of the model objects in the database.
+        """
+        if model is Song:
+            return cls.from_documents(TOKEN_FIELDS, (
+                (song_id, names, dict.fromkeys(cls.__tags_of(tags), 1)) for song_id, *names, tags in
+                SongSearchDocument.objects.order_by('song_id').values_list(
+                    'song_id', 'name', 'artist_name', 'album_name', 'tags').iterator()))
+        album_tags = defaultdict(Counter)
+        for album_id, tags in SongSearchDocument.objects.filter(song__album__isnull=False).values_list(
+                'song__album_id', 'tags').iterator():
+            album_tags[album_id].update(cls.__tags_of(tags))
+        if model is Album:
+            return cls.from_documents(ALBUM_TOKEN_FIELDS, (
+                (album_id, names, album_tags.get(album_id, {})) for album_id, *names in
+                Album.objects.order_by('id').values_list('id', 'name', 'artist__name').iterator()))
+        if model is Artist:
+            artist_tags = defaultdict(Counter)
+            for album_id, artist_id in Album.objects.filter(artist__isnull=False).values_list('id', 'artist_id'):
+                artist_tags[artist_id].update(album_tags.get(album_id, {}).keys())
+            return cls.from_documents(ARTIST_TOKEN_FIELDS, (
+                (artist_id, names, artist_tags.get(artist_id, {})) for artist_id, *names in
+                Artist.objects.order_by('id').values_list('id', 'name').iterator()))
+        raise ValueError('There is no inverted index of the model %s.' % model.__name__)
+
+    def phrase_matches(self, phrase: str) -> numpy.ndarray:
+        """
+        Returns the positions of the documents, which contain all tokens of the given phrase in their names.
+
+        :param phrase: the phrase to search for.
+        :return: the sorted positions of the matched documents (none, if the phrase has no tokens).
+        """
+        tokens = set(tokenize(phrase))
+        if tokens and all(token in self.token_postings for token in tokens):
+            return intersect([self.token_postings[token] for token in tokens])
+        return numpy.empty(0, dtype=numpy.int32)
+
+    def search(self, phrase: str, tags: [str], scorer) -> [int]:
+        """
+        Searches for the documents, which contain all tokens of the given phrase in their names or have one of the given
+        tags. The documents are ranked by the given scorer.
+
+        :param phrase: the phrase to search for.
+        :param tags: the tags to search for.
+        :param scorer: the scorer, which computes the relevance of the found documents.
+        :return: the ids of the found documents ordered by their rank.
+        """
+        return self.search_scored(phrase, tags, scorer)[0]
+
+    def search_scored(self, phrase: str, tags: [str], scorer) -> ([int], numpy.ndarray):
+        """
+        Searches for the documents like search and returns the scores of the found documents as well.
+
+        :param phrase: the phrase to search for.
+        :param tags: the tags to search for.
+        :param scorer: the scorer, which computes the relevance of the found documents.
+        :return: the ids of the found documents ordered by their rank and their scores (float32) in the same order.
+        """
+        tokens = sorted(set(tokenize(phrase)))
+        tags = sorted(set(tag.lower() for tag in tags if tag.lower() in self.tag_postings))
+        candidates = union([self.phrase_matches(phrase)] + [self.tag_postings[tag] for tag in tags])
+        if not len(candidates):
+            return [], numpy.empty(0, dtype=numpy.float32)
+        scores = scorer.score(self, candidates, tokens, tags)
+        ranking = numpy.argsort(-scores, kind='mergesort')
+        return self.doc_ids[candidates[ranking]].tolist(), scores[ranking].astype(numpy.float32)
@@ -0,0 +1,42 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from shuffle import get_search_setting
+from shuffle.models import CatalogVersion
+from shuffle.snapshot import CatalogSnapshot
+from shuffle.searchengine import SearchEngine
+
+
+class Command(BaseCommand):
+    help = 'Writes the snapshot of the current catalog version, which is memory-mapped by the search backends.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None,
+                            help='The directory of the snapshots (the search setting INDEX_DIR by default).')
+        parser.add_argument('--keep', type=int, default=2,
+                            help='The number of the latest snapshots, which are kept in the directory.')
+
+    def handle(self, *args, **options):
+        index_dir = options['dir'] if options['dir'] is not None else get_search_setting('INDEX_DIR')
+        if index_dir is None:
+            raise CommandError('The directory of the snapshots must be given (--dir or the search setting INDEX_DIR).')
+        start = time.time()
+        version = CatalogVersion.current()
+        path = CatalogSnapshot.write(index_dir, version)
+        removed = CatalogSnapshot.prune(index_dir, keep=max(options['keep'], 1))
+        self.stdout.write('Wrote the snapshot %s of the catalog version %d (%d bytes) in %.1f seconds, removed %d old '
+                          'snapshots.' % (path, version, os.path.getsize(path), time.time() - start, len(removed)))
+        if SearchEngine.store_tag_bitsets(index_dir, version, keep=max(options['keep'], 1)):
+            self.stdout.write('Wrote the tag bitsets of the catalog version %d.' % version)
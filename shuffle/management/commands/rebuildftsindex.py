@@ -0,0 +1,36 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from shuffle.searchbackends import PostgresSearchBackend, SQLiteSearchBackend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full text index of the search documents (PostgreSQL search vectors or the SQLite FTS5 table).'
+
+    BACKENDS = {
+        'postgresql': PostgresSearchBackend,
+        'sqlite': SQLiteSearchBackend,
+    }
+
+    def handle(self, *args, **options):
+        if connection.vendor not in self.BACKENDS:
+            raise CommandError('There is no full text index for the database %s.' % connection.vendor)
+        backend = self.BACKENDS[connection.vendor]
+        if backend is SQLiteSearchBackend and not backend.fts_available():
+            raise CommandError('The FTS5 table does not exist, the SQLite library may not support FTS5.')
+        start = time.time()
+        backend.rebuild()
+        self.stdout.write('Rebuilt the full text index (%s) in %.1f seconds.' % (connection.vendor,
+                                                                                 time.time() - start))
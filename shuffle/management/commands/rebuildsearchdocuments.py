@@ -0,0 +1,32 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from shuffle.models import SongSearchDocument, CatalogVersion
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search documents of all songs from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of songs, of which the documents are built and inserted at once.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        with transaction.atomic():
+            count = SongSearchDocument.rebuild(batch_size=options['batch_size'])
+            version = CatalogVersion.bump()
+        self.stdout.write('Rebuilt the search documents of %d songs in %.1f seconds (catalog version: %d).' % (
+            count, time.time() - start, version))
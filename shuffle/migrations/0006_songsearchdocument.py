@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+# The number of songs, of which the search documents are built and inserted at once.
+BATCH_SIZE = 1000
+
+
+def build_song_search_documents(apps, schema_editor):
+    """
+    Builds the search documents of the existing songs. The songs are loaded in chunks ordered by their id, so that only
+    the documents of one chunk are kept in memory.
+    """
+    Song = apps.get_model('shuffle', 'Song')
+    SongSearchDocument = apps.get_model('shuffle', 'SongSearchDocument')
+    songs = Song.objects.select_related('artist', 'album', 'license').prefetch_related('tags').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(songs.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not chunk:
+            break
+        documents = []
+        for song in chunk:
+            tags = sorted(song.tags.all(), key=lambda tag: tag.name)
+            documents.append(SongSearchDocument(
+                song_id=song.id, name=song.name.lower(), artist_name=song.artist.name.lower() if song.artist else '',
+                album_name=song.album.name.lower() if song.album else '',
+                tag_ids=','.join(str(tag.id) for tag in tags), tags='\n'.join(tag.name.lower() for tag in tags),
+                license_type=song.license.type, duration=song.duration))
+        SongSearchDocument.objects.bulk_create(documents)
+        last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuffle', '0005_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongSearchDocument',
+            fields=[
+                ('song', models.OneToOneField(primary_key=True, serialize=False, related_name='search_document', to='shuffle.Song')),
+                ('name', models.CharField(max_length=250, blank=True)),
+                ('artist_name', models.CharField(max_length=250, blank=True)),
+                ('album_name', models.CharField(max_length=512, blank=True)),
+                ('tag_ids', models.TextField(blank=True)),
+                ('tags', models.TextField(blank=True)),
+                ('license_type', models.CharField(max_length=15, blank=True)),
+                ('duration', models.IntegerField(blank=True, null=True, default=None)),
+            ],
+        ),
+        migrations.RunPython(build_song_search_documents, migrations.RunPython.noop),
+    ]
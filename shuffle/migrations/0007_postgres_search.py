@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The search vector of the search documents weights the name of the song (A), the tags (B), the name of the artist (C)
+# and the name of the album (D). It is maintained by a trigger, so every update of the documents keeps it up to date.
+POSTGRES_SEARCH_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'ALTER TABLE shuffle_songsearchdocument ADD COLUMN search_vector tsvector',
+    '''CREATE FUNCTION shuffle_songsearchdocument_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.tags, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.artist_name, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(NEW.album_name, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql''',
+    '''CREATE TRIGGER shuffle_songsearchdocument_search_vector_update
+    BEFORE INSERT OR UPDATE ON shuffle_songsearchdocument
+    FOR EACH ROW EXECUTE PROCEDURE shuffle_songsearchdocument_search_vector()''',
+    'UPDATE shuffle_songsearchdocument SET name = name',
+    'CREATE INDEX shuffle_songsearchdocument_search_vector_gin ON shuffle_songsearchdocument USING gin '
+    '(search_vector)',
+    'CREATE INDEX shuffle_songsearchdocument_name_trgm ON shuffle_songsearchdocument USING gin (name gin_trgm_ops)',
+    'CREATE INDEX shuffle_songsearchdocument_artist_name_trgm ON shuffle_songsearchdocument USING gin '
+    '(artist_name gin_trgm_ops)',
+]
+
+POSTGRES_SEARCH_REVERSE_SQL = [
+    'DROP INDEX IF EXISTS shuffle_songsearchdocument_artist_name_trgm',
+    'DROP INDEX IF EXISTS shuffle_songsearchdocument_name_trgm',
+    'DROP INDEX IF EXISTS shuffle_songsearchdocument_search_vector_gin',
+    'DROP TRIGGER IF EXISTS shuffle_songsearchdocument_search_vector_update ON shuffle_songsearchdocument',
+    'DROP FUNCTION IF EXISTS shuffle_songsearchdocument_search_vector()',
+    'ALTER TABLE shuffle_songsearchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def execute_on_postgresql(statements):
+    """ Returns a function for RunPython, which executes the given statements, if the database is PostgreSQL. """
+
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuffle', '0006_songsearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(execute_on_postgresql(POSTGRES_SEARCH_SQL),
+                             execute_on_postgresql(POSTGRES_SEARCH_REVERSE_SQL)),
+    ]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The FTS5 table indexes the search documents (external content), the triggers keep it in sync with every change of
+# the documents.
+SQLITE_SEARCH_SQL = [
+    '''CREATE VIRTUAL TABLE shuffle_songsearchdocument_fts USING fts5(
+    name, tags, artist_name, album_name, content='shuffle_songsearchdocument', content_rowid='song_id')''',
+    '''CREATE TRIGGER shuffle_songsearchdocument_fts_insert AFTER INSERT ON shuffle_songsearchdocument BEGIN
+        INSERT INTO shuffle_songsearchdocument_fts(rowid, name, tags, artist_name, album_name)
+        VALUES (new.song_id, new.name, new.tags, new.artist_name, new.album_name);
+    END''',
+    '''CREATE TRIGGER shuffle_songsearchdocument_fts_delete AFTER DELETE ON shuffle_songsearchdocument BEGIN
+        INSERT INTO shuffle_songsearchdocument_fts(shuffle_songsearchdocument_fts, rowid, name, tags, artist_name,
+                                                   album_name)
+        VALUES ('delete', old.song_id, old.name, old.tags, old.artist_name, old.album_name);
+    END''',
+    '''CREATE TRIGGER shuffle_songsearchdocument_fts_update AFTER UPDATE ON shuffle_songsearchdocument BEGIN
+        INSERT INTO shuffle_songsearchdocument_fts(shuffle_songsearchdocument_fts, rowid, name, tags, artist_name,
+                                                   album_name)
+        VALUES ('delete', old.song_id, old.name, old.tags, old.artist_name, old.album_name);
+        INSERT INTO shuffle_songsearchdocument_fts(rowid, name, tags, artist_name, album_name)
+        VALUES (new.song_id, new.name, new.tags, new.artist_name, new.album_name);
+    END''',
+    "INSERT INTO shuffle_songsearchdocument_fts(shuffle_songsearchdocument_fts) VALUES ('rebuild')",
+]
+
+SQLITE_SEARCH_REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS shuffle_songsearchdocument_fts_update',
+    'DROP TRIGGER IF EXISTS shuffle_songsearchdocument_fts_delete',
+    'DROP TRIGGER IF EXISTS shuffle_songsearchdocument_fts_insert',
+    'DROP TABLE IF EXISTS shuffle_songsearchdocument_fts',
+]
+
+
+def execute_on_sqlite_with_fts5(statements):
+    """ Returns a function for RunPython, which executes the given statements, if the database is SQLite with FTS5. """
+
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute('PRAGMA compile_options')
+                if ('ENABLE_FTS5',) not in cursor.fetchall():
+                    return
+            for statement in statements:
+                schema_editor.execute(statement)
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shuffle', '0007_postgres_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(execute_on_sqlite_with_fts5(SQLITE_SEARCH_SQL),
+                             execute_on_sqlite_with_fts5(SQLITE_SEARCH_REVERSE_SQL)),
+    ]
@@ -11,10 +11,11 @@
 #   GNU General Public License for more details.
 #
 
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from datetime import datetime
 from abc import abstractmethod
-from django.db.models import Q, Count
+from django.db.models import Q, Count, F
 from ccshuffle.serialize import SerializableModel, DeserializableException
 
 
@@ -31,6 +32,21 @@ class SearchableModel(object):
         """
         raise NotImplementedError('The function search of %s' % cls.__class__.__name__)
 
+    @classmethod
+    def _backend_search(cls, phrase: str, tags: [str]) -> [models.Model]:
+        """
+        Searches for the model objects with the backend of the search engine, which ranks them by their relevance.
+
+        :param phrase: the phrase to search for.
+        :param tags: the tags, which describes the model object.
+        :return: the found model objects ordered by their relevance.
+        """
+        # The search engine is imported here, because its backends depend on the models.
+        from .searchengine import SearchEngine
+        ids = SearchEngine.search_backend().search(cls, phrase, tags)
+        objects = cls.objects.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
 
 class JamendoArtistProfile(models.Model, SerializableModel):
     jamendo_id = models.IntegerField()
@@ -92,7 +108,7 @@ class Artist(models.Model, SerializableModel, SearchableModel):
 
     @classmethod
     def search(cls, phrase: str, tags: [str]):
-        raise NotImplementedError('The search of artists is not implemented.')
+        return cls._backend_search(phrase, tags)
 
     @property
     def is_on_jamendo(self):
@@ -227,7 +243,7 @@ class Album(models.Model, SerializableModel, SearchableModel):
 
     @classmethod
     def search(cls, phrase: str, tags: [str]):
-        raise NotImplementedError('The search of albums is not implemented.')
+        return cls._backend_search(phrase, tags)
 
     @property
     def is_on_jamendo(self):
@@ -537,7 +553,7 @@ class Song(models.Model, SerializableModel, SearchableModel):
     @property
     def all_tags(self):
         """
-        Returns the tags of this song.
+        Returns the tags of this song. If the tags have been prefetched, no query is executed.
 
         :return: the tags of this song.
         """
@@ -546,7 +562,7 @@ class Song(models.Model, SerializableModel, SearchableModel):
     @property
     def tags_names(self):
         """
-        Returns the name of the tags as list.
+        Returns the name of the tags as list. If the tags have been prefetched, no query is executed.
 
         :return: the name of the tags as list.
         """
@@ -721,3 +737,133 @@ class Source(models.Model, SerializableModel):
     def __str__(self):
         return '<%s: Type:%s, Link: %s Codec: %s> of %s' % (
             type(self).__name__, self.type, self.link, self.codec, repr(self.song))
+
+
+class SongSearchDocument(models.Model):
+    """
+    This class represents the denormalized search document of a song. It contains the lowercase names of the song, its
+    artist and album, the ids and names of its tags, the type of its license and its duration in one narrow row, so the
+    search does not need to join the songs with their artists, albums and tags. The documents are updated, when the
+    songs are persisted by the crawler, and can be rebuilt from scratch.
+    """
+    song = models.OneToOneField(Song, primary_key=True, related_name='search_document')
+    name = models.CharField(max_length=250, blank=True)
+    artist_name = models.CharField(max_length=250, blank=True)
+    album_name = models.CharField(max_length=512, blank=True)
+    tag_ids = models.TextField(blank=True)
+    tags = models.TextField(blank=True)
+    license_type = models.CharField(max_length=15, blank=True)
+    duration = models.IntegerField(blank=True, default=None, null=True)
+
+    @property
+    def tag_id_list(self) -> [int]:
+        """ The ids of the tags of the song. """
+        return [int(tag_id) for tag_id in self.tag_ids.split(',') if tag_id]
+
+    @property
+    def tag_names(self) -> [str]:
+        """ The names of the tags of the song. """
+        return [tag_name for tag_name in self.tags.split('\n') if tag_name]
+
+    @classmethod
+    def documents_of(cls, song_ids: [int]) -> ['SongSearchDocument']:
+        """
+        Creates the search documents of the songs with the given ids (without saving them).
+
+        :param song_ids: the ids of the songs.
+        :return: the search documents of the songs, which exist.
+        """
+        tags = {}
+        for song_id, tag_id, tag_name in Song.tags.through.objects.filter(song_id__in=song_ids).order_by(
+                'tag__name').values_list('song_id', 'tag_id', 'tag__name'):
+            tags.setdefault(song_id, []).append((tag_id, tag_name))
+        documents = []
+        for song_id, name, artist_name, album_name, license_type, duration in Song.objects.filter(
+                id__in=song_ids).values_list('id', 'name', 'artist__name', 'album__name', 'license__type', 'duration'):
+            song_tags = tags.get(song_id, [])
+            documents.append(cls(song_id=song_id, name=(name or '').lower(), artist_name=(artist_name or '').lower(),
+                                 album_name=(album_name or '').lower(),
+                                 tag_ids=','.join(str(tag_id) for tag_id, _ in song_tags),
+                                 tags='\n'.join(tag_name.lower() for _, tag_name in song_tags),
+                                 license_type=license_type or '', duration=duration))
+        return documents
+
+    @classmethod
+    def update(cls, song_ids: [int]) -> None:
+        """
+        Updates the search documents of the songs with the given ids in one transaction.
+
+        :param song_ids: the ids of the songs, of which the search documents shall be updated.
+        """
+        song_ids = list(song_ids)
+        if not song_ids:
+            return
+        with transaction.atomic():
+            cls.objects.filter(song_id__in=song_ids).delete()
+            cls.objects.bulk_create(cls.documents_of(song_ids))
+
+    @classmethod
+    def rebuild(cls, batch_size: int=1000) -> int:
+        """
+        Rebuilds the search documents of all songs from scratch in one transaction.
+
+        :param batch_size: the number of songs, of which the documents are built and inserted at once.
+        :return: the number of the rebuilt search documents.
+        """
+        with transaction.atomic():
+            cls.objects.all().delete()
+            song_ids = list(Song.objects.order_by('id').values_list('id', flat=True))
+            for offset in range(0, len(song_ids), batch_size):
+                cls.objects.bulk_create(cls.documents_of(song_ids[offset:offset + batch_size]))
+        return len(song_ids)
+
+    def __repr__(self):
+        return '<%s: %s - %s (%s)>' % (type(self).__name__, self.artist_name, self.name, self.tags.replace('\n', ', '))
+
+    def __str__(self):
+        return repr(self)
+
+
+class CatalogVersion(models.Model):
+    """
+    This class represents the version of the catalog (songs, albums, artists and tags). The version is increased in the
+    same transaction, which changes the catalog (f.e. a page of a crawl), so the caches of the search can check cheaply
+    whether they have been derived from the current catalog.
+    """
+    version = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    # The primary key of the only row, which stores the version.
+    PK = 1
+
+    @classmethod
+    def current(cls) -> int:
+        """
+        Returns the current version of the catalog.
+
+        :return: the current version of the catalog (0, if the catalog has never been changed).
+        """
+        version = cls.objects.filter(pk=cls.PK).values_list('version', flat=True).first()
+        return version if version is not None else 0
+
+    @classmethod
+    def bump(cls) -> int:
+        """
+        Increases the version of the catalog. It shall be called in the transaction, which changes the catalog, so the
+        new version is visible together with the changes.
+
+        :return: the new version of the catalog.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(pk=cls.PK).update(version=F('version') + 1, updated=timezone.now()):
+                catalog_version, created = cls.objects.select_for_update().get_or_create(pk=cls.PK,
+                                                                                         defaults={'version': 1})
+                if not created:
+                    cls.objects.filter(pk=cls.PK).update(version=F('version') + 1, updated=timezone.now())
+            return cls.current()
+
+    def __repr__(self):
+        return '<%s: %d>' % (type(self).__name__, self.version)
+
+    def __str__(self):
+        return repr(self)
@@ -0,0 +1,98 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import numpy
+from . import get_search_setting
+from .invertedindex import InvertedIndex
+
+
+class BM25Scorer(object):
+    """
+    This class represents a scorer, which ranks the documents of an inverted index by the BM25 relevance of their fields
+    (BM25F). The frequencies of a term in the fields of a document are weighted by the field and normalized by the
+    length of the field, before they are saturated and multiplied with the inverse document frequency of the term. The
+    tokens of the phrase are looked up in the names of the document (f.e. the names of the song, artist and album) and
+    the tags in the tags of the document.
+    """
+
+    # The default weights of the fields of the documents.
+    FIELD_WEIGHTS = {
+        'name': 3.0,
+        'artist': 1.5,
+        'album': 1.0,
+        'tags': 2.0,
+    }
+
+    def __init__(self, field_weights: {str: float}=None, k1: float=None, b: float=None):
+        """
+        Initializes the BM25 scorer. The parameters, which are not given, are taken from the search settings
+        FIELD_WEIGHTS, BM25_K1 and BM25_B.
+
+        :param field_weights: the weights of the fields (name, artist, album and tags).
+        :param k1: the saturation of the term frequencies.
+        :param b: the normalization of the term frequencies by the length of the field.
+        """
+        self.field_weights = dict(self.FIELD_WEIGHTS)
+        self.field_weights.update(field_weights if field_weights is not None else
+                                  get_search_setting('FIELD_WEIGHTS', {}))
+        self.k1 = k1 if k1 is not None else get_search_setting('BM25_K1', 1.2)
+        self.b = b if b is not None else get_search_setting('BM25_B', 0.75)
+
+    def idf(self, index: InvertedIndex, term: str, tag: bool=False) -> float:
+        """
+        Returns the inverse document frequency of the given term in the given index.
+
+        :param index: the inverted index of the documents.
+        :param term: the token or name of the tag.
+        :param tag: True, if the term is the name of a tag, otherwise False.
+        :return: the inverse document frequency of the given term.
+        """
+        frequency = index.document_frequency(term, tag)
+        return float(numpy.log(1.0 + (index.size - frequency + 0.5) / (frequency + 0.5)))
+
+    def __weighted_frequencies(self, index: InvertedIndex, normalizations: {str: numpy.ndarray}, term: str,
+                               candidates: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the weighted and length normalized frequencies of the given term in the given fields. """
+        frequencies = numpy.zeros(len(candidates), dtype=numpy.float32)
+        for field, normalization in normalizations.items():
+            frequencies += index.term_frequencies(field, term, candidates) * normalization
+        return frequencies
+
+    def __normalizations(self, index: InvertedIndex, fields: (str,), candidates: numpy.ndarray) -> {str: numpy.ndarray}:
+        """ Returns the weights of the given fields divided by the normalized field lengths of the candidates. """
+        normalizations = {}
+        for field in fields:
+            weight = self.field_weights.get(field, 0.0)
+            if weight and index.average_lengths[field]:
+                normalizations[field] = weight / ((1.0 - self.b) + self.b * index.field_lengths[field][candidates] /
+                                                  index.average_lengths[field])
+        return normalizations
+
+    def score(self, index: InvertedIndex, candidates: numpy.ndarray, tokens: [str], tags: [str]) -> numpy.ndarray:
+        """
+        Computes the relevance of the documents at the given positions of the given index for the given tokens and tags.
+
+        :param index: the inverted index of the documents.
+        :param candidates: the sorted positions of the documents, which shall be scored.
+        :param tokens: the tokens of the search phrase.
+        :param tags: the names of the tags to search for.
+        :return: the relevance of the documents in the order of the given positions.
+        """
+        scores = numpy.zeros(len(candidates), dtype=numpy.float32)
+        token_normalizations = self.__normalizations(index, index.token_fields, candidates) if tokens else {}
+        tag_normalizations = self.__normalizations(index, ('tags',), candidates) if tags else {}
+        terms = [(token, token_normalizations, False) for token in tokens]
+        terms += [(tag, tag_normalizations, True) for tag in tags]
+        for term, normalizations, tag in terms:
+            frequencies = self.__weighted_frequencies(index, normalizations, term, candidates)
+            scores += self.idf(index, term, tag) * frequencies / (self.k1 + frequencies)
+        return scores
@@ -0,0 +1,515 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import os
+import time
+import logging
+import threading
+import numpy
+from abc import abstractmethod
+from . import get_search_setting
+from django.db import connection
+from .models import Song, Album, Artist
+from .invertedindex import InvertedIndex, tokenize
+from .scoring import BM25Scorer
+from .tagbitset import TagBitsetIndex
+from .snapshot import CatalogSnapshot, SnapshotFormatError
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend(object):
+    """ This class represents a backend of the search engine, which answers the search for model objects. """
+
+    @abstractmethod
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        """
+        Searches for the objects of the given model, which fulfill all or some search criteria.
+
+        :param model: the model to search for (Song, Album or Artist).
+        :param phrase: the phrase to search for.
+        :param tags: the tags, which have been extracted from the phrase.
+        :return: the ids of the found model objects ordered by their relevance.
+        """
+        raise NotImplementedError('The abstract method search of %s is not implemented !' % self.__class__.__name__)
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        """
+        Searches for the objects of the given model like search and returns the relevance scores of the found objects
+        as well. The scores are None, if the backend only ranks the found objects.
+
+        :param model: the model to search for (Song, Album or Artist).
+        :param phrase: the phrase to search for.
+        :param tags: the tags, which have been extracted from the phrase.
+        :return: the ids of the found model objects ordered by their relevance and their scores (float32) in the same
+                 order or None.
+        """
+        return self.search(model, phrase, tags), None
+
+    def refresh(self) -> None:
+        """ Refreshes the data of the backend, which has been derived from the database. """
+        pass
+
+    def sync(self, model, catalog_version: int) -> bool:
+        """
+        Brings the data of the backend, which has been derived from the database, up to the given version of the
+        catalog, if it is possible.
+
+        :param model: the model, which shall be searched for (Song, Album or Artist).
+        :param catalog_version: the current version of the catalog.
+        :return: True, if the backend answers the search for the given model for the given version of the catalog,
+                 otherwise False (the search responses must not be cached then).
+        """
+        return True
+
+
+class ORMSearchBackend(SearchBackend):
+    """
+    This class represents the reference backend, which answers the search for songs with the search method of the
+    model. The search for albums and artists is answered with inverted indexes (their search methods delegate to the
+    backend of the search engine).
+    """
+
+    # The models, which are searched with their search method.
+    SEARCHED_MODELS = (Song,)
+
+    def __init__(self):
+        self._fallback = None
+
+    @property
+    def fallback(self) -> SearchBackend:
+        """ The backend, which answers the search for the models, which are not searched with the ORM. """
+        if self._fallback is None:
+            self._fallback = InvertedIndexSearchBackend()
+        return self._fallback
+
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        if model not in self.SEARCHED_MODELS:
+            return self.fallback.search(model, phrase, tags)
+        return list(model.search(phrase, tags).values_list('id', flat=True))
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        if model not in self.SEARCHED_MODELS:
+            return self.fallback.search_scored(model, phrase, tags)
+        return super().search_scored(model, phrase, tags)
+
+    def sync(self, model, catalog_version: int) -> bool:
+        return self.fallback.sync(model, catalog_version) if model not in self.SEARCHED_MODELS else True
+
+    def refresh(self) -> None:
+        if self._fallback is not None:
+            self._fallback.refresh()
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """
+    This class represents a backend, which answers the search for songs, albums and artists with inverted indexes in
+    the memory of the process. The index of a model is built from the database on the first search and rebuilt, if the
+    version of the catalog has been changed. An index is rebuilt at most once in the given minimal age, so a running
+    crawl does not cause a rebuild for every page. The found objects are ranked by their BM25 relevance, where albums
+    and artists are ranked by the tags aggregated from their songs and albums. If the search setting INDEX_DIR is given
+    and contains a snapshot of the catalog version, the index of the songs is memory-mapped from the snapshot instead.
+    """
+
+    # The models, which are searched with an inverted index.
+    INDEXED_MODELS = (Song, Album, Artist)
+
+    def __init__(self, min_age: float=None, scorer: BM25Scorer=None, index_dir: str=None):
+        """
+        Initializes the inverted index search backend.
+
+        :param min_age: the number of seconds, before which an index is not rebuilt for a new version of the catalog.
+                        If it is not given, the search setting INDEX_MIN_AGE is used. The index of the songs is swapped
+                        to a new snapshot regardless of its age.
+        :param scorer: the scorer, which ranks the found objects. The BM25 scorer with the search settings is used as
+                       default.
+        :param index_dir: the directory of the catalog snapshots. If it is not given, the search setting INDEX_DIR is
+                          used. The index of the songs is always built from the database, if both are None.
+        """
+        self.min_age = min_age if min_age is not None else get_search_setting('INDEX_MIN_AGE', 60)
+        self.scorer = scorer if scorer is not None else BM25Scorer()
+        self.index_dir = index_dir if index_dir is not None else get_search_setting('INDEX_DIR')
+        self.fallback = ORMSearchBackend()
+        self.versions = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def __build(self, model, catalog_version: int=None) -> None:
+        """ Builds the index of the model and labels it with the version of the catalog. The lock must be held. """
+        start = time.time()
+        index = None
+        if self.__has_snapshot(model, catalog_version):
+            try:
+                index = CatalogSnapshot(CatalogSnapshot.path(self.index_dir, catalog_version)).index()
+            except (OSError, SnapshotFormatError) as e:
+                logger.warning('%s: The snapshot of the catalog version %s can\'t be loaded (%s).' % (
+                    self.__class__.__name__, catalog_version, e))
+        self._indexes[model] = index if index is not None else InvertedIndex.build(model)
+        self.versions[model] = catalog_version
+        logger.info('%s: Built the index of %d %s objects (catalog version: %s) in %.3f seconds.' % (
+            self.__class__.__name__, self._indexes[model].size, model.__name__, catalog_version, time.time() - start))
+
+    def __has_snapshot(self, model, catalog_version: int) -> bool:
+        """ Checks if the index of the model can be loaded from a snapshot of the given version of the catalog. """
+        return (model is Song and self.index_dir is not None and catalog_version is not None and
+                os.path.exists(CatalogSnapshot.path(self.index_dir, catalog_version)))
+
+    def index(self, model=Song) -> InvertedIndex:
+        """
+        Returns the inverted index of the given model. The index is built, if it does not exist.
+
+        :param model: the model (Song, Album or Artist), of which the index shall be returned.
+        :return: the inverted index of the model.
+        """
+        index = self._indexes.get(model)
+        if index is None:
+            with self._lock:
+                if self._indexes.get(model) is None:
+                    self.__build(model)
+                index = self._indexes[model]
+        return index
+
+    def sync(self, model, catalog_version: int) -> bool:
+        if model not in self.INDEXED_MODELS:
+            return True
+        index = self._indexes.get(model)
+        if index is None or (self.versions.get(model) != catalog_version and (
+                time.time() - index.built_at >= self.min_age or self.__has_snapshot(model, catalog_version))):
+            with self._lock:
+                if self._indexes.get(model) is index:
+                    self.__build(model, catalog_version)
+        return self.versions.get(model) == catalog_version
+
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        if model not in self.INDEXED_MODELS:
+            return self.fallback.search(model, phrase, tags)
+        return self.index(model).search(phrase, tags, self.scorer)
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        if model not in self.INDEXED_MODELS:
+            return self.fallback.search_scored(model, phrase, tags)
+        return self.index(model).search_scored(phrase, tags, self.scorer)
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self.versions.clear()
+
+
+class TagBitsetSearchBackend(SearchBackend):
+    """
+    This class represents a backend, which answers the search for songs with a bitmap index of their tags instead of
+    joining the tags for each searched tag. The phrase is matched with the token postings of the inverted index of the
+    songs. The found songs are ranked by the number of matched tags and the match of the phrase. If the search setting
+    INDEX_DIR is given, the crawler stores the index in this directory for each version of the catalog (see
+    SearchEngine.store_snapshot) and the processes only memory-map it, so it is built once and shared by the processes.
+    The search for albums and artists is answered by the inverted indexes.
+    """
+
+    def __init__(self, min_age: float=None, index_dir: str=None):
+        """
+        Initializes the tag bitset search backend.
+
+        :param min_age: the number of seconds, before which the index is not rebuilt for a new version of the catalog.
+                        If it is not given, the search setting INDEX_MIN_AGE is used. The index is swapped to a stored
+                        index of a new version regardless of its age.
+        :param index_dir: the directory, in which the crawler stores the index. If it is not given, the search setting
+                          INDEX_DIR is used. The index is only kept in the memory of the process, if both are None.
+        """
+        self.min_age = min_age if min_age is not None else get_search_setting('INDEX_MIN_AGE', 60)
+        self.index_dir = index_dir if index_dir is not None else get_search_setting('INDEX_DIR')
+        self.fallback = InvertedIndexSearchBackend(min_age=self.min_age)
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __load(self, catalog_version: int=None) -> None:
+        """
+        Loads the index of the given catalog version from the index directory. The index is only built in the memory of
+        the process, if no index directory is given or the process has no index and the index of the given version has
+        not been stored (yet). The process never stores the index. The lock must be held.
+        """
+        start = time.time()
+        index = None
+        if self.__has_stored(catalog_version):
+            index = TagBitsetIndex.load(self.index_dir, catalog_version)
+        if index is None:
+            if self._index is not None and self.index_dir is not None:
+                return
+            index = TagBitsetIndex.build(catalog_version)
+        self._index = index
+        logger.info('%s: Loaded the tag bitsets of %d songs (catalog version: %s) in %.3f seconds.' % (
+            self.__class__.__name__, index.size, catalog_version, time.time() - start))
+
+    def __has_stored(self, catalog_version: int) -> bool:
+        """ Checks if the index of the given version of the catalog has been stored in the index directory. """
+        return (self.index_dir is not None and catalog_version is not None and
+                os.path.exists(TagBitsetIndex.paths(self.index_dir, catalog_version)[2]))
+
+    def index(self) -> TagBitsetIndex:
+        """
+        Returns the tag bitset index of the songs. The index is loaded, if it does not exist.
+
+        :return: the tag bitset index of the songs.
+        """
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self.__load()
+                index = self._index
+        return index
+
+    def sync(self, model, catalog_version: int) -> bool:
+        current = self.fallback.sync(model, catalog_version)
+        if model is not Song:
+            return current
+        index = self._index
+        if index is None or (index.catalog_version != catalog_version and (
+                self.__has_stored(catalog_version) or
+                (self.index_dir is None and time.time() - index.built_at >= self.min_age))):
+            with self._lock:
+                if self._index is index:
+                    self.__load(catalog_version)
+        return current and self._index.catalog_version == catalog_version
+
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        return self.search_scored(model, phrase, tags)[0]
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        if model is not Song:
+            return self.fallback.search_scored(model, phrase, tags)
+        index = self.index()
+        counts = index.match_counts(tags)
+        song_index = self.fallback.index(Song)
+        phrase_ids = song_index.doc_ids[song_index.phrase_matches(phrase)]
+        # The songs of the token index, which are not contained in the tag bitset index (the indexes have been built
+        # for different versions of the catalog), are ignored.
+        if index.size:
+            positions = numpy.minimum(index.song_ids.searchsorted(phrase_ids), index.size - 1)
+            counts[positions[index.song_ids[positions] == phrase_ids]] += 1
+        positions = numpy.flatnonzero(counts)
+        positions = positions[numpy.argsort(-counts[positions], kind='stable')]
+        return index.song_ids[positions].tolist(), counts[positions].astype(numpy.float32)
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._index = None
+        self.fallback.refresh()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    This class represents a backend, which answers the search for songs with the full text search of PostgreSQL. The
+    search documents of the songs have a weighted search vector over the names of the song, artist and album and the
+    tags, which is indexed by a GIN index and ranked by ts_rank. If the full text search finds nothing, the names are
+    matched by their substrings and trigram similarity (pg_trgm), so typos are tolerated. The search for albums and
+    artists is answered by the inverted indexes.
+    """
+
+    # The weights of the search vector, which are assigned to the fields of the songs.
+    VECTOR_WEIGHTS = {
+        'name': 'A',
+        'tags': 'B',
+        'artist': 'C',
+        'album': 'D',
+    }
+
+    SEARCH_SQL = (
+        'SELECT d.song_id, ts_rank(%s::float4[], d.search_vector, query) AS rank '
+        'FROM shuffle_songsearchdocument d, to_tsquery(\'simple\', %s) query '
+        'WHERE d.search_vector @@ query '
+        'ORDER BY rank DESC, d.song_id')
+
+    TRIGRAM_SQL = (
+        'SELECT d.song_id, greatest(similarity(d.name, %s), similarity(d.artist_name, %s)) AS rank '
+        'FROM shuffle_songsearchdocument d '
+        'WHERE d.name LIKE %s OR d.name %% %s OR d.artist_name %% %s '
+        'ORDER BY rank DESC, d.song_id '
+        'LIMIT %s')
+
+    def __init__(self, scorer: BM25Scorer=None, trigram_limit: int=None):
+        """
+        Initializes the PostgreSQL search backend.
+
+        :param scorer: the scorer, of which the field weights are used for the ranking. The BM25 scorer with the search
+                       settings is used as default.
+        :param trigram_limit: the maximal number of songs, which are found by their similarity. If it is not given, the
+                              search setting TRIGRAM_LIMIT is used. The similarity search is disabled by 0.
+        """
+        self.scorer = scorer if scorer is not None else BM25Scorer()
+        self.trigram_limit = trigram_limit if trigram_limit is not None else get_search_setting('TRIGRAM_LIMIT', 100)
+        self.fallback = InvertedIndexSearchBackend(scorer=self.scorer)
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """ Recomputes the search vectors of all search documents. """
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE shuffle_songsearchdocument SET name = name')
+
+    @staticmethod
+    def lexeme(token: str, labels: str) -> str:
+        """
+        Returns the quoted lexeme of the given token with the given weight labels for to_tsquery. The quotes and
+        backslashes of the token are escaped, so the token can't change the structure of the query.
+
+        :param token: the token, which shall be matched.
+        :param labels: the weight labels of the search vector, in which the token shall be matched (f.e. ACD).
+        :return: the quoted lexeme.
+        """
+        return "'%s':%s" % (token.replace('\\', '\\\\').replace("'", "''"), labels)
+
+    @classmethod
+    def tsquery(cls, tokens: [str], tags: [str]) -> str:
+        """
+        Returns the text of the query for to_tsquery, which matches the songs containing all the given tokens in their
+        names or having one of the given tags.
+
+        :param tokens: the tokens of the search phrase.
+        :param tags: the names of the tags.
+        :return: the text of the query or an empty string, if there is nothing to search for.
+        """
+        clauses = []
+        if tokens:
+            clauses.append(' & '.join(cls.lexeme(token, 'ACD') for token in tokens))
+        for tag in tags:
+            tag_tokens = tokenize(tag)
+            if tag_tokens:
+                clauses.append(' & '.join(cls.lexeme(token, 'B') for token in tag_tokens))
+        return ' | '.join('(%s)' % clause for clause in clauses)
+
+    def rank_weights(self) -> [float]:
+        """
+        Returns the weights of ts_rank (in the order D, C, B, A) derived from the field weights of the scorer.
+
+        :return: the weights of ts_rank.
+        """
+        field_weights = self.scorer.field_weights
+        maximum = max(field_weights.get(field, 0.0) for field in self.VECTOR_WEIGHTS) or 1.0
+        weights = {self.VECTOR_WEIGHTS[field]: field_weights.get(field, 0.0) / maximum for field in self.VECTOR_WEIGHTS}
+        return [weights[label] for label in 'DCBA']
+
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        return self.search_scored(model, phrase, tags)[0]
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        if model is not Song:
+            return self.fallback.search_scored(model, phrase, tags)
+        tokens = sorted(set(tokenize(phrase)))
+        query = self.tsquery(tokens, sorted(set(tag.lower() for tag in tags)))
+        with connection.cursor() as cursor:
+            rows = []
+            if query:
+                cursor.execute(self.SEARCH_SQL, [self.rank_weights(), query])
+                rows = cursor.fetchall()
+            if not rows and tokens and self.trigram_limit:
+                text = ' '.join(tokens)
+                cursor.execute(self.TRIGRAM_SQL, [text, text, '%%%s%%' % text, text, text, self.trigram_limit])
+                rows = cursor.fetchall()
+        return [row[0] for row in rows], numpy.array([row[1] for row in rows], dtype=numpy.float32)
+
+    def sync(self, model, catalog_version: int) -> bool:
+        return self.fallback.sync(model, catalog_version) if model is not Song else True
+
+    def refresh(self) -> None:
+        self.fallback.refresh()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    This class represents a backend, which answers the search for songs with the full text search (FTS5) of SQLite.
+    The search documents of the songs are indexed by a FTS5 table, which is kept in sync by triggers. The songs are
+    found with MATCH and ranked by bm25() with the field weights. If the SQLite library has no FTS5, the search is
+    answered by the inverted index. The search for albums and artists is answered by the inverted indexes.
+    """
+
+    FTS_TABLE = 'shuffle_songsearchdocument_fts'
+
+    # The fields of the songs in the order of the columns of the FTS5 table.
+    FTS_COLUMNS = (('name', 'name'), ('tags', 'tags'), ('artist', 'artist_name'), ('album', 'album_name'))
+
+    SEARCH_SQL = (
+        'SELECT rowid, -bm25(shuffle_songsearchdocument_fts, %s, %s, %s, %s) AS score '
+        'FROM shuffle_songsearchdocument_fts WHERE shuffle_songsearchdocument_fts MATCH %s '
+        'ORDER BY score DESC, rowid')
+
+    def __init__(self, scorer: BM25Scorer=None):
+        """
+        Initializes the SQLite search backend.
+
+        :param scorer: the scorer, of which the field weights are used for the ranking. The BM25 scorer with the search
+                       settings is used as default.
+        """
+        self.scorer = scorer if scorer is not None else BM25Scorer()
+        self.fallback = InvertedIndexSearchBackend(scorer=self.scorer)
+        self._available = None
+
+    @classmethod
+    def fts_available(cls) -> bool:
+        """
+        Checks if the FTS5 table of the search documents exists in the database.
+
+        :return: True, if the FTS5 table exists, otherwise False.
+        """
+        return cls.FTS_TABLE in connection.introspection.table_names()
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """ Rebuilds the FTS5 table from the search documents. """
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO %s(%s) VALUES (\'rebuild\')' % (cls.FTS_TABLE, cls.FTS_TABLE))
+
+    @staticmethod
+    def match_query(tokens: [str], tags: [str]) -> str:
+        """
+        Returns the FTS5 query, which matches the songs containing all the given tokens in their names or having one of
+        the given tags.
+
+        :param tokens: the tokens of the search phrase.
+        :param tags: the names of the tags.
+        :return: the FTS5 query or an empty string, if there is nothing to search for.
+        """
+        clauses = []
+        if tokens:
+            clauses.append('{name artist_name album_name} : (%s)' % ' AND '.join('"%s"' % token for token in tokens))
+        for tag in tags:
+            tag_tokens = tokenize(tag)
+            if tag_tokens:
+                clauses.append('tags : (%s)' % ' AND '.join('"%s"' % token for token in tag_tokens))
+        return ' OR '.join('(%s)' % clause for clause in clauses)
+
+    def __fts_used(self, model) -> bool:
+        """ Checks if the search for the given model is answered by the FTS5 table. """
+        if self._available is None:
+            self._available = self.fts_available()
+        return model is Song and self._available
+
+    def search(self, model, phrase: str, tags: [str]) -> [int]:
+        return self.search_scored(model, phrase, tags)[0]
+
+    def search_scored(self, model, phrase: str, tags: [str]) -> ([int], numpy.ndarray):
+        if not self.__fts_used(model):
+            return self.fallback.search_scored(model, phrase, tags)
+        query = self.match_query(sorted(set(tokenize(phrase))), sorted(set(tag.lower() for tag in tags)))
+        if not query:
+            return [], numpy.empty(0, dtype=numpy.float32)
+        weights = [self.scorer.field_weights.get(field, 0.0) for field, _ in self.FTS_COLUMNS]
+        with connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL, weights + [query])
+            rows = cursor.fetchall()
+        # The bm25 function of FTS5 returns smaller (negative) values for more relevant songs.
+        return [row[0] for row in rows], numpy.array([row[1] for row in rows], dtype=numpy.float32)
+
+    def sync(self, model, catalog_version: int) -> bool:
+        return self.fallback.sync(model, catalog_version) if not self.__fts_used(model) else True
+
+    def refresh(self) -> None:
+        self.fallback.refresh()
@@ -11,12 +11,25 @@
 #   GNU General Public License for more details.
 #
 
-from .models import SearchableModel, Song, Artist, Album, Tag
-from collections import namedtuple
-from datetime import datetime, timedelta
+from django.core.cache import caches
+from django.db import connection
+from django.utils.module_loading import import_string
+from . import get_search_setting
+from .models import SearchableModel, Song, Artist, Album, Tag, CatalogVersion
+from .searchbackends import ORMSearchBackend, InvertedIndexSearchBackend, PostgresSearchBackend, \
+    SQLiteSearchBackend, TagBitsetSearchBackend
+from .tagmatcher import TagMatcher
+from .snapshot import CatalogSnapshot
+from .tagbitset import TagBitsetIndex
+from array import array
+from collections import namedtuple, OrderedDict
+from datetime import datetime
+import threading
+import hashlib
 import logging
-import copy
-import re
+import random
+import time
+import numpy
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +45,27 @@ class SearchEngine(object):
         SEARCH_FOR_ARTISTS: Artist,
     }
 
+    SEARCH_BACKENDS = {
+        'orm': ORMSearchBackend,
+        'index': InvertedIndexSearchBackend,
+        'postgres': PostgresSearchBackend,
+        'sqlite': SQLiteSearchBackend,
+        'bitset': TagBitsetSearchBackend,
+    }
+
+    # The backends, which are used for the database vendors, if the search setting BACKEND is not given.
+    DEFAULT_BACKENDS = {
+        'postgresql': 'postgres',
+        'sqlite': 'sqlite',
+    }
+
+    # The backend, which answers the search requests. It is created on the first search request according to the search
+    # setting BACKEND (a name of SEARCH_BACKENDS or the dotted path of a SearchBackend class).
+    backend = None
+    # The matcher of the tags in the search phrases. It is built on the first search request and rebuilt, if the search
+    # engine is refreshed or the version of the catalog has been changed.
+    tag_matcher = None
+
     class SearchRequest(object):
         """ This class represents a search request, which consists of the search phrase and search for type. """
 
@@ -53,6 +87,161 @@ class SearchEngine(object):
         def __repr__(self) -> str:
             return '<Search-Request: %s, %s>' % (self.search_phrase, self.search_for)
 
+    class SearchResult(object):
+        """
+        This class represents the result of a search, which consists of the ids of the found model objects ordered by
+        their relevance and the relevance scores of the backend (if it scores them). The ranked ids are materialized
+        once for a search request, so the number of results is known without a query and a page is loaded with one
+        query for its ids. The model objects are only loaded from the database, if they are accessed.
+        """
+
+        # The related objects of the models, which are selected (foreign keys) and prefetched (many to many) with the
+        # found model objects, because they are shown with each result.
+        RELATED = {
+            Song: (('artist', 'album', 'license', 'jamendo_profile'), ('tags',)),
+            Album: (('artist', 'jamendo_profile'), ()),
+            Artist: (('jamendo_profile',), ()),
+        }
+
+        # The number of samples per found object, up to which a weighted sample is drawn from the cumulative weights by
+        # rejecting the duplicates. The rejection is given up after the given number of draws per sample, so that the
+        # sample is drawn with the exponential keys of all objects.
+        REJECTION_SAMPLE_RATIO = 0.25
+        REJECTION_MAX_DRAWS = 4
+        # The minimal weight of a found object relative to the highest score, so that every found object (f.e. with a
+        # score of zero) can be drawn.
+        MIN_WEIGHT_RATIO = 0.001
+
+        def __init__(self, model, ids: [int], scores: numpy.ndarray=None):
+            self.model = model
+            self.ids = ids if isinstance(ids, array) else array('i', ids)
+            self.scores = numpy.asarray(scores, dtype=numpy.float32) if scores is not None else None
+            if self.scores is not None and len(self.scores) != len(self.ids):
+                raise ValueError('The search result has %d ids, but %d scores.' % (len(self.ids), len(self.scores)))
+            self._cumulative_weights = None
+
+        def weights(self) -> numpy.ndarray:
+            """
+            Returns the weights of the found model objects for the weighted sampling, which are the relevance scores of
+            the backend. If the backend only ranks the found objects, the relevance of a model object is derived from
+            its rank, so the object at the rank r (starting with 0) has the weight 1 / (r + 1).
+
+            :return: the weights of the found model objects in the order of their relevance.
+            """
+            if self.scores is None:
+                return 1.0 / numpy.arange(1, len(self.ids) + 1, dtype=numpy.float64)
+            weights = self.scores.astype(numpy.float64)
+            top = weights.max() if len(weights) else 0.0
+            if top <= 0.0:
+                return numpy.ones(len(weights), dtype=numpy.float64)
+            return numpy.maximum(weights, top * self.MIN_WEIGHT_RATIO)
+
+        def __cumulative_weights(self) -> numpy.ndarray:
+            """ Returns the cumulative weights of the found model objects, which are computed on the first call. """
+            cumulative_weights = self._cumulative_weights
+            if cumulative_weights is None:
+                cumulative_weights = self._cumulative_weights = numpy.cumsum(self.weights())
+            return cumulative_weights
+
+        def sample_ids(self, size: int, weighted: bool=False, rng: random.Random=None) -> [int]:
+            """
+            Returns the ids of a random sample of the found model objects without duplicates. The sample is drawn from
+            the ranked ids, so the model objects are neither loaded nor sorted randomly by the database. If the sample
+            is weighted, more relevant model objects are drawn with a higher probability.
+
+            :param size: the maximal number of model objects in the sample.
+            :param weighted: True, if the model objects shall be drawn by their relevance, otherwise False.
+            :param rng: the random number generator (random.Random), which shall be used. The generator of the module
+                        random is used as default.
+            :return: the ids of the sampled model objects in the order, in which they have been drawn.
+            """
+            rng = rng if rng is not None else random
+            count = len(self.ids)
+            size = max(0, min(size, count))
+            if not weighted or size == 0:
+                return [self.ids[position] for position in rng.sample(range(count), size)]
+            if size <= count * self.REJECTION_SAMPLE_RATIO:
+                cumulative_weights = self.__cumulative_weights()
+                total = cumulative_weights[-1]
+                positions = OrderedDict()
+                for _ in range(self.REJECTION_MAX_DRAWS * size):
+                    position = int(cumulative_weights.searchsorted(rng.random() * total, side='right'))
+                    positions[min(position, count - 1)] = True
+                    if len(positions) == size:
+                        return [self.ids[position] for position in positions]
+            # The sample is drawn with the exponential keys of the weights (Efraimidis and Spirakis), of which the
+            # smallest are taken.
+            uniform = numpy.random.RandomState(rng.getrandbits(32)).random_sample(count)
+            keys = -numpy.log1p(-uniform) / self.weights()
+            positions = sorted(numpy.argpartition(keys, size - 1)[:size], key=keys.__getitem__)
+            return [self.ids[int(position)] for position in positions]
+
+        def sample(self, size: int, weighted: bool=False, rng: random.Random=None) -> [SearchableModel]:
+            """
+            Returns a random sample of the found model objects without duplicates (see sample_ids).
+
+            :param size: the maximal number of model objects in the sample.
+            :param weighted: True, if the model objects shall be drawn by their relevance, otherwise False.
+            :param rng: the random number generator, which shall be used.
+            :return: the sampled model objects in the order, in which they have been drawn.
+            """
+            ids = self.sample_ids(size, weighted=weighted, rng=rng)
+            objects = self.queryset().in_bulk(ids) if ids else {}
+            return [objects[oid] for oid in ids if oid in objects]
+
+        def queryset(self):
+            """
+            Returns the queryset, with which the found model objects are loaded. The related objects, which are shown
+            with each result, are loaded with the same query or one prefetch query.
+
+            :return: the queryset, with which the found model objects are loaded.
+            """
+            select_related, prefetch_related = self.RELATED.get(self.model, ((), ()))
+            queryset = self.model.objects.all()
+            if select_related:
+                queryset = queryset.select_related(*select_related)
+            if prefetch_related:
+                queryset = queryset.prefetch_related(*prefetch_related)
+            return queryset
+
+        def page(self, offset: int, size: int=10) -> [SearchableModel]:
+            """
+            Returns the found model objects of the page, which starts at the given offset. The offset is clamped to the
+            range of the results.
+
+            :param offset: the offset of the first model object of the page.
+            :param size: the maximal number of model objects of the page.
+            :return: the found model objects of the page in the order of their relevance.
+            """
+            offset = max(0, min(offset, len(self.ids)))
+            return self[offset:offset + size]
+
+        def __len__(self) -> int:
+            return len(self.ids)
+
+        def __getitem__(self, item):
+            if isinstance(item, slice):
+                ids = self.ids[item].tolist()
+                objects = self.queryset().in_bulk(ids) if ids else {}
+                return [objects[oid] for oid in ids if oid in objects]
+            return self.queryset().get(pk=self.ids[item])
+
+        def __iter__(self):
+            for offset in range(0, len(self.ids), 100):
+                yield from self[offset:offset + 100]
+
+        def __eq__(self, other) -> bool:
+            if isinstance(other, type(self)):
+                return self.model == other.model and self.ids == other.ids
+            else:
+                return False
+
+        def __hash__(self) -> int:
+            return hash(self.model) ^ hash(self.ids.tobytes())
+
+        def __repr__(self) -> str:
+            return '<Search-Result: %s, %d results>' % (self.model.__name__, len(self))
+
     class SearchResponse(namedtuple('SearchResponse', ['search_result', 'extracted_tags'])):
         """
         This class represents the response to a search request, which consist of the search result and the
@@ -69,22 +258,75 @@ class SearchEngine(object):
             return hash(self.search_result)
 
     class SearchCache(object):
-        """ This class represents a possibility to cache search results for a search request temporarily. """
+        """
+        This class represents a possibility to cache search results for a search request temporarily. The cache is
+        bounded by a maximal number of entries and bytes, the least recently used responses are evicted first. The
+        responses expire after the caching time. The cache can be accessed by multiple threads.
+        """
+
+        _cache_time_s = 7 * 24 * 3600
+
+        # The estimated number of bytes of a cached response, which are needed additionally to the ids and tags.
+        ENTRY_OVERHEAD = 256
+
+        def __init__(self, max_entries: int=None, max_bytes: int=None):
+            """
+            Initializes the search cache. The bounds, which are not given, are taken from the search settings
+            CACHE_MAX_ENTRIES and CACHE_MAX_BYTES.
+
+            :param max_entries: the maximal number of cached search responses.
+            :param max_bytes: the maximal number of bytes of the cached search responses.
+            """
+            self.max_entries = max_entries if max_entries is not None else get_search_setting('CACHE_MAX_ENTRIES',
+                                                                                              10000)
+            self.max_bytes = max_bytes if max_bytes is not None else get_search_setting('CACHE_MAX_BYTES',
+                                                                                        64 * 1024 * 1024)
+            assert self.max_entries > 0 and self.max_bytes > 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.nbytes = 0
+            self.search_cache = OrderedDict()
+            self._lock = threading.Lock()
 
-        _cache_time_s = 3600
+        @staticmethod
+        def key(search_request) -> (str, str):
+            """ Returns the key of the given search request in the cache. """
+            return search_request.search_phrase, search_request.search_for
 
-        def __init__(self):
-            self.search_cache = dict()
+        @classmethod
+        def size_of(cls, search_request, search_response) -> int:
+            """
+            Estimates the number of bytes, which are needed to cache the given response to the given request.
+
+            :param search_request: the search request (key).
+            :param search_response: the response to the search request (value).
+            :return: the estimated number of bytes of the cached response.
+            """
+            ids, scores = search_response.search_result.ids, search_response.search_result.scores
+            return (len(ids) * ids.itemsize + (scores.nbytes if scores is not None else 0) +
+                    len(search_request.search_phrase) + sum(len(tag) for tag in search_response.extracted_tags) +
+                    cls.ENTRY_OVERHEAD)
 
         def push(self, search_request, search_response) -> None:
             """
             Pushes the given search response to this cache. The given search request is used as key to access the search
-            response.
+            response. The least recently used responses are evicted, if the cache is full.
 
             :param search_request: the search request (key), which is used to access the given search result .
             :param search_response: the result of the given search request (value).
             """
-            self.search_cache[copy.deepcopy(search_request)] = (search_response, search_request.timestamp)
+            key, size = self.key(search_request), self.size_of(search_request, search_response)
+            if size > self.max_bytes:
+                return
+            with self._lock:
+                if key in self.search_cache:
+                    self.nbytes -= self.search_cache.pop(key)[2]
+                self.search_cache[key] = (search_response, time.time(), size)
+                self.nbytes += size
+                while len(self.search_cache) > self.max_entries or self.nbytes > self.max_bytes:
+                    self.nbytes -= self.search_cache.popitem(last=False)[1][2]
+                    self.evictions += 1
 
         def get(self, search_request):
             """
@@ -95,15 +337,198 @@ class SearchEngine(object):
             :return: the stored search result of the given request will be returned, if it was cached and is valid -
             otherwise None.
             """
-            if search_request in self.search_cache:
-                search_result, timestamp = self.search_cache[search_request]
-                if datetime.now() - timedelta(seconds=self._cache_time_s) < timestamp:
-                    return search_result
-                else:
-                    del self.search_cache[search_request]
+            key = self.key(search_request)
+            with self._lock:
+                if key in self.search_cache:
+                    search_response, timestamp, size = self.search_cache[key]
+                    if time.time() - self._cache_time_s < timestamp:
+                        self.search_cache.move_to_end(key)
+                        self.hits += 1
+                        return search_response
+                    else:
+                        del self.search_cache[key]
+                        self.nbytes -= size
+                self.misses += 1
             return None
 
+        def clear(self) -> None:
+            """ Removes all cached search responses. The counters are not reset. """
+            with self._lock:
+                self.search_cache.clear()
+                self.nbytes = 0
+
+        def __len__(self):
+            return len(self.search_cache)
+
+        def __repr__(self):
+            return '<%s: %d/%d entries, %d/%d bytes, hits: %d, misses: %d, evictions: %d>' % (
+                type(self).__name__, len(self), self.max_entries, self.nbytes, self.max_bytes, self.hits, self.misses,
+                self.evictions)
+
+    class SharedSearchCache(object):
+        """
+        This class represents a cache of the search responses, which is shared by the processes of the server. The
+        responses are serialized to their ranked ids, extracted tags and scores and stored in the configured Django
+        cache. The keys contain the version of the catalog, so the responses of an older catalog are not returned
+        anymore.
+        """
+
+        # The prefix of the keys, which is changed with the format of the cached responses.
+        KEY_PREFIX = 'shuffle:search:2'
+
+        def __init__(self, alias: str=None):
+            """
+            Initializes the shared search cache.
+
+            :param alias: the alias of the Django cache, in which the responses are stored. If it is not given, the
+                          search setting SHARED_CACHE is used.
+            """
+            self.alias = alias if alias is not None else get_search_setting('SHARED_CACHE', 'default')
+
+        @property
+        def cache(self):
+            """ The Django cache, in which the responses are stored. """
+            return caches[self.alias]
+
+        def key(self, search_request, catalog_version: int) -> str:
+            """
+            Returns the key of the given search request for the given version of the catalog. The search phrase is
+            hashed, so the key is valid for all cache backends (f.e. memcached).
+
+            :param search_request: the search request.
+            :param catalog_version: the version of the catalog.
+            :return: the key of the given search request.
+            """
+            return '%s:%d:%s:%s' % (self.KEY_PREFIX, catalog_version, search_request.search_for,
+                                    hashlib.sha1(search_request.search_phrase.encode('utf-8')).hexdigest())
+
+        def push(self, search_request, search_response, catalog_version: int) -> None:
+            """
+            Pushes the given search response to the shared cache.
+
+            :param search_request: the search request (key), which is used to access the given search result.
+            :param search_response: the result of the given search request (value).
+            :param catalog_version: the version of the catalog, of which the given response has been computed.
+            """
+            search_result = search_response.search_result
+            scores = search_result.scores.tobytes() if search_result.scores is not None else None
+            value = (search_result.ids.tobytes(), sorted(search_response.extracted_tags), scores)
+            self.cache.set(self.key(search_request, catalog_version), value, SearchEngine.SearchCache._cache_time_s)
+
+        def get(self, search_request, catalog_version: int):
+            """
+            Returns the stored search response of the given request for the given version of the catalog, if it has
+            been cached. Otherwise None will be returned.
+
+            :param search_request: the search request, of which the search result shall be returned.
+            :param catalog_version: the version of the catalog.
+            :return: the stored search response or None, if it has not been cached.
+            """
+            value = self.cache.get(self.key(search_request, catalog_version))
+            if value is None:
+                return None
+            ids, extracted_tags = array('i'), set(value[1])
+            ids.frombytes(value[0])
+            scores = numpy.frombuffer(value[2], dtype=numpy.float32) if value[2] is not None else None
+            return SearchEngine.SearchResponse(search_result=SearchEngine.SearchResult(
+                SearchEngine.SEARCH_FOR[search_request.search_for], ids, scores), extracted_tags=extracted_tags)
+
     search_cache = SearchCache()
+    # The cache of the search responses, which is shared by the processes. It is only used, if the search setting
+    # SHARED_CACHE is not None.
+    shared_search_cache = SharedSearchCache() if get_search_setting('SHARED_CACHE', 'default') is not None else None
+    # The version of the catalog, of which the responses in the search cache and the tag matcher have been derived.
+    search_cache_version = None
+    # The number of seconds, for which the version of the catalog is cached by the process, so that not every search
+    # request queries it (search setting VERSION_TTL). A changed catalog is noticed at most after this time.
+    catalog_version_ttl = get_search_setting('VERSION_TTL', 1)
+    # The cached version of the catalog and the time, at which it has been queried.
+    cached_catalog_version = (None, 0.0)
+
+    @classmethod
+    def search_backend(cls):
+        """
+        Returns the backend, which answers the search requests. The backend is created on the first call. If the search
+        setting BACKEND is not given, the backend is chosen by the vendor of the database (the full text search of
+        PostgreSQL or SQLite) and defaults to the inverted index.
+
+        :return: the backend, which answers the search requests.
+        """
+        if cls.backend is None:
+            backend = get_search_setting('BACKEND', cls.DEFAULT_BACKENDS.get(connection.vendor, 'index'))
+            backend_cls = cls.SEARCH_BACKENDS[backend] if backend in cls.SEARCH_BACKENDS else import_string(backend)
+            SearchEngine.backend = backend_cls()
+        return cls.backend
+
+    @classmethod
+    def refresh(cls) -> None:
+        """
+        Refreshes the search backend and drops the cached search responses, because the catalog has been changed (f.e.
+        by a crawl). The document frequencies of the ranking are recomputed, when the index is rebuilt.
+        """
+        if cls.backend is not None:
+            cls.backend.refresh()
+        SearchEngine.tag_matcher = None
+        SearchEngine.cached_catalog_version = (None, 0.0)
+        cls.search_cache.clear()
+
+    @classmethod
+    def store_snapshot(cls, keep: int=2) -> str:
+        """
+        Writes the snapshot of the current version of the catalog to the directory of the search setting INDEX_DIR, from
+        which the processes memory-map the index of the songs, and removes the older snapshots. The tag bitsets are
+        stored next to the snapshot, if they are used by the search backend (see store_tag_bitsets).
+
+        :param keep: the number of the latest snapshots, which shall be kept.
+        :return: the path of the written snapshot or None, if the search setting INDEX_DIR is not given or the snapshot
+                 can't be written.
+        """
+        index_dir = get_search_setting('INDEX_DIR')
+        if index_dir is None:
+            return None
+        try:
+            catalog_version = CatalogVersion.current()
+            path = CatalogSnapshot.write(index_dir, catalog_version)
+            CatalogSnapshot.prune(index_dir, keep=keep)
+            cls.store_tag_bitsets(index_dir, catalog_version, keep=keep)
+            return path
+        except OSError as e:
+            logger.exception(e)
+            return None
+
+    @classmethod
+    def store_tag_bitsets(cls, index_dir: str, catalog_version: int, keep: int=2) -> bool:
+        """
+        Builds and stores the tag bitsets of the given version of the catalog in the given directory, from which the
+        processes memory-map them, and removes the older ones. The tag bitsets are only stored, if the search backend
+        is the tag bitset backend.
+
+        :param index_dir: the directory, in which the tag bitsets shall be stored.
+        :param catalog_version: the version of the catalog, of which the tag bitsets shall be built.
+        :param keep: the number of the latest versions of the tag bitsets, which shall be kept.
+        :return: True, if the tag bitsets have been stored, otherwise False.
+        """
+        if not isinstance(cls.search_backend(), TagBitsetSearchBackend):
+            return False
+        TagBitsetIndex.build(catalog_version).save(index_dir)
+        TagBitsetIndex.prune(index_dir, keep=keep)
+        return True
+
+    @classmethod
+    def catalog_version(cls) -> int:
+        """
+        Returns the current version of the catalog. The caches of the search engine are only valid for the version, of
+        which they have been derived. The version is queried at most once within the time to live of the cached version
+        (see catalog_version_ttl).
+
+        :return: the current version of the catalog.
+        """
+        catalog_version, queried_at = cls.cached_catalog_version
+        now = time.monotonic()
+        if catalog_version is None or now - queried_at >= cls.catalog_version_ttl:
+            catalog_version = CatalogVersion.current()
+            SearchEngine.cached_catalog_version = (catalog_version, now)
+        return catalog_version
 
     @classmethod
     def all_tags(cls) -> [Tag]:
@@ -123,6 +548,18 @@ class SearchEngine(object):
         """
         return set(tag_name[0] for tag_name in Tag.objects.values_list('name'))
 
+    @classmethod
+    def matcher(cls) -> TagMatcher:
+        """
+        Returns the matcher of the known tags. The matcher is built, if it does not exist.
+
+        :return: the matcher of the known tags.
+        """
+        tag_matcher = cls.tag_matcher
+        if tag_matcher is None:
+            tag_matcher = SearchEngine.tag_matcher = TagMatcher.build()
+        return tag_matcher
+
     @classmethod
     def __extract_tags_of(cls, search_phrase: str) -> [str]:
         """
@@ -131,10 +568,7 @@ class SearchEngine(object):
         :param search_phrase: the search phrase, of which the tags shall be encapsulated.
         :return: the tags of the given search phrase.
         """
-        search_phrase_split = {tag.lower() for tag in re.split(r'\W+', search_phrase)}
-        search_phrase_split |= {tag1 + tag2 for tag1 in search_phrase_split for tag2 in
-                                search_phrase_split if tag1 != tag2}
-        return search_phrase_split & cls.all_tags_names()
+        return cls.matcher().match(search_phrase)
 
     @classmethod
     def accept(cls, search_request) -> ([SearchableModel], [str]):
@@ -146,13 +580,43 @@ class SearchEngine(object):
         :return: the search response of the search request.
         """
         if search_request:
+            catalog_version = cls.catalog_version()
+            if catalog_version != cls.search_cache_version:
+                cls.search_cache.clear()
+                SearchEngine.tag_matcher = None
+                SearchEngine.search_cache_version = catalog_version
             search_response = cls.search_cache.get(search_request)
+            if search_response is None and cls.shared_search_cache is not None:
+                search_response = cls.shared_search_cache.get(search_request, catalog_version)
+                if search_response is not None:
+                    cls.search_cache.push(search_request, search_response)
             if search_response is None:
                 search_tags = cls.__extract_tags_of(search_request.search_phrase)
-                search_result = cls.SEARCH_FOR[search_request.search_for].search(search_request.search_phrase,
-                                                                                 search_tags)
+                model = cls.SEARCH_FOR[search_request.search_for]
+                backend = cls.search_backend()
+                # The responses of a backend, which lags behind the catalog, are not cached.
+                current = backend.sync(model, catalog_version)
+                ids, scores = backend.search_scored(model, search_request.search_phrase, search_tags)
+                search_result = cls.SearchResult(model, ids, scores)
                 search_response = cls.SearchResponse(search_result=search_result, extracted_tags=search_tags)
-                cls.search_cache.push(search_request, search_response)
+                if current:
+                    cls.search_cache.push(search_request, search_response)
+                    if cls.shared_search_cache is not None:
+                        cls.shared_search_cache.push(search_request, search_response, catalog_version)
             return search_response
         else:
             raise ValueError('The given search request must not be None !' % search_request)
+
+    @classmethod
+    def shuffle(cls, search_request, size: int, weighted: bool=False, rng: random.Random=None) -> [SearchableModel]:
+        """
+        Returns a random sample of the model objects, which are found for the given search request. The ranked ids of
+        the search response are cached, so repeated shuffles of the same request only draw a new sample from them.
+
+        :param search_request: the search request, of which the results shall be shuffled.
+        :param size: the maximal number of model objects in the sample.
+        :param weighted: True, if more relevant model objects shall be drawn with a higher probability, otherwise False.
+        :param rng: the random number generator, which shall be used.
+        :return: the sampled model objects.
+        """
+        return cls.accept(search_request).search_result.sample(size, weighted=weighted, rng=rng)
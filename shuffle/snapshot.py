@@ -0,0 +1,307 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import os
+import re
+import json
+import mmap
+import struct
+import numpy
+from collections.abc import Mapping
+from .models import Song, License, Source, SongSearchDocument
+from .invertedindex import InvertedIndex, FIELDS
+
+
+class SnapshotFormatError(Exception):
+    """ This exception is raised, if a file is no catalog snapshot or has an unsupported format. """
+    pass
+
+
+class SnapshotTerms(object):
+    """
+    This class represents the sorted terms of a posting group of a snapshot. The terms are stored as one block of UTF-8
+    text with their offsets, so they are decoded on access and can be binary searched without copying the block.
+    """
+
+    def __init__(self, text: numpy.ndarray, offsets: numpy.ndarray):
+        self.text = text
+        self.offsets = offsets
+
+    def encoded(self, item: int) -> bytes:
+        """ Returns the UTF-8 encoding of the term with the given number. """
+        return self.text[self.offsets[item]:self.offsets[item + 1]].tobytes()
+
+    def find(self, term: str) -> int:
+        """
+        Returns the number of the given term.
+
+        :param term: the term, which shall be looked up.
+        :return: the number of the given term or -1, if it is not contained.
+        """
+        encoded = term.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self.encoded(low) == encoded else -1
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item: int) -> str:
+        return self.encoded(item).decode('utf-8')
+
+
+class SnapshotPostings(Mapping):
+    """
+    This class represents the posting lists of a posting group of a snapshot as read-only mapping of the terms. The
+    posting lists are views of the memory-mapped file, which are created on access. The posting lists are returned with
+    their term frequencies, if the group has term frequencies.
+    """
+
+    def __init__(self, terms: SnapshotTerms, offsets: numpy.ndarray, positions: numpy.ndarray,
+                 frequencies: numpy.ndarray=None):
+        self.terms = terms
+        self.offsets = offsets
+        self.positions = positions
+        self.frequencies = frequencies
+
+    def __getitem__(self, term: str):
+        item = self.terms.find(term)
+        if item < 0:
+            raise KeyError(term)
+        start, end = self.offsets[item], self.offsets[item + 1]
+        if self.frequencies is None:
+            return self.positions[start:end]
+        return self.positions[start:end], self.frequencies[start:end]
+
+    def __iter__(self):
+        for item in range(len(self.terms)):
+            yield self.terms[item]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class CatalogSnapshot(object):
+    """
+    This class represents a versioned binary snapshot of the search relevant catalog (ids, licenses, codecs and
+    durations of the songs as well as the posting lists of their names and tags). The snapshot is a single file, which
+    is memory-mapped read-only, so the processes of the server share its pages through the page cache of the operating
+    system instead of building their own index.
+
+    The file starts with a header (magic, format version, catalog version, offset and length of the table of contents),
+    which is followed by the sections (arrays aligned to 64 bytes) and the table of contents in form of JSON.
+    """
+
+    MAGIC = b'CCSHUFSN'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<8sIIqQQ')
+    ALIGNMENT = 64
+
+    FILE_PATTERN = re.compile(r'^catalog-(\d+)\.snapshot$')
+
+    # The codecs of the sources of a song are stored as bit mask in the order of the codec types.
+    CODECS = tuple(codec for codec, _ in Source.CODEC_TYPE)
+    # The licenses of the songs are stored as number in the order of the license types (NO_LICENSE, if unknown).
+    LICENSES = tuple(license_type for license_type, _ in License.LICENSE_TYPE)
+    NO_LICENSE = 255
+    # The duration of a song, which is unknown.
+    NO_DURATION = -1
+
+    def __init__(self, path: str):
+        """
+        Opens the snapshot at the given path and memory-maps it read-only.
+
+        :param path: the path of the snapshot.
+        :raise SnapshotFormatError: if the file is no snapshot or has an unsupported format.
+        """
+        self.path = path
+        with open(path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < self.HEADER.size:
+            raise SnapshotFormatError('The file %s is no catalog snapshot.' % path)
+        magic, format_version, _, catalog_version, toc_offset, toc_length = self.HEADER.unpack_from(self._mmap)
+        if magic != self.MAGIC:
+            raise SnapshotFormatError('The file %s is no catalog snapshot.' % path)
+        if format_version != self.FORMAT_VERSION:
+            raise SnapshotFormatError('The format %d of the snapshot %s is not supported.' % (format_version, path))
+        self.catalog_version = catalog_version
+        self.toc = json.loads(self._mmap[toc_offset:toc_offset + toc_length].decode('utf-8'))
+
+    def array(self, name: str) -> numpy.ndarray:
+        """
+        Returns the section with the given name as read-only array, which is backed by the memory-mapped file.
+
+        :param name: the name of the section.
+        :return: the array of the section.
+        """
+        offset, dtype, count = self.toc['sections'][name]
+        return numpy.frombuffer(self._mmap, dtype=numpy.dtype(dtype), count=count, offset=offset)
+
+    def postings(self, group: str) -> SnapshotPostings:
+        """ Returns the posting lists of the given group (a field or 'tokens'). """
+        terms = SnapshotTerms(self.array('%s.terms' % group), self.array('%s.term_offsets' % group))
+        frequencies = '%s.frequencies' % group
+        return SnapshotPostings(terms, self.array('%s.offsets' % group), self.array('%s.positions' % group),
+                                self.array(frequencies) if frequencies in self.toc['sections'] else None)
+
+    @property
+    def song_ids(self) -> numpy.ndarray:
+        """ The sorted ids of the songs. """
+        return self.array('song_ids')
+
+    @property
+    def durations(self) -> numpy.ndarray:
+        """ The durations of the songs in seconds (NO_DURATION, if the duration is unknown). """
+        return self.array('durations')
+
+    @property
+    def licenses(self) -> numpy.ndarray:
+        """ The numbers of the licenses of the songs (see LICENSES). """
+        return self.array('licenses')
+
+    @property
+    def codecs(self) -> numpy.ndarray:
+        """ The bit masks of the codecs of the sources of the songs (see CODECS). """
+        return self.array('codecs')
+
+    def index(self) -> InvertedIndex:
+        """
+        Returns the inverted index of the songs, of which the posting lists are views of the snapshot.
+
+        :return: the inverted index of the songs.
+        """
+        fields = self.toc['fields']
+        field_postings = {field: self.postings(field) for field in fields}
+        field_lengths = {field: self.array('lengths.%s' % field) for field in fields}
+        tags = field_postings['tags']
+        return InvertedIndex(self.song_ids, field_postings, field_lengths, token_postings=self.postings('tokens'),
+                             tag_postings=SnapshotPostings(tags.terms, tags.offsets, tags.positions))
+
+    @classmethod
+    def path(cls, directory: str, catalog_version: int) -> str:
+        """ Returns the path of the snapshot of the given catalog version in the given directory. """
+        return os.path.join(directory, 'catalog-%d.snapshot' % catalog_version)
+
+    @classmethod
+    def open(cls, directory: str, catalog_version: int):
+        """
+        Opens the snapshot of the given catalog version in the given directory.
+
+        :param directory: the directory of the snapshots.
+        :param catalog_version: the version of the catalog.
+        :return: the opened snapshot or None, if there is no snapshot of the given version.
+        """
+        try:
+            return cls(cls.path(directory, catalog_version))
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def columns(cls, song_ids: numpy.ndarray) -> {str: numpy.ndarray}:
+        """ Reads the licenses, codecs and durations of the songs with the given sorted ids from the database. """
+        licenses = numpy.full(len(song_ids), cls.NO_LICENSE, dtype=numpy.uint8)
+        durations = numpy.full(len(song_ids), cls.NO_DURATION, dtype='<i4')
+        codecs = numpy.zeros(len(song_ids), dtype=numpy.uint8)
+        license_numbers = {license_type: number for number, license_type in enumerate(cls.LICENSES)}
+        for song_id, license_type, duration in SongSearchDocument.objects.values_list(
+                'song_id', 'license_type', 'duration').iterator():
+            position = song_ids.searchsorted(song_id)
+            if position < len(song_ids) and song_ids[position] == song_id:
+                licenses[position] = license_numbers.get(license_type, cls.NO_LICENSE)
+                durations[position] = duration if duration is not None else cls.NO_DURATION
+        codec_bits = {codec: 1 << number for number, codec in enumerate(cls.CODECS)}
+        for song_id, codec in Source.objects.values_list('song_id', 'codec').iterator():
+            position = song_ids.searchsorted(song_id)
+            if position < len(song_ids) and song_ids[position] == song_id:
+                codecs[position] |= codec_bits.get(codec, 0)
+        return {'licenses': licenses, 'durations': durations, 'codecs': codecs}
+
+    @staticmethod
+    def __posting_sections(group: str, postings: {str: object}, frequencies: bool) -> [(str, numpy.ndarray)]:
+        """ Returns the sections of the given posting lists, which are stored in the order of their terms. """
+        terms = sorted(postings)
+        encoded = [term.encode('utf-8') for term in terms]
+        lists = [postings[term][0] if frequencies else postings[term] for term in terms]
+        sections = [
+            ('%s.terms' % group, numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8)),
+            ('%s.term_offsets' % group, numpy.cumsum([0] + [len(term) for term in encoded], dtype='<i8')),
+            ('%s.offsets' % group, numpy.cumsum([0] + [len(positions) for positions in lists], dtype='<i8')),
+            ('%s.positions' % group, numpy.concatenate(lists).astype('<i4') if lists else numpy.zeros(0, '<i4')),
+        ]
+        if frequencies:
+            values = [postings[term][1] for term in terms]
+            sections.append(('%s.frequencies' % group,
+                             numpy.concatenate(values).astype('<f4') if values else numpy.zeros(0, '<f4')))
+        return sections
+
+    @classmethod
+    def write(cls, directory: str, catalog_version: int) -> str:
+        """
+        Writes the snapshot of the catalog in the database with the given version to the given directory. The snapshot
+        is written to a temporary file, which is renamed, so that a process never opens a partially written snapshot.
+
+        :param directory: the directory of the snapshots.
+        :param catalog_version: the version of the catalog.
+        :return: the path of the written snapshot.
+        """
+        index = InvertedIndex.build(Song)
+        song_ids = numpy.asarray(index.doc_ids, dtype='<i8')
+        sections = [('song_ids', song_ids)]
+        sections += sorted(cls.columns(song_ids).items())
+        for field in FIELDS:
+            sections += cls.__posting_sections(field, index.field_postings[field], True)
+            sections.append(('lengths.%s' % field, index.field_lengths[field].astype('<f4')))
+        sections += cls.__posting_sections('tokens', index.token_postings, False)
+        os.makedirs(directory, exist_ok=True)
+        path = cls.path(directory, catalog_version)
+        temporary_path = '%s.%d.tmp' % (path, os.getpid())
+        toc = {'fields': list(FIELDS), 'codecs': list(cls.CODECS), 'licenses': list(cls.LICENSES), 'sections': {}}
+        with open(temporary_path, 'wb') as fp:
+            fp.write(b'\0' * cls.HEADER.size)
+            for name, array in sections:
+                fp.write(b'\0' * (-fp.tell() % cls.ALIGNMENT))
+                toc['sections'][name] = (fp.tell(), array.dtype.str, len(array))
+                fp.write(array.tobytes())
+            toc_offset = fp.tell()
+            toc_data = json.dumps(toc).encode('utf-8')
+            fp.write(toc_data)
+            fp.seek(0)
+            fp.write(cls.HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, 0, catalog_version, toc_offset, len(toc_data)))
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temporary_path, path)
+        return path
+
+    @classmethod
+    def prune(cls, directory: str, keep: int=2) -> [str]:
+        """
+        Removes the snapshots in the given directory except of the given number of the latest versions. The processes,
+        which have still mapped a removed snapshot, can use it until they swap to a new one.
+
+        :param directory: the directory of the snapshots.
+        :param keep: the number of the latest snapshots, which shall be kept.
+        :return: the paths of the removed snapshots.
+        """
+        versions = sorted(int(match.group(1)) for match in map(cls.FILE_PATTERN.match, os.listdir(directory)) if match)
+        removed = [cls.path(directory, version) for version in versions[:max(0, len(versions) - keep)]]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    def __repr__(self):
+        return '<%s: %s, catalog version %d, %d songs>' % (
+            type(self).__name__, self.path, self.catalog_version, len(self.song_ids))
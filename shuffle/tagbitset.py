@@ -0,0 +1,261 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import os
+import re
+import json
+import time
+import numpy
+from .models import Song, Tag
+
+# The words of the bitsets are stored as unsigned little endian integers, so that the bit i of the word w represents
+# the song at the position 64 * w + i independent of the machine.
+WORD = numpy.dtype('<u8')
+WORD_BITS = 64
+
+# The number of set bits of each byte.
+BYTE_POPCOUNT = numpy.array([bin(byte).count('1') for byte in range(256)], dtype=numpy.uint8)
+
+
+def popcount(words: numpy.ndarray) -> int:
+    """
+    Returns the number of set bits of the given bitset.
+
+    :param words: the words of the bitset.
+    :return: the number of set bits.
+    """
+    return int(BYTE_POPCOUNT[numpy.ascontiguousarray(words, dtype=WORD).view(numpy.uint8)].sum())
+
+
+class TagBitsetIndex(object):
+    """
+    This class represents a bitmap index of the tags of the songs. The songs are numbered by their position in the
+    sorted array of their ids and each tag is mapped to a bitset of the songs having it, which is stored as a row of 64
+    bit words. The union, intersection and the songs having at least k of some tags are computed with word-wise bit
+    operations. The index can be stored in a directory for a version of the catalog and memory-mapped by the processes,
+    so the processes share its pages.
+    """
+
+    FILE_PREFIX = 'tagbitset'
+    # The pattern of the file of the tag names, which is written last (see save), with the catalog version as group.
+    FILE_PATTERN = re.compile(r'^%s-(\d+)-tags\.json$' % FILE_PREFIX)
+
+    def __init__(self, song_ids: numpy.ndarray, tag_names: [str], bits: numpy.ndarray, catalog_version: int=None):
+        """
+        Initializes the tag bitset index.
+
+        :param song_ids: the sorted ids of the songs.
+        :param tag_names: the (lower case) names of the tags in the order of the rows of the bitsets.
+        :param bits: the bitsets of the tags as matrix of words with a row for each tag.
+        :param catalog_version: the version of the catalog, of which the index has been built.
+        """
+        self.song_ids = song_ids
+        self.tag_rows = {tag_name: row for row, tag_name in enumerate(tag_names)}
+        self.bits = bits
+        self.catalog_version = catalog_version
+        self.built_at = time.time()
+
+    @property
+    def size(self) -> int:
+        """ The number of indexed songs. """
+        return len(self.song_ids)
+
+    @property
+    def words(self) -> int:
+        """ The number of words of a bitset. """
+        return self.bits.shape[1]
+
+    @classmethod
+    def build(cls, catalog_version: int=None):
+        """
+        Builds the tag bitset index from the songs and the relation of the songs and tags in the database.
+
+        :param catalog_version: the version of the catalog, with which the index shall be labeled.
+        :return: the tag bitset index.
+        """
+        song_ids = numpy.array(Song.objects.order_by('id').values_list('id', flat=True), dtype=numpy.int64)
+        tags = list(Tag.objects.order_by('id').values_list('id', 'name'))
+        # The tags are mapped to the rows by their lower case name, so the row of a tag id is looked up in an array.
+        tag_names = []
+        tag_rows = {}
+        id_rows = numpy.zeros(max([tag_id for tag_id, _ in tags], default=0) + 1, dtype=numpy.int64)
+        for tag_id, tag_name in tags:
+            tag_name = tag_name.lower()
+            if tag_name not in tag_rows:
+                tag_rows[tag_name] = len(tag_names)
+                tag_names.append(tag_name)
+            id_rows[tag_id] = tag_rows[tag_name]
+        bits = numpy.zeros((len(tag_names), (len(song_ids) + WORD_BITS - 1) // WORD_BITS), dtype=WORD)
+        pairs = numpy.array(list(Song.tags.through.objects.values_list('tag_id', 'song_id')), dtype=numpy.int64)
+        if len(pairs):
+            positions = song_ids.searchsorted(pairs[:, 1])
+            masks = numpy.left_shift(numpy.uint64(1), (positions % WORD_BITS).astype(numpy.uint64)).astype(WORD)
+            numpy.bitwise_or.at(bits, (id_rows[pairs[:, 0]], positions // WORD_BITS), masks)
+        return cls(song_ids, tag_names, bits, catalog_version)
+
+    @classmethod
+    def paths(cls, directory: str, catalog_version: int) -> (str, str, str):
+        """ Returns the paths of the files of the bitsets, song ids and tag names for the given catalog version. """
+        prefix = os.path.join(directory, '%s-%s' % (cls.FILE_PREFIX, catalog_version))
+        return '%s-bits.npy' % prefix, '%s-ids.npy' % prefix, '%s-tags.json' % prefix
+
+    def save(self, directory: str) -> None:
+        """
+        Stores the index in the given directory. The files are written under temporary names and renamed, so that a
+        process never loads a partially written index. The file of the tag names is renamed last.
+
+        :param directory: the directory, in which the index shall be stored.
+        """
+        os.makedirs(directory, exist_ok=True)
+        bits_path, ids_path, tags_path = self.paths(directory, self.catalog_version)
+        suffix = '.%d.tmp' % os.getpid()
+        with open(bits_path + suffix, 'wb') as fp:
+            numpy.save(fp, self.bits)
+        with open(ids_path + suffix, 'wb') as fp:
+            numpy.save(fp, self.song_ids)
+        with open(tags_path + suffix, 'w') as fp:
+            json.dump(sorted(self.tag_rows, key=self.tag_rows.get), fp)
+        for path in (bits_path, ids_path, tags_path):
+            os.replace(path + suffix, path)
+
+    @classmethod
+    def load(cls, directory: str, catalog_version: int):
+        """
+        Loads the index of the given catalog version from the given directory. The bitsets and song ids are
+        memory-mapped read-only.
+
+        :param directory: the directory, in which the index has been stored.
+        :param catalog_version: the version of the catalog, of which the index shall be loaded.
+        :return: the loaded index or None, if no index has been stored for the given version.
+        """
+        bits_path, ids_path, tags_path = cls.paths(directory, catalog_version)
+        try:
+            with open(tags_path) as fp:
+                tag_names = json.load(fp)
+            return cls(numpy.load(ids_path, mmap_mode='r'), tag_names, numpy.load(bits_path, mmap_mode='r'),
+                       catalog_version)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def prune(cls, directory: str, keep: int=2) -> [str]:
+        """
+        Removes the stored indexes in the given directory except of the given number of the latest versions. The
+        processes, which have still mapped a removed index, can use it until they load a new one.
+
+        :param directory: the directory, in which the indexes have been stored.
+        :param keep: the number of the latest indexes, which shall be kept.
+        :return: the catalog versions of the removed indexes.
+        """
+        versions = sorted(int(match.group(1)) for match in map(cls.FILE_PATTERN.match, os.listdir(directory)) if match)
+        removed = versions[:max(0, len(versions) - keep)]
+        for version in removed:
+            # The file of the tag names is removed first, so that a process never loads a partially removed index.
+            for path in reversed(cls.paths(directory, version)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def bitset(self, tag: str) -> numpy.ndarray:
+        """
+        Returns the bitset of the songs having the given tag.
+
+        :param tag: the name of the tag.
+        :return: the words of the bitset (all bits are unset, if the tag is unknown).
+        """
+        row = self.tag_rows.get(tag.lower())
+        return self.bits[row] if row is not None else numpy.zeros(self.words, dtype=WORD)
+
+    def union(self, tags: [str]) -> numpy.ndarray:
+        """ Returns the bitset of the songs having one of the given tags. """
+        result = numpy.zeros(self.words, dtype=WORD)
+        for tag in tags:
+            result |= self.bitset(tag)
+        return result
+
+    def intersection(self, tags: [str]) -> numpy.ndarray:
+        """ Returns the bitset of the songs having all the given tags (no song, if no tag is given). """
+        result = numpy.zeros(self.words, dtype=WORD)
+        for number, tag in enumerate(tags):
+            result = numpy.array(self.bitset(tag), dtype=WORD) if number == 0 else result & self.bitset(tag)
+        return result
+
+    def at_least(self, tags: [str], k: int) -> numpy.ndarray:
+        """
+        Returns the bitset of the songs having at least k of the given tags. The bitsets of the tags are added with k
+        saturating bit-sliced counters, where the counter j holds the songs having more than j of the tags.
+
+        :param tags: the names of the tags.
+        :param k: the minimal number of tags, which the songs must have (at least one).
+        :return: the bitset of the songs having at least k of the given tags.
+        """
+        k = max(k, 1)
+        counters = numpy.zeros((k, self.words), dtype=WORD)
+        for tag in set(tag.lower() for tag in tags):
+            bitset = self.bitset(tag)
+            for j in range(k - 1, 0, -1):
+                counters[j] |= counters[j - 1] & bitset
+            counters[0] |= bitset
+        return counters[k - 1]
+
+    def unpack(self, bitset: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the bits of the given bitset as array of zeros and ones in the order of the songs. """
+        bits = numpy.unpackbits(numpy.ascontiguousarray(bitset, dtype=WORD).view(numpy.uint8), bitorder='little')
+        return bits[:self.size]
+
+    def positions(self, bitset: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the sorted positions of the songs, which are contained in the given bitset. """
+        return numpy.flatnonzero(self.unpack(bitset))
+
+    def ids(self, bitset: numpy.ndarray) -> numpy.ndarray:
+        """ Returns the sorted ids of the songs, which are contained in the given bitset. """
+        return self.song_ids[self.positions(bitset)]
+
+    def match_counts(self, tags: [str]) -> numpy.ndarray:
+        """
+        Returns the number of the given tags, which each song has (the popcount of the column of the song in the
+        bitsets of the tags). The bitsets are added word-wise with bit-sliced counters, where the plane j holds the bit
+        j of the count of each song, so only the log2(number of tags) planes are unpacked instead of each bitset.
+
+        :param tags: the names of the tags.
+        :return: the number of matched tags in the order of the songs.
+        """
+        planes = []
+        for tag in set(tag.lower() for tag in tags):
+            carry = numpy.array(self.bitset(tag), dtype=WORD)
+            for plane in planes:
+                plane_carry = plane & carry
+                plane ^= carry
+                carry = plane_carry
+                if not carry.any():
+                    break
+            else:
+                if carry.any():
+                    planes.append(carry)
+        counts = numpy.zeros(self.size, dtype=numpy.int32)
+        for j, plane in enumerate(planes):
+            counts += self.unpack(plane).astype(numpy.int32) << j
+        return counts
+
+    def search(self, tags: [str], k: int=1) -> [int]:
+        """
+        Searches for the songs having at least k of the given tags. The songs are ranked by the number of matched tags.
+
+        :param tags: the names of the tags.
+        :param k: the minimal number of tags, which the songs must have.
+        :return: the ids of the found songs ordered by the number of matched tags.
+        """
+        positions = self.positions(self.at_least(tags, k))
+        counts = self.match_counts(tags)[positions]
+        return self.song_ids[positions[numpy.argsort(-counts, kind='stable')]].tolist()
@@ -0,0 +1,122 @@
+#   COPYRIGHT (c) 2015 Kevin Haller <kevin.haller@outofbits.com>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+import time
+from collections import deque
+from .models import Tag
+from .invertedindex import tokenize
+
+
+class TagMatcher(object):
+    """
+    This class represents a matcher, which finds the names of tags in a search phrase. The names of the tags are stored
+    in an Aho-Corasick automaton of their characters, so all tags are found in one pass over the joined tokens of the
+    phrase. A tag is matched, if it starts and ends at the boundaries of tokens, so compound tags like 'indierock' are
+    found for adjacent tokens like 'indie rock'.
+    """
+
+    def __init__(self, tag_names: [str]):
+        """
+        Initializes the tag matcher with the given names of tags. The names are matched without case and characters,
+        which are not part of a word.
+
+        :param tag_names: the names of the tags, which shall be found.
+        """
+        # The nodes of the automaton are numbered, where the node 0 is the root. The names of a node are the names of
+        # the tags, which are equal without case and characters, which are not part of a word (f.e. 'hip-hop' and
+        # 'HipHop'), and end at this node.
+        self.transitions = [{}]
+        self.names = [None]
+        self.depths = [0]
+        self.size = 0
+        for tag_name in tag_names:
+            key = ''.join(tokenize(tag_name))
+            if key:
+                node = 0
+                for character in key:
+                    node = self.transitions[node].get(character) or self.__add_node(node, character)
+                if self.names[node] is None:
+                    self.names[node] = set()
+                if tag_name not in self.names[node]:
+                    self.names[node].add(tag_name)
+                    self.size += 1
+        self.failures, self.outputs = self.__links()
+        self.built_at = time.time()
+
+    def __add_node(self, parent: int, character: str) -> int:
+        """ Adds a node for the given character below the given parent node and returns it. """
+        node = len(self.transitions)
+        self.transitions.append({})
+        self.names.append(None)
+        self.depths.append(self.depths[parent] + 1)
+        self.transitions[parent][character] = node
+        return node
+
+    def __links(self) -> ([int], [int]):
+        """
+        Computes the failure and output links of the nodes in the order of their depth. The failure link of a node
+        refers to the node of its longest proper suffix in the automaton and the output link to the node of its
+        longest proper suffix, which is the end of tags (0, if there is none).
+
+        :return: the failure links and the output links of the nodes.
+        """
+        failures = [0] * len(self.transitions)
+        outputs = [0] * len(self.transitions)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for character, child in self.transitions[node].items():
+                failure = failures[node]
+                while failure and character not in self.transitions[failure]:
+                    failure = failures[failure]
+                failure = self.transitions[failure].get(character, 0)
+                failures[child] = failure if failure != child else 0
+                outputs[child] = failures[child] if self.names[failures[child]] else outputs[failures[child]]
+                queue.append(child)
+        return failures, outputs
+
+    @classmethod
+    def build(cls):
+        """
+        Builds the tag matcher from the tags in the database.
+
+        :return: the tag matcher of the tags in the database.
+        """
+        return cls(Tag.objects.values_list('name', flat=True).iterator())
+
+    def match(self, phrase: str) -> {str}:
+        """
+        Returns the names of the tags, which are contained in the given phrase. A tag is contained, if its name is equal
+        to a token or to adjacent tokens of the phrase, which have been joined.
+
+        :param phrase: the phrase, in which the tags shall be found.
+        :return: the names of the tags, which are contained in the given phrase.
+        """
+        tokens = tokenize(phrase)
+        starts, ends, offset = set(), set(), 0
+        for token in tokens:
+            starts.add(offset)
+            offset += len(token)
+            ends.add(offset)
+        tags = set()
+        node = 0
+        for end, character in enumerate(''.join(tokens), 1):
+            while node and character not in self.transitions[node]:
+                node = self.failures[node]
+            node = self.transitions[node].get(character, 0)
+            if end in ends:
+                output = node if self.names[node] else self.outputs[node]
+                while output:
+                    if end - self.depths[output] in starts:
+                        tags.update(self.names[output])
+                    output = self.outputs[output]
+        return tags
@@ -10,16 +10,34 @@
 #   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 #   GNU General Public License for more details.
 #
+import os
 import json
 import time
 import logging
 import copy
+import random
+import tempfile
+import threading
+import numpy
+from io import StringIO
+from array import array
 from datetime import datetime
-from django.test import TestCase, Client
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, Client, override_settings
+from django.utils.unittest import skipUnless
 from ccshuffle.serialize import JSONModelEncoder
 from .searchengine import SearchEngine
+from .searchbackends import ORMSearchBackend, InvertedIndexSearchBackend, PostgresSearchBackend, SQLiteSearchBackend, \
+    TagBitsetSearchBackend
+from .scoring import BM25Scorer
+from .tagmatcher import TagMatcher
+from .tagbitset import TagBitsetIndex, popcount
+from .snapshot import CatalogSnapshot, SnapshotPostings, SnapshotFormatError
+from .invertedindex import InvertedIndex, intersect, union
 from .models import Artist, JamendoArtistProfile, Song, JamendoSongProfile, Album, JamendoAlbumProfile, Tag, Source, \
-    License
+    License, CatalogVersion, SongSearchDocument
 
 logger = logging.getLogger(__name__)
 
@@ -534,6 +552,17 @@ class ModelTest(TestCase):
 class SearchEngineTest(TestCase):
     fixtures = ['fixtures/se_test_db.json']
 
+    def setUp(self):
+        SongSearchDocument.rebuild()
+        SearchEngine.refresh()
+        caches['default'].clear()
+        # The tests change the catalog and expect, that the search engine notices it immediately.
+        self.catalog_version_ttl = SearchEngine.catalog_version_ttl
+        SearchEngine.catalog_version_ttl = 0
+
+    def tearDown(self):
+        SearchEngine.catalog_version_ttl = self.catalog_version_ttl
+
     def __measure(self, func, *args, **kwargs):
         """
         Measures and returns the execution time  of the given function.
@@ -652,3 +681,580 @@ class SearchEngineTest(TestCase):
         time.sleep(2.1)
         self.assertIsNone(search_engine.search_cache.get(search_request),
                           'The cache of the search engine must return None, if the timestamp of the stored search response is too old.')
+
+
+class SearchCacheTest(SimpleTestCase):
+    """ Tests the bounded cache of the search responses. """
+
+    def setUp(self):
+        self.cache_time = SearchEngine.SearchCache._cache_time_s
+
+    def tearDown(self):
+        SearchEngine.SearchCache._cache_time_s = self.cache_time
+
+    @staticmethod
+    def __entry(phrase, ids):
+        return (SearchEngine.SearchRequest(search_phrase=phrase),
+                SearchEngine.SearchResponse(search_result=SearchEngine.SearchResult(Song, ids), extracted_tags=set()))
+
+    def test_lru_eviction(self):
+        """ Tests if the least recently used responses are evicted, if the number of entries is exceeded. """
+        cache = SearchEngine.SearchCache(max_entries=2)
+        entries = [self.__entry(phrase, [1, 2, 3]) for phrase in ('a', 'b', 'c')]
+        cache.push(*entries[0])
+        cache.push(*entries[1])
+        self.assertEqual(cache.get(entries[0][0]), entries[0][1])
+        cache.push(*entries[2])
+        self.assertIsNone(cache.get(entries[1][0]), 'The least recently used response must be evicted.')
+        self.assertEqual(cache.get(entries[0][0]), entries[0][1])
+        self.assertEqual(cache.get(entries[2][0]), entries[2][1])
+        self.assertEqual((cache.hits, cache.misses, cache.evictions, len(cache)), (3, 1, 1, 2))
+
+    def test_byte_budget(self):
+        """ Tests if the responses are evicted, if the number of bytes is exceeded. """
+        request, response = self.__entry('a', range(1000))
+        size = SearchEngine.SearchCache.size_of(request, response)
+        self.assertIsInstance(response.search_result.ids, array, 'The ids must be stored in a compact array.')
+        cache = SearchEngine.SearchCache(max_bytes=2 * size + 10)
+        for phrase in ('a', 'b', 'c'):
+            cache.push(*self.__entry(phrase, range(1000)))
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertEqual(cache.evictions, 1)
+        cache.push(*self.__entry('d', range(10000)))
+        self.assertIsNone(cache.get(SearchEngine.SearchRequest(search_phrase='d')),
+                          'A response, which exceeds the byte budget, must not be cached.')
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_expiration(self):
+        """ Tests if the responses expire after the caching time. """
+        SearchEngine.SearchCache._cache_time_s = 0.1
+        cache = SearchEngine.SearchCache()
+        request, response = self.__entry('a', [1])
+        cache.push(request, response)
+        self.assertEqual(cache.get(request), response)
+        time.sleep(0.2)
+        self.assertIsNone(cache.get(request))
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_concurrent_access(self):
+        """ Tests if the bounds of the cache hold, if it is accessed by multiple threads. """
+        cache = SearchEngine.SearchCache(max_entries=50)
+
+        def access(thread):
+            for n in range(500):
+                request, response = self.__entry('%d-%d' % (thread, n % 80), [n])
+                cache.push(request, response)
+                cache.get(request)
+
+        threads = [threading.Thread(target=access, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.nbytes, sum(entry[2] for entry in cache.search_cache.values()))
+        self.assertEqual(cache.hits + cache.misses, 8 * 500)
+
+
+class SearchBackendTest(TestCase):
+    """ Tests the search backends of the search engine. """
+
+    @classmethod
+    def setUpTestData(cls):
+        license_by = License.objects.get(type=License.CC_BY)
+        jasmine = Artist.objects.create(name='Jasmine Jordan')
+        waterpistols = Artist.objects.create(name='Waterpistols')
+        album_dreams = Album.objects.create(name='Dreams', artist=jasmine)
+        album_war = Album.objects.create(name='Battles', artist=waterpistols)
+        tags = {name: Tag.objects.create(name=name) for name in ('pop', 'love', 'rock', 'indie', 'jazz')}
+        songs = (
+            ('Possibilities', jasmine, album_dreams, ('pop', 'love')),
+            ('War', waterpistols, album_war, ('rock', 'indie')),
+            ('Rock the night', waterpistols, album_war, ('jazz',)),
+            ('Love song', jasmine, album_dreams, ('rock',)),
+            ('Dreams', waterpistols, album_war, ('pop',)),
+        )
+        for name, artist, album, tag_names in songs:
+            song = Song.objects.create(name=name, artist=artist, album=album, license=license_by)
+            song.tags.add(*[tags[tag_name] for tag_name in tag_names])
+        SongSearchDocument.rebuild()
+
+    def setUp(self):
+        self.backend = SearchEngine.backend
+        self.catalog_version_ttl = SearchEngine.catalog_version_ttl
+        SearchEngine.catalog_version_ttl = 0
+        SearchEngine.search_cache = SearchEngine.SearchCache()
+        SearchEngine.refresh()
+        caches['default'].clear()
+
+    def tearDown(self):
+        SearchEngine.backend = self.backend
+        SearchEngine.catalog_version_ttl = self.catalog_version_ttl
+        SearchEngine.tag_matcher = None
+        SearchEngine.search_cache = SearchEngine.SearchCache()
+
+    def __search(self, backend, phrase, tags):
+        return [Song.objects.get(pk=song_id).name for song_id in backend.search(Song, phrase, tags)]
+
+    def test_intersect_union(self):
+        """ Tests the intersection and union of posting lists. """
+        postings = [array('i', [1, 3, 5, 7, 9]), array('i', [3, 4, 5, 9]), array('i', [0, 3, 9, 12])]
+        self.assertListEqual(list(intersect(postings)), [3, 9])
+        self.assertListEqual(list(union(postings)), [0, 1, 3, 4, 5, 7, 9, 12])
+        self.assertListEqual(list(intersect([])), [])
+
+    def test_inverted_index_search(self):
+        """ Tests if the inverted index finds the songs by their name, artist, album and tags. """
+        backend = InvertedIndexSearchBackend()
+        self.assertListEqual(self.__search(backend, 'indie rock', ['indie', 'rock']), ['War', 'Love song'],
+                             'The songs must be ranked by the number of matched tags.')
+        self.assertListEqual(self.__search(backend, 'rock night', []), ['Rock the night'],
+                             'All tokens of the phrase must be contained in the name.')
+        self.assertListEqual(self.__search(backend, 'jasmine dreams', []), ['Possibilities', 'Love song'],
+                             'The names of the artist and album must be indexed.')
+        self.assertListEqual(self.__search(backend, 'unknown', ['unknown']), [])
+
+    def test_bm25_ranking(self):
+        """ Tests if the songs are ranked by the weighted BM25 relevance of their fields. """
+        backend = InvertedIndexSearchBackend()
+        self.assertListEqual(self.__search(backend, 'dreams', []), ['Dreams', 'Possibilities', 'Love song'],
+                             'A match in the name of the song must outweigh a match in the name of the album.')
+        self.assertListEqual(self.__search(backend, 'nothing', ['pop', 'jazz']),
+                             ['Rock the night', 'Dreams', 'Possibilities'],
+                             'Rare tags must outweigh common tags and short fields must outweigh long ones.')
+        backend = InvertedIndexSearchBackend(scorer=BM25Scorer(field_weights={'name': 0.5, 'album': 4.0}))
+        self.assertListEqual(self.__search(backend, 'dreams', []), ['Possibilities', 'Love song', 'Dreams'],
+                             'The weights of the fields must be respected.')
+
+    def test_refresh(self):
+        """ Tests if the document frequencies are updated, when the search engine is refreshed. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        index = SearchEngine.backend.index()
+        self.assertEqual(index.document_frequency('rock', tag=True), 2)
+        song = Song.objects.get(name='War')
+        song.tags.remove(Tag.objects.get(name='rock'))
+        SongSearchDocument.update([song.id])
+        self.assertIs(SearchEngine.backend.index(), index, 'The index must not be rebuilt before it is refreshed.')
+        SearchEngine.refresh()
+        self.assertEqual(SearchEngine.backend.index().document_frequency('rock', tag=True), 1)
+
+    def test_inverted_index_equals_reference(self):
+        """ Tests if the inverted index finds the same songs for tags as the reference backend. """
+        for tags in (['rock'], ['love', 'jazz'], ['pop', 'rock', 'indie']):
+            self.assertSetEqual(set(self.__search(InvertedIndexSearchBackend(), 'nothing', tags)),
+                                set(self.__search(ORMSearchBackend(), 'nothing', tags)))
+
+    def test_album_artist_search(self):
+        """ Tests if albums and artists are found and ranked by their names and the tags of their songs and albums. """
+        backend = InvertedIndexSearchBackend()
+
+        def albums(phrase, tags):
+            return [Album.objects.get(pk=pk).name for pk in backend.search(Album, phrase, tags)]
+
+        def artists(phrase, tags):
+            return [Artist.objects.get(pk=pk).name for pk in backend.search(Artist, phrase, tags)]
+
+        self.assertListEqual(albums('jasmine', []), ['Dreams'], 'The name of the artist of an album must be indexed.')
+        self.assertListEqual(albums('nothing', ['jazz']), ['Battles'], 'The tags of the songs must be aggregated.')
+        self.assertListEqual(albums('nothing', ['love', 'rock']), ['Dreams', 'Battles'])
+        self.assertListEqual(artists('waterpistols', []), ['Waterpistols'])
+        self.assertListEqual(artists('nothing', ['love', 'rock']), ['Jasmine Jordan', 'Waterpistols'],
+                             'The tags of the albums must be aggregated.')
+        for tags in (['rock'], ['love', 'jazz']):
+            self.assertListEqual(ORMSearchBackend().search(Album, 'nothing', tags),
+                                 backend.search(Album, 'nothing', tags),
+                                 'The reference backend must search albums with the inverted index.')
+            self.assertListEqual(ORMSearchBackend().search(Artist, 'nothing', tags),
+                                 backend.search(Artist, 'nothing', tags))
+        SearchEngine.backend = backend
+        self.assertListEqual([album.name for album in Album.search('nothing', ['love', 'rock'])], ['Dreams', 'Battles'],
+                             'The albums must be searched with the backend of the search engine.')
+        self.assertListEqual([artist.name for artist in Artist.search('nothing', ['love', 'rock'])],
+                             ['Jasmine Jordan', 'Waterpistols'])
+        SearchEngine.backend = ORMSearchBackend()
+        self.assertListEqual([album.name for album in Album.search('jasmine', [])], ['Dreams'])
+
+    def test_album_artist_search_page(self):
+        """ Tests if the index page renders the found albums and artists. """
+        response = self.client.get('/', {'search_phrase': 'jasmine', 'search_for': 'albums'}, follow=True)
+        self.assertContains(response, 'album-card-container', count=1)
+        response = self.client.get('/', {'search_phrase': 'rock', 'search_for': 'artists'}, follow=True)
+        self.assertContains(response, 'artist-card-container', count=2)
+        response = self.client.get('/', {'search_phrase': 'dreams', 'search_for': 'unknown'}, follow=True)
+        self.assertContains(response, 'song-card-container')
+
+    def test_shuffle_sample(self):
+        """ Tests if the samples of a search result are drawn without duplicates and weighted by the relevance. """
+        rng = random.Random(7)
+        search_result = SearchEngine.SearchResult(Song, range(1, 1001))
+        for weighted, size in ((False, 10), (True, 10), (True, 600)):
+            sample = search_result.sample_ids(size, weighted=weighted, rng=rng)
+            self.assertEqual(len(sample), size)
+            self.assertEqual(len(set(sample)), size, 'The sample must not contain duplicates.')
+            self.assertTrue(set(sample) <= set(search_result.ids))
+        self.assertEqual(len(SearchEngine.SearchResult(Song, [3, 1]).sample_ids(5, weighted=True, rng=rng)), 2)
+        self.assertListEqual(SearchEngine.SearchResult(Song, []).sample_ids(5, weighted=True, rng=rng), [])
+        first = last = 0
+        for _ in range(200):
+            sample = search_result.sample_ids(5, weighted=True, rng=rng)
+            first += 1 in sample
+            last += 1000 in sample
+        self.assertGreater(first, 10 * max(last, 1), 'Relevant objects must be drawn more often.')
+        scored_result = SearchEngine.SearchResult(Song, [1, 2, 3], [6.0, 3.0, 0.0])
+        self.assertListEqual(scored_result.weights().tolist(), [6.0, 3.0, 0.006],
+                             'The weights must be the scores of the backend, but every object must be drawable.')
+        drawn = [scored_result.sample_ids(1, weighted=True, rng=rng)[0] for _ in range(300)]
+        self.assertGreater(drawn.count(1), drawn.count(2))
+        self.assertRaises(ValueError, SearchEngine.SearchResult, Song, [1, 2], [1.0])
+
+    def test_search_scores(self):
+        """ Tests if the scores of the backend are kept with the search result and shared by the processes. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        search_request = SearchEngine.SearchRequest(search_phrase='indie rock',
+                                                    search_for=SearchEngine.SEARCH_FOR_SONGS)
+        search_result = SearchEngine.accept(search_request).search_result
+        ids, scores = SearchEngine.backend.search_scored(Song, 'indie rock', ['indie', 'rock'])
+        self.assertListEqual(list(search_result.ids), ids)
+        self.assertEqual(search_result.scores.dtype, numpy.float32)
+        self.assertListEqual(search_result.scores.tolist(), scores.tolist())
+        self.assertTrue(all(a >= b for a, b in zip(scores, scores[1:])), 'The scores must be in the order of the ids.')
+        # Simulates another process with an empty cache.
+        SearchEngine.search_cache = SearchEngine.SearchCache()
+        self.assertListEqual(SearchEngine.accept(search_request).search_result.scores.tolist(), scores.tolist())
+        self.assertIsNone(ORMSearchBackend().search_scored(Song, 'indie rock', ['indie', 'rock'])[1],
+                          'The scores of a backend, which only ranks the objects, must be None.')
+
+    def test_shuffle(self):
+        """ Tests if the shuffle endpoint returns a random sample of the found songs. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        search_request = SearchEngine.SearchRequest(search_phrase='rock', search_for=SearchEngine.SEARCH_FOR_SONGS)
+        songs = SearchEngine.shuffle(search_request, 10, weighted=True)
+        self.assertSetEqual(set(song.name for song in songs), {'Rock the night', 'War', 'Love song'})
+        response = self.client.get('/en/shuffle/', {'search_phrase': 'rock', 'size': '2', 'weighted': '1'})
+        result = json.loads(response.content.decode('utf-8'))['result']
+        self.assertEqual(len(result), 2)
+        self.assertTrue(set(song['name'] for song in result) <= {'Rock the night', 'War', 'Love song'})
+
+    def test_tag_bitset_index(self):
+        """ Tests the union, intersection and the songs having at least k tags of the tag bitset index. """
+        index = TagBitsetIndex.build()
+
+        def names(bitset):
+            return set(Song.objects.filter(id__in=index.ids(bitset).tolist()).values_list('name', flat=True))
+
+        self.assertSetEqual(names(index.union(['pop', 'jazz'])), {'Possibilities', 'Rock the night', 'Dreams'})
+        self.assertSetEqual(names(index.intersection(['rock', 'Indie'])), {'War'})
+        self.assertSetEqual(names(index.intersection([])), set())
+        self.assertSetEqual(names(index.at_least(['pop', 'love', 'rock', 'indie'], 2)), {'Possibilities', 'War'})
+        self.assertSetEqual(names(index.at_least(['pop', 'love', 'rock', 'indie'], 3)), set())
+        self.assertEqual(popcount(index.union(['pop', 'rock'])), 4)
+        self.assertEqual(popcount(index.bitset('unknown')), 0)
+        tags = ['pop', 'love', 'rock', 'indie', 'jazz', 'unknown']
+        self.assertListEqual(index.match_counts(tags).tolist(),
+                             sum(index.unpack(index.bitset(tag)).astype(int) for tag in tags).tolist(),
+                             'The bit-sliced counters must count the matched tags of each song.')
+
+    def test_tag_bitset_search(self):
+        """ Tests if the tag bitset backend finds the same songs as the inverted index backend. """
+        with tempfile.TemporaryDirectory() as index_dir:
+            backend = TagBitsetSearchBackend(index_dir=index_dir)
+            self.assertTrue(backend.sync(Song, CatalogVersion.current()))
+            self.assertListEqual(self.__search(backend, 'nothing', ['rock', 'indie']), ['War', 'Love song'],
+                                 'The songs must be ranked by the number of matched tags.')
+            for phrase, tags in (('rock', ['rock']), ('nothing', ['love', 'jazz']), ('dreams', ['pop', 'indie']),
+                                 ('rock night', []), ('Waterpistols war', ['love'])):
+                self.assertSetEqual(set(self.__search(backend, phrase, tags)),
+                                    set(self.__search(InvertedIndexSearchBackend(), phrase, tags)))
+            with self.assertNumQueries(0):
+                backend.search(Song, 'love', ['rock'])
+            self.assertListEqual(os.listdir(index_dir), [], 'The index must only be stored by the crawler.')
+            SearchEngine.backend = backend
+            version = CatalogVersion.current()
+            self.assertTrue(SearchEngine.store_tag_bitsets(index_dir, version))
+            index = TagBitsetIndex.load(index_dir, version)
+            self.assertIsInstance(index.bits, numpy.memmap, 'The stored index must be memory-mapped.')
+            self.assertEqual(index.search(['pop', 'rock', 'indie']), backend.index().search(['pop', 'rock', 'indie']))
+            self.assertIsNone(TagBitsetIndex.load(index_dir, version + 1))
+            version = CatalogVersion.bump()
+            self.assertTrue(SearchEngine.store_tag_bitsets(index_dir, version, keep=1))
+            files = set(os.path.basename(path) for path in TagBitsetIndex.paths(index_dir, version))
+            self.assertSetEqual(set(os.listdir(index_dir)), files,
+                                'The indexes of the former versions must be removed.')
+            backend.sync(Song, version)
+            self.assertEqual(backend.index().catalog_version, version,
+                             'The stored index of a new version must be loaded regardless of the min age.')
+            self.assertIsInstance(backend.index().bits, numpy.memmap)
+            SearchEngine.backend = InvertedIndexSearchBackend()
+            self.assertFalse(SearchEngine.store_tag_bitsets(index_dir, version),
+                             'The index must only be stored for the tag bitset backend.')
+
+    def test_catalog_snapshot(self):
+        """ Tests if the snapshot of the catalog contains the columns and posting lists of the songs. """
+        song = Song.objects.get(name='War')
+        Source.objects.create(type=Source.TYPE_STREAM, link='http://example.org/war.ogg', song=song,
+                              codec=Source.CODEC_OGG)
+        with tempfile.TemporaryDirectory() as index_dir:
+            out = StringIO()
+            call_command('buildcatalogsnapshot', dir=index_dir, stdout=out)
+            self.assertIn('catalog-%d.snapshot' % CatalogVersion.current(), out.getvalue())
+            snapshot = CatalogSnapshot.open(index_dir, CatalogVersion.current())
+            self.assertEqual(snapshot.catalog_version, CatalogVersion.current())
+            self.assertListEqual(snapshot.song_ids.tolist(), list(Song.objects.order_by('id').values_list('id',
+                                                                                                          flat=True)))
+            position = snapshot.song_ids.tolist().index(song.id)
+            self.assertEqual(snapshot.codecs[position], 1 << CatalogSnapshot.CODECS.index(Source.CODEC_OGG))
+            self.assertEqual(CatalogSnapshot.LICENSES[snapshot.licenses[position]], License.CC_BY)
+            self.assertEqual(snapshot.durations[position], CatalogSnapshot.NO_DURATION)
+            index, reference = snapshot.index(), InvertedIndex.build()
+            self.assertIsInstance(index.token_postings, SnapshotPostings)
+            self.assertFalse(index.tag_postings['rock'].flags.writeable, 'The posting lists must be mapped read-only.')
+            scorer = BM25Scorer()
+            for phrase, tags in (('indie rock', ['indie', 'rock']), ('dreams', []), ('nothing', ['pop', 'jazz'])):
+                self.assertListEqual(index.search(phrase, tags, scorer), reference.search(phrase, tags, scorer))
+            with open(CatalogSnapshot.path(index_dir, 0), 'wb') as fp:
+                fp.write(b'no snapshot' * 10)
+            self.assertRaises(SnapshotFormatError, CatalogSnapshot.open, index_dir, 0)
+
+    def test_catalog_snapshot_swap(self):
+        """ Tests if the backend swaps to the snapshot of a new catalog version regardless of the age of the index. """
+        with tempfile.TemporaryDirectory() as index_dir:
+            version = CatalogVersion.current()
+            CatalogSnapshot.write(index_dir, version)
+            backend = InvertedIndexSearchBackend(min_age=3600, index_dir=index_dir)
+            self.assertTrue(backend.sync(Song, version))
+            self.assertIsInstance(backend.index().token_postings, SnapshotPostings)
+            song = Song.objects.get(name='War')
+            song.name = 'Peace'
+            song.save()
+            SongSearchDocument.update([song.id])
+            version = CatalogVersion.bump()
+            self.assertFalse(backend.sync(Song, version), 'The index must not be rebuilt before the min age.')
+            CatalogSnapshot.write(index_dir, version)
+            self.assertTrue(backend.sync(Song, version), 'The index must be swapped to the new snapshot.')
+            self.assertListEqual(self.__search(backend, 'peace', []), ['Peace'])
+            self.assertEqual(len(CatalogSnapshot.prune(index_dir, keep=1)), 1)
+            self.assertListEqual(os.listdir(index_dir), ['catalog-%d.snapshot' % version])
+
+    def test_tag_matcher(self):
+        """ Tests if the tag matcher finds single and compound tags in the search phrase. """
+        matcher = TagMatcher(['rock', 'indie', 'indierock', 'hip-hop', 'pop'])
+        self.assertSetEqual(matcher.match('Forever Indie rock!'), {'indie', 'rock', 'indierock'})
+        self.assertSetEqual(matcher.match('hip hop and hiphop'), {'hip-hop'})
+        self.assertSetEqual(matcher.match('popular rocks'), set(), 'Only whole tokens must be matched.')
+        self.assertSetEqual(matcher.match(''), set())
+        matcher = TagMatcher(['rock', 'rockabilly', 'kabi', 'billy', 'abilly'])
+        self.assertSetEqual(matcher.match('rock abilly'), {'rock', 'rockabilly', 'abilly'},
+                            'Overlapping tags must be found, but only at the boundaries of the tokens.')
+
+    def test_tag_matcher_same_key(self):
+        """ Tests if all tags, which are equal without case and punctuation, are found. """
+        matcher = TagMatcher(['hip-hop', 'HipHop', 'hip hop', 'hip-hop'])
+        self.assertEqual(matcher.size, 3, 'Each distinct name of a tag must be counted once.')
+        self.assertSetEqual(matcher.match('some hip hop'), {'hip-hop', 'HipHop', 'hip hop'})
+
+    def test_tag_matcher_refresh(self):
+        """ Tests if the tag matcher is rebuilt, when the version of the catalog changes. """
+        SearchEngine.refresh()
+        search_request = SearchEngine.SearchRequest(search_phrase='blues rock',
+                                                    search_for=SearchEngine.SEARCH_FOR_SONGS)
+        self.assertSetEqual(set(SearchEngine.accept(search_request).extracted_tags), {'rock'})
+        Tag.objects.create(name='blues')
+        CatalogVersion.bump()
+        search_request = SearchEngine.SearchRequest(search_phrase='blues rock',
+                                                    search_for=SearchEngine.SEARCH_FOR_SONGS)
+        self.assertSetEqual(set(SearchEngine.accept(search_request).extracted_tags), {'rock', 'blues'})
+
+    def test_search_result(self):
+        """ Tests if the search engine returns the ranked songs of the backend. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        search_request = SearchEngine.SearchRequest(search_phrase='indie rock',
+                                                    search_for=SearchEngine.SEARCH_FOR_SONGS)
+        search_response = SearchEngine.accept(search_request)
+        self.assertEqual(len(search_response.search_result), 2)
+        self.assertListEqual([song.name for song in search_response.search_result[0:10]], ['War', 'Love song'])
+        self.assertSetEqual(set(search_response.extracted_tags), {'indie', 'rock'})
+
+    def test_shared_search_cache(self):
+        """ Tests if the responses are shared by the processes and dropped, if the version of the catalog changes. """
+
+        class CountingSearchBackend(ORMSearchBackend):
+            calls = 0
+
+            def search(self, model, phrase, tags):
+                CountingSearchBackend.calls += 1
+                return super().search(model, phrase, tags)
+
+        SearchEngine.backend = CountingSearchBackend()
+        search_request = SearchEngine.SearchRequest(search_phrase='indie rock',
+                                                    search_for=SearchEngine.SEARCH_FOR_SONGS)
+        search_response = SearchEngine.accept(search_request)
+        # Simulates another process with an empty cache.
+        SearchEngine.search_cache = SearchEngine.SearchCache()
+        self.assertEqual(SearchEngine.accept(search_request), search_response)
+        self.assertSetEqual(set(SearchEngine.accept(search_request).extracted_tags), {'indie', 'rock'})
+        self.assertEqual(CountingSearchBackend.calls, 1, 'The response must be taken from the shared cache.')
+        self.assertEqual(SearchEngine.search_cache.hits, 1)
+        version = SearchEngine.catalog_version()
+        CatalogVersion.bump()
+        self.assertEqual(SearchEngine.catalog_version(), version + 1)
+        SearchEngine.accept(search_request)
+        self.assertEqual(CountingSearchBackend.calls, 2, 'The responses of a former catalog must not be returned.')
+
+    def test_catalog_version_ttl(self):
+        """ Tests if the version of the catalog is cached within its time to live and dropped by a refresh. """
+        SearchEngine.catalog_version_ttl = 3600
+        version = SearchEngine.catalog_version()
+        CatalogVersion.bump()
+        with self.assertNumQueries(0):
+            self.assertEqual(SearchEngine.catalog_version(), version, 'The version must be cached within its TTL.')
+        SearchEngine.refresh()
+        self.assertEqual(SearchEngine.catalog_version(), version + 1, 'The refresh must drop the cached version.')
+        SearchEngine.catalog_version_ttl = 0
+        CatalogVersion.bump()
+        self.assertEqual(SearchEngine.catalog_version(), version + 2, 'The version must be queried after its TTL.')
+
+    def test_catalog_version(self):
+        """ Tests if the caches of the search engine are dropped, when the version of the catalog changes. """
+        SearchEngine.backend = InvertedIndexSearchBackend(min_age=3600)
+        search_request = SearchEngine.SearchRequest(search_phrase='blues', search_for=SearchEngine.SEARCH_FOR_SONGS)
+        self.assertEqual(len(SearchEngine.accept(search_request).search_result), 0)
+        song = Song.objects.create(name='Blues', artist=Artist.objects.first(), license=License.objects.first())
+        song.tags.add(Tag.objects.create(name='blues'))
+        SongSearchDocument.update([song.id])
+        CatalogVersion.bump()
+        search_response = SearchEngine.accept(search_request)
+        self.assertSetEqual(search_response.extracted_tags, {'blues'}, 'The tags must be matched in the new catalog.')
+        self.assertEqual(len(search_response.search_result), 0, 'The index must not be rebuilt before its min age.')
+        self.assertIsNone(SearchEngine.search_cache.get(search_request),
+                          'The responses of an index, which lags behind the catalog, must not be cached.')
+        SearchEngine.backend.min_age = 0
+        search_response = SearchEngine.accept(search_request)
+        self.assertListEqual([found.name for found in search_response.search_result], ['Blues'])
+        self.assertEqual(SearchEngine.search_cache.get(search_request), search_response)
+
+    def test_search_result_pages(self):
+        """ Tests if the pages of the search result are sliced from the ranked ids and loaded with their tags. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        artist, license_by = Artist.objects.first(), License.objects.first()
+        for number in range(25):
+            Song.objects.create(name='Track %d' % number, artist=artist, license=license_by)
+        SongSearchDocument.rebuild()
+        CatalogVersion.bump()
+        search_request = SearchEngine.SearchRequest(search_phrase='track', search_for=SearchEngine.SEARCH_FOR_SONGS)
+        search_result = SearchEngine.accept(search_request).search_result
+        with self.assertNumQueries(0):
+            self.assertEqual(len(search_result), 25)
+        with self.assertNumQueries(2):
+            page = search_result.page(10)
+        self.assertListEqual([song.id for song in page], search_result.ids[10:20].tolist())
+        self.assertEqual(len(search_result.page(20)), 5)
+        with self.assertNumQueries(0):
+            self.assertListEqual(search_result.page(30), [])
+        response = self.client.get('/', {'search_for': 'songs', 'search_phrase': 'track', 'start': '20'}, follow=True)
+        self.assertEqual(response.context['search_result_count'], 25)
+        self.assertListEqual([song.id for song in response.context['search_result']], search_result.ids[20:].tolist())
+
+    def test_search_result_page_queries(self):
+        """ Tests if a page of song cards is rendered with a fixed number of queries. """
+        SearchEngine.backend = InvertedIndexSearchBackend()
+        album, license_by = Album.objects.first(), License.objects.first()
+        tags = list(Tag.objects.filter(name__in=['rock', 'indie']))
+        for number in range(15):
+            song = Song.objects.create(name='Track %d' % number, artist=album.artist, album=album, license=license_by,
+                                       jamendo_profile=JamendoSongProfile.objects.create(jamendo_id=number))
+            song.tags.add(*tags)
+        SongSearchDocument.rebuild()
+        CatalogVersion.bump()
+        search = {'search_for': 'songs', 'search_phrase': 'track indie rock'}
+        self.client.get('/', search, follow=True)
+        # Loading and saving the session (4), tags of the form, catalog version, songs of the page with their related
+        # objects and the prefetched tags of the songs.
+        for start in ('0', '10'):
+            with self.assertNumQueries(8):
+                response = self.client.get('/en/', dict(search, start=start))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['search_result']),
+                             min(10, response.context['search_result_count'] - int(start)))
+
+    def test_song_search_documents(self):
+        """ Tests if the search documents of the songs are updated and rebuilt. """
+        document = SongSearchDocument.objects.get(song__name='War')
+        self.assertEqual((document.name, document.artist_name, document.album_name), ('war', 'waterpistols', 'battles'))
+        self.assertListEqual(document.tag_names, ['indie', 'rock'])
+        self.assertListEqual(document.tag_id_list, [Tag.objects.get(name='indie').id, Tag.objects.get(name='rock').id])
+        self.assertEqual(document.license_type, License.objects.get(type=License.CC_BY).type)
+        song = document.song
+        song.name = 'Peace'
+        song.save()
+        song.tags.clear()
+        SongSearchDocument.update([song.id])
+        document = SongSearchDocument.objects.get(song=song)
+        self.assertEqual((document.name, document.tags), ('peace', ''))
+        SongSearchDocument.objects.all().delete()
+        version, out = CatalogVersion.current(), StringIO()
+        call_command('rebuildsearchdocuments', stdout=out)
+        self.assertEqual(SongSearchDocument.objects.count(), Song.objects.count())
+        self.assertGreater(CatalogVersion.current(), version, 'The rebuild must change the version of the catalog.')
+        self.assertIn('5 songs', out.getvalue())
+
+    def test_postgres_query(self):
+        """ Tests the text search query and the ranking weights of the PostgreSQL backend. """
+        self.assertEqual(PostgresSearchBackend.tsquery(['indie', 'rock'], ['hip-hop', 'jazz']),
+                         "('indie':ACD & 'rock':ACD) | ('hip':B & 'hop':B) | ('jazz':B)")
+        self.assertEqual(PostgresSearchBackend.tsquery([], []), '')
+        self.assertEqual(PostgresSearchBackend.tsquery(["rock'n", 'roll\\'], ["r'n'b"]),
+                         "('rock''n':ACD & 'roll\\\\':ACD) | ('r':B & 'n':B & 'b':B)",
+                         'The quotes and backslashes of the tokens must be escaped.')
+        backend = PostgresSearchBackend(scorer=BM25Scorer(field_weights={'name': 4.0, 'tags': 2.0, 'artist': 1.0,
+                                                                         'album': 0.0}))
+        self.assertListEqual(backend.rank_weights(), [0.0, 0.25, 0.5, 1.0])
+
+    @override_settings(SHUFFLE_SEARCH={})
+    def test_default_backend(self):
+        """ Tests if the backend is chosen by the vendor of the database, if it is not configured. """
+        SearchEngine.backend = None
+        expected = {'postgresql': PostgresSearchBackend, 'sqlite': SQLiteSearchBackend}.get(
+            connection.vendor, InvertedIndexSearchBackend)
+        self.assertIsInstance(SearchEngine.search_backend(), expected)
+
+    @skipUnless(connection.vendor == 'postgresql', 'The full text search of PostgreSQL requires PostgreSQL.')
+    def test_postgres_search(self):
+        """ Tests if the PostgreSQL backend finds and ranks the songs like the inverted index. """
+        backend = PostgresSearchBackend()
+        self.assertListEqual(self.__search(backend, 'indie rock', ['indie', 'rock']), ['War', 'Love song'])
+        self.assertListEqual(self.__search(backend, 'rock night', []), ['Rock the night'])
+        self.assertListEqual(self.__search(backend, "Rock: the 'night' & \\!", []), ['Rock the night'],
+                             'The punctuation of the phrase must not break the query.')
+        self.assertEqual(self.__search(backend, 'dreams', [])[0], 'Dreams')
+        self.assertListEqual(self.__search(backend, 'posibilities', []), ['Possibilities'],
+                             'Typos must be tolerated by the similarity of the names.')
+
+    def test_sqlite_query(self):
+        """ Tests the FTS5 query of the SQLite backend. """
+        self.assertEqual(SQLiteSearchBackend.match_query(['indie', 'rock'], ['hip-hop']),
+                         '({name artist_name album_name} : ("indie" AND "rock")) OR (tags : ("hip" AND "hop"))')
+        self.assertEqual(SQLiteSearchBackend.match_query([], []), '')
+
+    @skipUnless(connection.vendor == 'sqlite', 'The full text search of SQLite requires SQLite.')
+    def test_sqlite_search(self):
+        """ Tests if the SQLite backend finds and ranks the songs like the inverted index. """
+        backend = SQLiteSearchBackend()
+        if not backend.fts_available():
+            self.skipTest('The SQLite library does not support FTS5.')
+        self.assertListEqual(self.__search(backend, 'indie rock', ['indie', 'rock']), ['War', 'Love song'])
+        self.assertListEqual(self.__search(backend, 'rock night', []), ['Rock the night'])
+        self.assertListEqual(self.__search(backend, 'dreams', []), ['Dreams', 'Possibilities', 'Love song'])
+        self.assertSetEqual(set(self.__search(backend, 'nothing', ['pop', 'jazz'])),
+                            {'Rock the night', 'Dreams', 'Possibilities'})
+        song = Song.objects.get(name='War')
+        song.name = 'Peace'
+        song.save()
+        SongSearchDocument.update([song.id])
+        self.assertListEqual(self.__search(backend, 'peace', []), ['Peace'], 'The triggers must update the index.')
+        self.assertListEqual(self.__search(backend, 'war', []), [])
+        out = StringIO()
+        call_command('rebuildftsindex', stdout=out)
+        self.assertIn('sqlite', out.getvalue())
+        self.assertListEqual(self.__search(backend, 'peace', []), ['Peace'])
@@ -13,7 +13,7 @@
 
 from django.conf.urls import url
 from .views import (AboutPageView, IndexPageView, RegisterPageView,
-                    NotFoundErrorPageView, SignInPageView, SignOutPageView)
+                    NotFoundErrorPageView, SignInPageView, SignOutPageView, ShuffleView)
 
 urlpatterns = [
     url(r'^$', IndexPageView.as_view(), name="home"),
@@ -22,5 +22,6 @@ urlpatterns = [
     url(r'login/$', SignInPageView.as_view(), name="signin"),
     url(r'logout/$', SignOutPageView.as_view(), name="signout"),
     url(r'about/$', AboutPageView.as_view(), name="about"),
+    url(r'shuffle/$', ShuffleView.as_view(), name="shuffle"),
     url(r'.*$', NotFoundErrorPageView.as_view(), name="404"),
 ]
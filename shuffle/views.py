@@ -22,7 +22,7 @@ from django.views import generic
 from django.shortcuts import redirect
 from django.http import HttpResponse
 
-from ccshuffle.serialize import ResponseObject
+from ccshuffle.serialize import ResponseObject, JSONModelEncoder
 from .forms import LoginForm, RegistrationForm
 from .searchengine import SearchEngine
 
@@ -37,14 +37,19 @@ class IndexPageView(generic.TemplateView):
         kwargs['tags'] = SearchEngine.all_tags()
         search_for = request.GET.get('search_for', None)
         if search_for:
+            if search_for not in SearchEngine.SEARCH_FOR:
+                search_for = SearchEngine.SEARCH_FOR_SONGS
+            kwargs['search_for'] = search_for
             search_request = SearchEngine.SearchRequest(search_phrase=request.GET.get('search_phrase', ''),
                                                         search_for=search_for)
             search_response = SearchEngine.accept(search_request)
-            search_result_offset = int(request.GET.get('start', 0))
+            try:
+                search_result_offset = max(0, int(request.GET.get('start', 0)))
+            except ValueError:
+                search_result_offset = 0
             kwargs['search_result_count'] = len(search_response.search_result)
             kwargs['search_offset'] = search_result_offset
-            kwargs['search_result'] = list(
-                search_response.search_result[search_result_offset:search_result_offset + 10])
+            kwargs['search_result'] = search_response.search_result.page(search_result_offset, 10)
             if search_for == 'songs':
                 kwargs['searched_tags'] = search_response.extracted_tags
         return super(IndexPageView, self).get(request, *args, **kwargs)
@@ -55,6 +60,30 @@ class IndexPageView(generic.TemplateView):
         return context
 
 
+class ShuffleView(generic.View):
+    """
+    This class represents the endpoint, which returns a random sample of the model objects found for the search phrase
+    in form of json. The sample is weighted by the relevance of the model objects, if the parameter weighted is given.
+    """
+
+    # The maximal number of model objects, which are returned for one shuffle.
+    MAX_SIZE = 100
+
+    def get(self, request, *args, **kwargs):
+        search_for = request.GET.get('search_for', SearchEngine.SEARCH_FOR_SONGS)
+        if search_for not in SearchEngine.SEARCH_FOR:
+            search_for = SearchEngine.SEARCH_FOR_SONGS
+        try:
+            size = max(0, min(int(request.GET.get('size', 10)), self.MAX_SIZE))
+        except ValueError:
+            size = 10
+        weighted = request.GET.get('weighted', '').lower() in ('1', 'true')
+        search_request = SearchEngine.SearchRequest(search_phrase=request.GET.get('search_phrase', ''),
+                                                    search_for=search_for)
+        sample = SearchEngine.shuffle(search_request, size, weighted=weighted)
+        return HttpResponse(ResponseObject('success', '', sample).json(cls=JSONModelEncoder), content_type="json")
+
+
 class AboutPageView(generic.TemplateView):
     """
     This class represents the view of the about page. This page contains information about the creative commons
@@ -21,14 +21,44 @@ function Dashboard() {
     };
 
     /**
-     * Starts the crawling process for the jamendo service.
+     * Starts the crawling process for the jamendo service. A delta crawling process only fetches the entities since
+     * the last finished crawling process.
      */
-    this.crawl_jamendo = function (success_cb, error_cb) {
+    this.crawl_jamendo = function (delta, success_cb, error_cb) {
         $.ajax({
             type: 'GET',
             url: this.ajax_request_url,
             data: {
-                'command': 'start-jamendo-crawl'
+                'command': delta ? 'start-jamendo-delta-crawl' : 'start-jamendo-crawl'
+            },
+            success: success_cb,
+            error: error_cb
+        });
+    };
+
+    /**
+     * Requests the progress of the crawling process with the given id.
+     */
+    this.crawling_process_progress = function (id, success_cb, error_cb) {
+        $.ajax({
+            type: 'GET',
+            url: this.ajax_request_url + 'progress/' + id + '/',
+            dataType: 'json',
+            success: success_cb,
+            error: error_cb
+        });
+    };
+
+    /**
+     * Requests the status of the crawling processes with the given ids.
+     */
+    this.crawling_process_status = function (ids, success_cb, error_cb) {
+        $.ajax({
+            type: 'GET',
+            url: this.ajax_request_url,
+            data: {
+                'command': 'crawling-process-status',
+                'ids': ids.join(',')
             },
             success: success_cb,
             error: error_cb
@@ -43,10 +73,10 @@ $(document).ready(function () {
     // Init dashboard
     dashboard.init();
 
-    // Click handler for the start-jamendo-crawling button.
-    $('#start-jamendo-crawling').click(function () {
+    // Click handler for the start-jamendo-crawling and start-jamendo-delta-crawling buttons.
+    $('#start-jamendo-crawling, #start-jamendo-delta-crawling').click(function () {
         $(this).prop("disabled", true);
-        dashboard.crawl_jamendo(function (data) {
+        dashboard.crawl_jamendo(this.id === 'start-jamendo-delta-crawling', function (data) {
             console.log(data);
             var response = JSON.parse(data);
             if (response['header']['status'] === 'success') {
@@ -61,6 +91,62 @@ $(document).ready(function () {
         });
     });
 
+    // Polls the status of the planned and running crawling processes, which are executed by the crawling worker.
+    setInterval(function () {
+        var ids = $('tr[data-cp-status="Planned"], tr[data-cp-status="Running"]').map(function () {
+            return $(this).attr('data-cp-id');
+        }).get();
+        if (ids.length === 0) {
+            return;
+        }
+        dashboard.crawling_process_status(ids, function (data) {
+            var response = JSON.parse(data);
+            if (response['header']['status'] === 'success') {
+                response['result'].forEach(function (cp_data) {
+                    updateCrawlingProcessRow(cp_data);
+                    if (cp_data['status'] === 'Running') {
+                        dashboard.crawling_process_progress(cp_data['id'], function (response) {
+                            updateCrawlingProcessProgress(response['result']);
+                        });
+                    }
+                });
+            } else {
+                console.log(response['header']['error_message']);
+            }
+        }, function (jqXHR, textStatus, errorThrown) {
+            console.log('An error (' + errorThrown + ') occurred for the \'crawling process status\' request !');
+        });
+    }, 5000);
+
+    /**
+     * Updates the row of the crawling process with the given status information.
+     *
+     * @param cp_data the status information of the crawling process received.
+     */
+    function updateCrawlingProcessRow(cp_data) {
+        var row = $('tr[data-cp-id="' + cp_data['id'] + '"]');
+        row.attr('data-cp-status', cp_data['status']);
+        row.toggleClass('failed-row', cp_data['status'] === 'Failed');
+        row.find('.cp-status').text(cp_data['status']);
+        row.find('.cp-exception').text(cp_data['exception'] || '');
+    }
+
+    /**
+     * Updates the progress cell of the crawling process with the given progress information.
+     *
+     * @param progress the progress information of the crawling process received.
+     */
+    function updateCrawlingProcessProgress(progress) {
+        var text = progress['phase'] + ' @ ' + progress['offset'] + ', ' + progress['items_processed'] +
+            (progress['items_expected'] !== null ? '/' + progress['items_expected'] : '') + ' items, ' +
+            progress['items_per_second'].toFixed(1) + ' items/s, HTTP ' + progress['http_time'].toFixed(0) +
+            's, DB ' + progress['db_time'].toFixed(0) + 's';
+        if (progress['eta'] !== null) {
+            text += ', ETA ' + Math.ceil(progress['eta'] / 60) + ' min';
+        }
+        $('tr[data-cp-id="' + progress['id'] + '"] .cp-progress').text(text);
+    }
+
     /**
      * Adds the crawling process information as row to the table given with the selector.
      *
@@ -69,11 +155,14 @@ $(document).ready(function () {
      */
     function addCrawlingProcessRow(selector, cp_data) {
         var execution_date = new Date(cp_data['execution_date'])
-        $(selector + ' tbody').first().prepend('<tr>' +
+        $(selector + ' tbody').first().prepend(
+            '<tr data-cp-id="' + cp_data['id'] + '" data-cp-status="' + cp_data['status'] + '">' +
             '<td>' + cp_data['service'] + '</td>' +
+            '<td>' + cp_data['kind'] + '</td>' +
             '<td>' + jQuery.format.date(execution_date, 'E dd MM yyyy - HH:mm') + '</td>' +
-            '<td>' + cp_data['status'] + '</td>' +
-            '<td>' + cp_data['exception'] + '</td>' +
+            '<td class="cp-status">' + cp_data['status'] + '</td>' +
+            '<td class="cp-progress"></td>' +
+            '<td class="cp-exception">' + (cp_data['exception'] || '') + '</td>' +
             '</tr>');
     }
 });
@@ -11,10 +11,14 @@ $(document).ready(function () {
 
     /**
      * Adds a handler, which fires, if the search navigation bar activation changes, so that the value of the hidden
-     * field search_for of the search-form changes too.
+     * field search_for of the search-form changes too. If a phrase has already been entered, the search is repeated
+     * for the activated tab.
      */
     $(document).on('shown.bs.tab', 'a[data-toggle="tab"]', function (e) {
-        $('#search-form input[name="search_for"]').attr('value', e.target.getAttribute('href').replace('#', ''))
+        $('#search-form input[name="search_for"]').attr('value', e.target.getAttribute('href').replace('#', ''));
+        if ($('#search-form input[name="search_phrase"]').val()) {
+            $('#search-form').submit();
+        }
     });
 
     /**